@@ -42,6 +42,18 @@ def create_app():
     # 🔌 DB — SQLAlchemy (source de vérité = config.Config)
     db.init_app(app)
 
+    # ⚙️ Profil SQLite (WAL, busy_timeout...) sur chaque connexion + `flask sqlite ...`
+    from app.utils import sqlite_tuning
+    sqlite_tuning.init_app(app)
+
+    # 📖 Moteur en lecture seule pour les GET marqués @lecture_seule
+    from app.utils import lecture_seule
+    lecture_seule.init_app(app)
+
+    # 🔢 Diagnostic N+1 (dev) : en-tête X-SQL-Queries si SQL_COUNT_REQUESTS=true
+    from app.utils import sql_stats
+    sql_stats.init_app(app)
+
     # Login manager (config + init)
     login_manager.login_message = "Veuillez vous connecter pour accéder à cette page 💾"
     login_manager.login_message_category = "warning"
@@ -94,184 +106,50 @@ def create_app():
     # ───────────────────────────────────────
     # 🧹 BLOC 5 — Hygiène des commandes en_attente
     # ------------------------------------------------------
-    # Objectif métier :
-    # Éviter que des commandes créées mais jamais payées
-    # restent indéfiniment en base.
-    #
-    # Règle :
-    # Si statut = "en_attente"
-    # ET date_commande < now - X heures
-    # → statut = "abandonnee"
-    # → date_abandon = now
-    # → abandon_motif = "ttl_expired"
-    #
-    # Garanties :
-    # - Ne touche jamais aux commandes "payé", "complétée", etc.
-    # - N’impacte pas le stock (non décrémenté à ce stade)
-    # - Idempotent : une commande déjà basculée ne sera jamais retraitée
-    # - Possibilité de simulation via --dry-run
-    #
-    # Usage :
-    #   flask mark_abandoned_orders --hours 24
-    #   flask mark_abandoned_orders --hours 24 --dry-run
+    # en_attente depuis plus de X heures → "abandonnee" (motif ttl_expired),
+    # holds de stock libérés. UPDATE par lots courts, sous bail partagé :
+    #   flask mark_abandoned_orders --hours 24 [--dry-run]   (cron)
+    #   ABANDON_SWEEP_ENABLED=true                           (planificateur intégré, web uniquement)
+    #   flask abandons status                                (synthèse des passages)
+    # ───────────────────────────────────────
+    from app.utils import abandons
+    abandons.init_app(app, demarrer=not is_cli)
+
+    # ───────────────────────────────────────
+    # 🗂️ Migrations SQLite versionnées
     # ------------------------------------------------------
+    # Usage :
+    #   flask db-migrate --dry-run
+    #   flask db-migrate            (backup + migrations + EXPLAIN avant/après)
+    # ───────────────────────────────────────
+    from app.migrations import db_migrate_command
+    app.cli.add_command(db_migrate_command)
 
-    import click
-    from datetime import datetime, timedelta    
-    from app.models.commandes import Commande
+    # ───────────────────────────────────────
+    # 🛒 Panier courant côté serveur (+ `flask paniers purge`)
+    # ───────────────────────────────────────
+    from app.utils import panier_store
+    panier_store.init_app(app)
 
-    @app.cli.command("mark_abandoned_orders")
-    @click.option(
-        "--hours",
-        default=24,
-        type=int,
-        show_default=True,
-        help="Seuil d'expiration en heures avant abandon."
-    )
-    @click.option(
-        "--dry-run",
-        is_flag=True,
-        help="Simule l'opération sans modifier la base de données."
-    )
-
-    @click.option(
-        "--limit",
-        default=500,
-        type=int,
-        show_default=True,
-        help="Nombre max de commandes traitées par exécution (sécurité V1)."
-    )
-    @click.option(
-        "--batch-size",
-        default=200,
-        type=int,
-        show_default=True,
-        help="Taille des lots chargés en mémoire."
-    )
-
-
-
-
-
-
-    def mark_abandoned_orders(hours, dry_run, limit, batch_size):        
-        """
-        Commande CLI Flask.
-        Marque comme 'abandonnee' les commandes 'en_attente'
-        dont la date_commande dépasse le seuil défini.
-        """
-
-        # Sécurité minimale : éviter seuil incohérent
-        if hours <= 0:
-            click.echo("❌ --hours doit être strictement supérieur à 0.")
-            return
-
-        # Calcul du seuil temporel en UTC
-        # (cohérent avec date_commande=datetime.utcnow())
-        threshold = datetime.utcnow() - timedelta(hours=hours)
-
-        # Requête ciblée :
-        # On sélectionne UNIQUEMENT les commandes encore en attente
-        # et dont la date est antérieure au seuil.
-        query = Commande.query.filter(
-            Commande.statut == "en_attente",
-            Commande.date_commande < threshold
-        )
-
-        # On limite volontairement pour éviter qu'une erreur de seuil
-        # (ou un cron trop fréquent) ne bascule massivement trop de lignes d'un coup.
-        if limit <= 0:
-            click.echo("❌ --limit doit être > 0")
-            return
-        if batch_size <= 0:
-            click.echo("❌ --batch-size doit être > 0")
-            return
-
-        # Note : SQLite n'aime pas les grosses opérations concurrentes.
-        # On traite par lots, et on garde une borne "limit" globale.
-        commandes = (
-            query.order_by(Commande.id.asc())
-                 .limit(limit)
-                 .yield_per(batch_size)
-        )
-
-        # Dry-run : on parcourt sans écrire
-        if dry_run:
-            shown = 0
-            total_seen = 0
-            click.echo(
-                f"🧾 Dry-run: jusqu'à {limit} commande(s) max "
-                f"(seuil={hours}h, avant {threshold.isoformat()} UTC)"
-            )
-            for c in commandes:
-                total_seen += 1
-                if shown < 20:
-                    click.echo(
-                        f" - id={c.id} | date_commande={c.date_commande} "
-                        f"| stripe_session_id={c.stripe_session_id}"
-                    )
-                    shown += 1
-            if total_seen == 0:
-                click.echo("✅ 0 commande à abandonner.")
-            elif total_seen > 20:
-                click.echo(f"... (+{total_seen - 20} autres)")
-            click.echo("✅ Dry-run terminé. Aucune modification effectuée.")
-            return
-
-        # Exécution réelle
-        now = datetime.utcnow()
-        changed = 0
-
-        for c in commandes:
-            # garde défensive
-            if c.statut != "en_attente":
-                continue
-            c.statut = "abandonnee"
-            c.date_abandon = now
-            c.abandon_motif = "ttl_expired"
-            changed += 1
-
-        db.session.commit()
-
-        logger.info(
-            f"[BLOC5] mark_abandoned_orders changed={changed} "
-            f"hours={hours} threshold={threshold.isoformat()}Z "
-            f"limit={limit} batch_size={batch_size}"
-        )
-
-        click.echo(f"✅ {changed} commande(s) marquée(s) 'abandonnee'.")
-        # Exécution réelle
-        now = datetime.utcnow()
-        changed = 0
-
-        for c in commandes:
-
-            # Garde métier défensive (double sécurité)
-            # Même si la requête filtre déjà, on protège
-            # contre toute modification concurrente.
-            if c.statut != "en_attente":
-                continue
-
-            c.statut = "abandonnee"
-            c.date_abandon = now
-            c.abandon_motif = "ttl_expired"
-            changed += 1
-
-        # Commit unique (transaction groupée)
-        db.session.commit()
-
-        # Log applicatif pour traçabilité (audit minimal)
-        logger.info(
-            f"[BLOC5] mark_abandoned_orders "
-            f"changed={changed} "
-            f"hours={hours} "
-            f"threshold={threshold.isoformat()}Z"
-        )
-
-        click.echo(f"✅ {changed} commande(s) marquée(s) 'abandonnee'.")
+    # 🔒 Réservations de stock checkout (+ `flask reservations release`)
+    from app.utils import reservations
+    reservations.init_app(app)
 
+    # 📨 Webhook Stripe asynchrone : workers (web uniquement) + `flask stripe-events replay`
+    from app.utils import stripe_events
+    stripe_events.init_app(app, demarrer=not is_cli)
 
+    # ✉️ Outbox emails : senders (web uniquement) + `flask emails drain`
+    from app.utils import email_outbox
+    email_outbox.init_app(app, demarrer=not is_cli)
 
+    # 💳 File des remboursements : exécuteurs (web uniquement) + `flask refunds reconcile`
+    from app.utils import remboursements
+    remboursements.init_app(app, demarrer=not is_cli)
+
+    # ⏳ Statut de paiement (page d'attente) + `flask statuts-paiement purge`
+    from app.utils import statut_paiement
+    statut_paiement.init_app(app)
 
 
     # ───────────────────────────────────────
@@ -283,6 +161,12 @@ def create_app():
             https_url = request.url.replace("http://", "https://", 1)
             return redirect(https_url, code=301)
 
+    # ------------------------------------------------------
+    # FILTRE JINJA : centimes -> "18.50"
+    # ------------------------------------------------------
+    from app.utils.montant import euros
+    app.add_template_filter(euros, "euros")
+
     # ------------------------------------------------------
     # CONTEXT PROCESSOR GLOBAL : compteur du panier
     # ------------------------------------------------------
@@ -338,6 +222,7 @@ def create_app():
     from app.routes.paiement import paiement_bp
     from app.routes.admin.routes import admin_bp
     from app.routes.compte.routes import compte_bp
+    from app.routes.recherche import recherche_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(catalogue_bp)
@@ -352,5 +237,6 @@ def create_app():
     app.register_blueprint(paiement_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(compte_bp)
+    app.register_blueprint(recherche_bp)
 
     return app
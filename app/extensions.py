@@ -2,8 +2,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
+from app.utils.lecture_seule import SessionRoutee
 
-db = SQLAlchemy()
+# Session routée : GET marqués @lecture_seule -> moteur en lecture seule
+db = SQLAlchemy(session_options={"class_": SessionRoutee})
 login_manager = LoginManager()
 # ───────────────────────────────────────────
 # 🔐 Protection CSRF (Cross-Site Request Forgery)
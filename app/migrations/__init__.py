@@ -0,0 +1,43 @@
+"""
+Migrations SQLite versionnées.
+Expose le runner, la liste des migrations et la commande CLI `flask db-migrate`.
+"""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.extensions import db
+from .runner import run_migrations
+from .steps import MIGRATIONS, HOT_QUERIES
+
+
+@click.command("db-migrate")
+@click.option("--dry-run", is_flag=True, help="Liste les migrations en attente sans rien appliquer.")
+@click.option("--no-backup", is_flag=True, help="N'effectue pas de backup avant migration.")
+@click.option(
+    "--explain/--no-explain",
+    default=True,
+    show_default=True,
+    help="Affiche EXPLAIN QUERY PLAN des requêtes chaudes avant et après.",
+)
+@with_appcontext
+def db_migrate_command(dry_run, no_backup, explain):
+    """Applique les migrations SQLite en attente (table schema_version)."""
+    db_path = db.engine.url.database
+    if db.engine.url.get_backend_name() != "sqlite" or not db_path:
+        click.echo("❌ db-migrate ne gère que les bases SQLite fichier.")
+        return
+
+    applied = run_migrations(
+        db_path,
+        MIGRATIONS,
+        backup=not no_backup,
+        dry_run=dry_run,
+        queries=HOT_QUERIES if explain else None,
+        echo=click.echo,
+    )
+    if applied and not dry_run:
+        current_app.logger.info(
+            f"[MIGRATE] {len(applied)} migration(s) appliquée(s) : "
+            f"{', '.join(str(m.version) for m in applied)}"
+        )
@@ -0,0 +1,194 @@
+"""
+Moteur de migrations SQLite versionnées.
+
+Généralise scripts/migrate_bloc4_sqlite.py :
+- une table `schema_version` mémorise les versions appliquées,
+- backup de la base AVANT toute migration en attente,
+- chaque migration s'exécute dans sa propre transaction (DDL compris),
+  avec l'insertion de sa ligne de version → tout ou rien.
+
+Les helpers (table_exists, column_exists, add_column, create_index…) rendent
+chaque étape idempotente : une base créée via db.create_all() ou migrée
+"à la main" peut être mise à niveau sans erreur.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+
+# ───────────────────────────────────────────
+# 🔍 Introspection
+# ───────────────────────────────────────────
+def table_exists(cur, name: str) -> bool:
+    cur.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name=?;", (name,))
+    return cur.fetchone() is not None
+
+
+def column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(f"PRAGMA table_info({table});")
+    cols = [row[1] for row in cur.fetchall()]  # row[1] = name
+    return column in cols
+
+
+def index_exists(cur, name: str) -> bool:
+    cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?;", (name,))
+    return cur.fetchone() is not None
+
+
+# ───────────────────────────────────────────
+# 🧱 Opérations idempotentes
+# ───────────────────────────────────────────
+def add_column(cur, table: str, column: str, ddl: str, echo=print):
+    """ALTER TABLE … ADD COLUMN si la colonne est absente (et la table présente)."""
+    if not table_exists(cur, table) or column_exists(cur, table, column):
+        return False
+    cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl};")
+    echo(f"➕ Ajout colonne: {table}.{column}")
+    return True
+
+
+def create_index(cur, name: str, table: str, columns, unique=False, echo=print):
+    """CREATE [UNIQUE] INDEX si l'index est absent (et la table et ses colonnes présentes)."""
+    if not table_exists(cur, table) or index_exists(cur, name):
+        return False
+    # Colonne renommée par une migration ultérieure (ex. vin.prix -> prix_cents)
+    if not all(column_exists(cur, table, c) for c in columns):
+        return False
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cur.execute(f"CREATE {kind} {name} ON {table}({', '.join(columns)});")
+    echo(f"📌 Création index: {name}")
+    return True
+
+
+# ───────────────────────────────────────────
+# 📜 Déclaration d'une migration
+# ───────────────────────────────────────────
+class Migration:
+    """Une étape versionnée : `apply(cur, echo)` reçoit un curseur sqlite3."""
+
+    def __init__(self, version, name, apply):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+# ───────────────────────────────────────────
+# 💾 Backup + table de versions
+# ───────────────────────────────────────────
+def backup_db(db_path: str) -> str:
+    """Copie cohérente via l'API backup de SQLite (sûre même en mode WAL)."""
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    backup_path = f"{db_path}.backup_{ts}"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(backup_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return backup_path
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL
+        );
+    """)
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_version;")}
+
+
+def pending_migrations(conn, migrations):
+    done = applied_versions(conn)
+    return [m for m in sorted(migrations, key=lambda m: m.version) if m.version not in done]
+
+
+# ───────────────────────────────────────────
+# 🔎 EXPLAIN QUERY PLAN
+# ───────────────────────────────────────────
+def explain(conn, queries, echo=print):
+    """Affiche le plan SQLite de chaque requête chaude (SCAN = parcours complet)."""
+    for label, (sql, params) in queries.items():
+        echo(f"  • {label}")
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error as e:
+            echo(f"      (indisponible : {e})")
+            continue
+        for row in rows:
+            echo(f"      {row[-1]}")
+
+
+# ───────────────────────────────────────────
+# 🚀 Exécution
+# ───────────────────────────────────────────
+def run_migrations(db_path, migrations, backup=True, dry_run=False, queries=None, echo=print):
+    """
+    Applique les migrations en attente sur `db_path`.
+    Retourne la liste des migrations appliquées (ou à appliquer si dry_run).
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"DB introuvable: {db_path}")
+
+    # isolation_level=None : on pilote BEGIN/COMMIT nous-mêmes (DDL inclus)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys=ON;")
+
+    try:
+        pending = pending_migrations(conn, migrations)
+        if not pending:
+            echo("✅ Schéma à jour, aucune migration en attente.")
+            return []
+
+        for m in pending:
+            echo(f"⏳ En attente : {m.version:04d} {m.name}")
+        if dry_run:
+            return pending
+
+        if queries:
+            echo("🔎 Plans AVANT migration :")
+            explain(conn, queries, echo)
+
+        backup_path = None
+        if backup:
+            backup_path = backup_db(db_path)
+            echo(f"✅ Backup créé: {backup_path}")
+
+        cur = conn.cursor()
+        for m in pending:
+            try:
+                cur.execute("BEGIN;")
+                m.apply(cur, echo)
+                cur.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?);",
+                    (m.version, m.name, datetime.utcnow().isoformat(sep=" ")),
+                )
+                cur.execute("COMMIT;")
+                echo(f"✅ Migration {m.version:04d} appliquée ({m.name}).")
+            except Exception as e:
+                cur.execute("ROLLBACK;")
+                echo(f"❌ ERREUR migration {m.version:04d}, rollback effectué.")
+                echo(f"   {type(e).__name__}: {e}")
+                if backup_path:
+                    echo(f"   Backup dispo: {backup_path}")
+                raise
+
+        # Statistiques à jour pour le planificateur après création d'index
+        conn.execute("ANALYZE;")
+
+        if queries:
+            echo("🔎 Plans APRÈS migration :")
+            explain(conn, queries, echo)
+
+        return pending
+    finally:
+        conn.close()
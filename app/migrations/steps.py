@@ -0,0 +1,512 @@
+"""
+Liste ordonnée des migrations du schéma SQLite.
+
+Règles :
+- Ne JAMAIS modifier une migration déjà déployée : en ajouter une nouvelle.
+- Chaque étape reste idempotente (helpers du runner), pour les bases
+  créées via db.create_all() qui possèdent déjà tout ou partie du schéma.
+"""
+import sqlite3
+from decimal import Decimal, ROUND_HALF_UP
+
+from app.migrations.runner import Migration, table_exists, column_exists, add_column, create_index
+
+
+# ───────────────────────────────────────────
+# 0001 — Bloc 4 : Stripe (idempotence event.id + refund)
+# Reprise de scripts/migrate_bloc4_sqlite.py
+# ───────────────────────────────────────────
+def _0001_bloc4_stripe(cur, echo):
+    if not table_exists(cur, "commandes"):
+        raise RuntimeError("Table 'commandes' introuvable. Vérifie que tu pointes la bonne DB.")
+
+    add_column(cur, "commandes", "stripe_payment_intent_id", "VARCHAR(255)", echo)
+    # SQLite n'a pas de vrai BOOL -> INTEGER 0/1
+    add_column(cur, "commandes", "refund_effectue", "INTEGER NOT NULL DEFAULT 0", echo)
+    add_column(cur, "commandes", "stripe_refund_id", "VARCHAR(255)", echo)
+    add_column(cur, "commandes", "date_refund", "DATETIME", echo)
+
+    create_index(cur, "ix_commandes_stripe_payment_intent_id", "commandes", ["stripe_payment_intent_id"], echo=echo)
+    create_index(cur, "ix_commandes_stripe_refund_id", "commandes", ["stripe_refund_id"], echo=echo)
+
+    if not table_exists(cur, "stripe_events"):
+        cur.execute("""
+            CREATE TABLE stripe_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id VARCHAR(255) NOT NULL,
+                event_type VARCHAR(255),
+                stripe_session_id VARCHAR(255),
+                commande_id INTEGER,
+                created_at DATETIME NOT NULL
+            );
+        """)
+        echo("🧱 Création table: stripe_events")
+
+    # Une base issue de db.create_all() porte déjà ix_stripe_events_event_id (UNIQUE)
+    if not _has_unique_index_on(cur, "stripe_events", "event_id"):
+        create_index(cur, "ux_stripe_events_event_id", "stripe_events", ["event_id"], unique=True, echo=echo)
+    create_index(cur, "ix_stripe_events_stripe_session_id", "stripe_events", ["stripe_session_id"], echo=echo)
+    create_index(cur, "ix_stripe_events_commande_id", "stripe_events", ["commande_id"], echo=echo)
+
+
+def _has_unique_index_on(cur, table, column):
+    cur.execute(f"PRAGMA index_list({table});")
+    for row in cur.fetchall():
+        name, unique = row[1], row[2]
+        if not unique:
+            continue
+        cur.execute(f"PRAGMA index_info({name});")
+        cols = [r[2] for r in cur.fetchall()]
+        if cols == [column]:
+            return True
+    return False
+
+
+# ───────────────────────────────────────────
+# 0002 — Colonnes ajoutées "à la main" depuis le Bloc 4
+# (is_active, hygiène Bloc 5, emails transactionnels, profil client)
+# ───────────────────────────────────────────
+def _0002_colonnes_modeles(cur, echo):
+    add_column(cur, "vin", "is_active", "BOOLEAN NOT NULL DEFAULT 1", echo)
+
+    add_column(cur, "commandes", "date_abandon", "DATETIME", echo)
+    add_column(cur, "commandes", "abandon_motif", "VARCHAR(50)", echo)
+    add_column(cur, "commandes", "email_paiement_envoye", "BOOLEAN NOT NULL DEFAULT 0", echo)
+    add_column(cur, "commandes", "date_email_paiement", "DATETIME", echo)
+    add_column(cur, "commandes", "email_completion_envoye", "BOOLEAN NOT NULL DEFAULT 0", echo)
+    add_column(cur, "commandes", "date_email_completion", "DATETIME", echo)
+
+    add_column(cur, "users", "is_admin", "BOOLEAN DEFAULT 0", echo)
+    add_column(cur, "users", "updated_at", "DATETIME", echo)
+    for col, ddl in (
+        ("prenom", "VARCHAR(80)"),
+        ("nom", "VARCHAR(80)"),
+        ("adresse", "VARCHAR(255)"),
+        ("code_postal", "VARCHAR(10)"),
+        ("ville", "VARCHAR(80)"),
+        ("telephone", "VARCHAR(30)"),
+    ):
+        add_column(cur, "users", col, ddl, echo)
+
+    add_column(cur, "paniers_sauvegardes", "date_commande", "DATETIME", echo)
+
+
+# ───────────────────────────────────────────
+# 0003 — Index des requêtes chaudes
+# (mêmes noms que les db.Index déclarés dans les modèles)
+# ───────────────────────────────────────────
+def _0003_index_requetes_chaudes(cur, echo):
+    create_index(cur, "ix_vin_active_couleur_nom", "vin", ["is_active", "couleur", "nom"], echo=echo)
+    create_index(cur, "ix_vin_active_stock_prix", "vin", ["is_active", "stock", "prix"], echo=echo)
+
+    create_index(cur, "ix_commandes_statut_date", "commandes", ["statut", "date_commande"], echo=echo)
+    create_index(cur, "ix_commandes_user_statut", "commandes", ["user_id", "statut"], echo=echo)
+    create_index(cur, "ix_commandes_email_client", "commandes", ["email_client"], echo=echo)
+
+    create_index(cur, "ix_commandes_produits_commande_id", "commandes_produits", ["commande_id"], echo=echo)
+    create_index(cur, "ix_commandes_produits_produit_id", "commandes_produits", ["produit_id"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0004 — Recherche plein texte (FTS5) maintenue par triggers
+# rowid = vin.id ; domaine dénormalisé dans l'index
+# ───────────────────────────────────────────
+def _0004_recherche_fts5(cur, echo):
+    if not table_exists(cur, "vin_fts"):
+        # remove_diacritics : "rose" trouve "rosé" ; prefix : autocomplétion rapide
+        cur.execute("""
+            CREATE VIRTUAL TABLE vin_fts USING fts5(
+                nom, domaine, typologie, accord, annee, description,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+        """)
+        echo("🧱 Création table: vin_fts (FTS5)")
+
+    ligne_fts = """
+        INSERT INTO vin_fts (rowid, nom, domaine, typologie, accord, annee, description)
+        SELECT v.id, v.nom, COALESCE(d.nom, ''), COALESCE(v.typologie, ''),
+               COALESCE(v.accord, ''), COALESCE(CAST(v.annee AS TEXT), ''),
+               COALESCE(v.description, '')
+        FROM vin v LEFT JOIN domaine d ON d.id = v.domaine_id
+    """
+
+    cur.execute("DROP TRIGGER IF EXISTS vin_fts_ai;")
+    cur.execute(f"""
+        CREATE TRIGGER vin_fts_ai AFTER INSERT ON vin BEGIN
+            {ligne_fts} WHERE v.id = new.id;
+        END;
+    """)
+    # Uniquement les colonnes indexées : un décrément de stock ne réindexe rien
+    cur.execute("DROP TRIGGER IF EXISTS vin_fts_au;")
+    cur.execute(f"""
+        CREATE TRIGGER vin_fts_au
+        AFTER UPDATE OF nom, domaine_id, typologie, accord, annee, description ON vin BEGIN
+            DELETE FROM vin_fts WHERE rowid = old.id;
+            {ligne_fts} WHERE v.id = new.id;
+        END;
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS vin_fts_ad;")
+    cur.execute("""
+        CREATE TRIGGER vin_fts_ad AFTER DELETE ON vin BEGIN
+            DELETE FROM vin_fts WHERE rowid = old.id;
+        END;
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS domaine_fts_au;")
+    cur.execute("""
+        CREATE TRIGGER domaine_fts_au AFTER UPDATE OF nom ON domaine BEGIN
+            UPDATE vin_fts SET domaine = new.nom
+            WHERE rowid IN (SELECT id FROM vin WHERE domaine_id = new.id);
+        END;
+    """)
+    echo("⚙️  Triggers vin_fts_ai / vin_fts_au / vin_fts_ad / domaine_fts_au")
+
+    # Remplissage initial (idempotent)
+    cur.execute("DELETE FROM vin_fts;")
+    cur.execute(ligne_fts + ";")
+    cur.execute("INSERT INTO vin_fts (vin_fts) VALUES ('optimize');")
+    echo("📚 Index vin_fts reconstruit")
+
+
+# ───────────────────────────────────────────
+# 0005 — Liste admin des commandes (pagination keyset sans filtre statut)
+# ───────────────────────────────────────────
+def _0005_index_commandes_date(cur, echo):
+    create_index(cur, "ix_commandes_date_commande", "commandes", ["date_commande"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0006 — Panier courant côté serveur (backend SQLite du panier_store)
+# ───────────────────────────────────────────
+def _0006_paniers_session(cur, echo):
+    if not table_exists(cur, "paniers_session"):
+        cur.execute("""
+            CREATE TABLE paniers_session (
+                id VARCHAR(64) PRIMARY KEY,
+                lignes_json TEXT NOT NULL DEFAULT '[]',
+                updated_at DATETIME NOT NULL,
+                expires_at DATETIME NOT NULL
+            );
+        """)
+        echo("🧱 Création table: paniers_session")
+    create_index(cur, "ix_paniers_session_expires_at", "paniers_session", ["expires_at"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0007 — Réservations de stock (holds checkout → vente / libération)
+# ───────────────────────────────────────────
+def _0007_reservations(cur, echo):
+    if not table_exists(cur, "reservations"):
+        cur.execute("""
+            CREATE TABLE reservations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                commande_id INTEGER NOT NULL REFERENCES commandes(id),
+                vin_id INTEGER NOT NULL REFERENCES vin(id),
+                quantite INTEGER NOT NULL,
+                statut VARCHAR(20) NOT NULL DEFAULT 'active',
+                created_at DATETIME NOT NULL,
+                expires_at DATETIME NOT NULL
+            );
+        """)
+        echo("🧱 Création table: reservations")
+    create_index(cur, "ix_reservations_commande_id", "reservations", ["commande_id"], echo=echo)
+    create_index(cur, "ix_reservations_vin_statut_expires", "reservations",
+                 ["vin_id", "statut", "expires_at", "quantite"], echo=echo)
+    create_index(cur, "ix_reservations_statut_expires", "reservations", ["statut", "expires_at"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0008 — Webhook Stripe asynchrone (file de traitement dans stripe_events)
+# Les événements existants ont été traités en synchrone -> statut 'done'
+# ───────────────────────────────────────────
+def _0008_stripe_events_file(cur, echo):
+    add_column(cur, "stripe_events", "payload", "TEXT", echo)
+    add_column(cur, "stripe_events", "statut", "VARCHAR(20) NOT NULL DEFAULT 'done'", echo)
+    add_column(cur, "stripe_events", "attempts", "INTEGER NOT NULL DEFAULT 0", echo)
+    add_column(cur, "stripe_events", "next_attempt_at", "DATETIME", echo)
+    add_column(cur, "stripe_events", "locked_at", "DATETIME", echo)
+    add_column(cur, "stripe_events", "processed_at", "DATETIME", echo)
+    add_column(cur, "stripe_events", "last_error", "TEXT", echo)
+    create_index(cur, "ix_stripe_events_statut_next_attempt", "stripe_events", ["statut", "next_attempt_at"], echo=echo)
+
+
+
+# ───────────────────────────────────────────
+# 0009 — Outbox des emails transactionnels
+# ───────────────────────────────────────────
+def _0009_email_outbox(cur, echo):
+    if not table_exists(cur, "email_outbox"):
+        cur.execute("""
+            CREATE TABLE email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cle VARCHAR(120) UNIQUE,
+                commande_id INTEGER,
+                subject VARCHAR(255) NOT NULL,
+                body TEXT NOT NULL,
+                sender VARCHAR(255),
+                recipients TEXT NOT NULL,
+                reply_to VARCHAR(255),
+                statut VARCHAR(20) NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NOT NULL,
+                locked_at DATETIME,
+                locked_by VARCHAR(32),
+                last_error TEXT,
+                created_at DATETIME NOT NULL,
+                sent_at DATETIME
+            );
+        """)
+        echo("🧱 Création table: email_outbox")
+    create_index(cur, "ix_email_outbox_statut_next_attempt", "email_outbox", ["statut", "next_attempt_at"], echo=echo)
+    create_index(cur, "ix_email_outbox_commande_id", "email_outbox", ["commande_id"], echo=echo)
+    create_index(cur, "ix_email_outbox_locked_by", "email_outbox", ["locked_by"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0010 — Cache du statut de paiement (page d'attente)
+# ───────────────────────────────────────────
+def _0010_statuts_paiement(cur, echo):
+    if not table_exists(cur, "statuts_paiement"):
+        cur.execute("""
+            CREATE TABLE statuts_paiement (
+                stripe_session_id VARCHAR(255) PRIMARY KEY,
+                commande_id INTEGER,
+                statut VARCHAR(50) NOT NULL,
+                updated_at DATETIME NOT NULL,
+                expires_at DATETIME NOT NULL,
+                stripe_verifie_a DATETIME
+            );
+        """)
+        echo("🧱 Création table: statuts_paiement")
+    create_index(cur, "ix_statuts_paiement_expires_at", "statuts_paiement", ["expires_at"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0011 — File des remboursements Stripe
+# ───────────────────────────────────────────
+def _0011_refunds(cur, echo):
+    if not table_exists(cur, "refunds"):
+        cur.execute("""
+            CREATE TABLE refunds (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                commande_id INTEGER NOT NULL UNIQUE REFERENCES commandes(id),
+                payment_intent_id VARCHAR(255) NOT NULL,
+                idempotency_key VARCHAR(64) NOT NULL UNIQUE,
+                motif VARCHAR(50),
+                statut VARCHAR(20) NOT NULL DEFAULT 'requested',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NOT NULL,
+                locked_at DATETIME,
+                last_error TEXT,
+                stripe_refund_id VARCHAR(255),
+                created_at DATETIME NOT NULL,
+                completed_at DATETIME
+            );
+        """)
+        echo("🧱 Création table: refunds")
+    create_index(cur, "ix_refunds_statut_next_attempt", "refunds", ["statut", "next_attempt_at"], echo=echo)
+
+    # Remboursements synchrones échoués avant la file : en 'failed', visibles
+    # et relançables par `flask refunds reconcile` (jamais relancés d'office)
+    cur.execute("""
+        INSERT OR IGNORE INTO refunds
+            (commande_id, payment_intent_id, idempotency_key, motif, statut, next_attempt_at, last_error, created_at)
+        SELECT id, stripe_payment_intent_id, 'refund-' || id, statut, 'failed',
+               CURRENT_TIMESTAMP, 'Antérieur à la file des remboursements', CURRENT_TIMESTAMP
+        FROM commandes
+        WHERE statut IN ('annulée', 'echec_stock')
+          AND refund_effectue = 0
+          AND stripe_payment_intent_id IS NOT NULL
+    """)
+    if cur.rowcount:
+        echo(f"↩️  {cur.rowcount} remboursement(s) non aboutis repris en 'failed'")
+
+
+# ───────────────────────────────────────────
+# 0012 — Montants en centimes entiers (INTEGER) au lieu de REAL
+# vin.prix -> prix_cents, commandes.total_ttc -> total_ttc_cents,
+# commandes_produits.prix_unitaire -> prix_unitaire_cents
+# ───────────────────────────────────────────
+_MONTANTS_CENTIMES = (
+    ("vin", "prix", "prix_cents", "INTEGER NOT NULL DEFAULT 0"),
+    ("commandes", "total_ttc", "total_ttc_cents", "INTEGER"),
+    ("commandes_produits", "prix_unitaire", "prix_unitaire_cents", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def _en_centimes(valeur):
+    """REAL -> centimes, via la représentation décimale la plus courte (18.5 -> 1850)."""
+    d = Decimal(repr(float(valeur))) * 100
+    return int(d.quantize(Decimal("1"), rounding=ROUND_HALF_UP)), d != d.to_integral_value()
+
+
+def _0012_montants_centimes(cur, echo):
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        # DROP COLUMN indispensable : l'ancienne colonne NOT NULL bloquerait les INSERT de l'ORM
+        raise RuntimeError(f"SQLite >= 3.35 requis (DROP COLUMN), version : {sqlite3.sqlite_version}")
+
+    for table, ancienne, nouvelle, ddl in _MONTANTS_CENTIMES:
+        if not table_exists(cur, table):
+            continue
+        add_column(cur, table, nouvelle, ddl, echo)
+        if not column_exists(cur, table, ancienne):
+            continue
+
+        cur.execute(f"SELECT id, {ancienne} FROM {table} WHERE {ancienne} IS NOT NULL;")
+        lignes, arrondis = [], 0
+        for id_, valeur in cur.fetchall():
+            centimes, arrondi = _en_centimes(valeur)
+            arrondis += arrondi
+            lignes.append((centimes, id_))
+        cur.executemany(f"UPDATE {table} SET {nouvelle} = ? WHERE id = ?;", lignes)
+        echo(f"💶 {table}.{ancienne} -> {nouvelle} : {len(lignes)} ligne(s) converties")
+        if arrondis:
+            echo(f"⚠️  {arrondis} montant(s) de {table}.{ancienne} avaient des fractions de centime (arrondies)")
+
+        if ancienne == "prix":
+            cur.execute("DROP INDEX IF EXISTS ix_vin_active_stock_prix;")
+        cur.execute(f"ALTER TABLE {table} DROP COLUMN {ancienne};")
+        echo(f"➖ Suppression colonne: {table}.{ancienne}")
+
+    create_index(cur, "ix_vin_active_stock_prix_cents", "vin", ["is_active", "stock", "prix_cents"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0013 — Lignes de commande : FK vers vin + nom figé
+# SQLite n'ajoute pas de FK à une colonne existante : table reconstruite
+# ───────────────────────────────────────────
+def _0013_lignes_fk_vin(cur, echo):
+    if not table_exists(cur, "commandes_produits"):
+        return
+    cur.execute("PRAGMA foreign_key_list(commandes_produits);")
+    fk_vin = any(row[2] == "vin" for row in cur.fetchall())   # row[2] = table référencée
+    if fk_vin and column_exists(cur, "commandes_produits", "nom_snapshot"):
+        return
+
+    nom = "COALESCE(cp.nom_snapshot, v.nom, 'Vin retiré du catalogue')" \
+        if column_exists(cur, "commandes_produits", "nom_snapshot") \
+        else "COALESCE(v.nom, 'Vin retiré du catalogue')"
+
+    cur.execute("DROP TABLE IF EXISTS commandes_produits_new;")
+    cur.execute("""
+        CREATE TABLE commandes_produits_new (
+            id INTEGER PRIMARY KEY,
+            commande_id INTEGER NOT NULL REFERENCES commandes(id),
+            produit_id INTEGER REFERENCES vin(id) ON DELETE SET NULL,
+            nom_snapshot VARCHAR(200) NOT NULL,
+            quantite INTEGER NOT NULL,
+            prix_unitaire_cents INTEGER NOT NULL
+        );
+    """)
+    cur.execute(f"""
+        INSERT INTO commandes_produits_new (id, commande_id, produit_id, nom_snapshot, quantite, prix_unitaire_cents)
+        SELECT cp.id, cp.commande_id, v.id, {nom}, cp.quantite, cp.prix_unitaire_cents
+        FROM commandes_produits cp
+        LEFT JOIN vin v ON v.id = cp.produit_id
+    """)
+    echo(f"🧾 {cur.rowcount} ligne(s) de commande recopiées (nom_snapshot renseigné)")
+
+    cur.execute("SELECT COUNT(*) FROM commandes_produits_new WHERE produit_id IS NULL;")
+    orphelines = cur.fetchone()[0]
+    if orphelines:
+        echo(f"⚠️  {orphelines} ligne(s) vers un vin supprimé : produit_id mis à NULL")
+
+    cur.execute("DROP TABLE commandes_produits;")
+    cur.execute("ALTER TABLE commandes_produits_new RENAME TO commandes_produits;")
+    echo("🔗 commandes_produits.produit_id -> vin.id (FK)")
+
+    create_index(cur, "ix_commandes_produits_commande_id", "commandes_produits", ["commande_id"], echo=echo)
+    create_index(cur, "ix_commandes_produits_produit_id", "commandes_produits", ["produit_id"], echo=echo)
+
+
+# ───────────────────────────────────────────
+# 0014 — Bail des tâches périodiques (sweeper des commandes abandonnées)
+# ───────────────────────────────────────────
+def _0014_taches_planifiees(cur, echo):
+    if not table_exists(cur, "taches_planifiees"):
+        cur.execute("""
+            CREATE TABLE taches_planifiees (
+                nom VARCHAR(50) PRIMARY KEY,
+                locked_by VARCHAR(64),
+                locked_until DATETIME,
+                last_run_at DATETIME,
+                last_result TEXT,
+                runs INTEGER NOT NULL DEFAULT 0,
+                total_rows INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        echo("🧱 Création table: taches_planifiees")
+
+
+MIGRATIONS = [
+    Migration(1, "bloc4_stripe", _0001_bloc4_stripe),
+    Migration(2, "colonnes_modeles", _0002_colonnes_modeles),
+    Migration(3, "index_requetes_chaudes", _0003_index_requetes_chaudes),
+    Migration(4, "recherche_fts5", _0004_recherche_fts5),
+    Migration(5, "index_commandes_date", _0005_index_commandes_date),
+    Migration(6, "paniers_session", _0006_paniers_session),
+    Migration(7, "reservations", _0007_reservations),
+    Migration(8, "stripe_events_file", _0008_stripe_events_file),
+    Migration(9, "email_outbox", _0009_email_outbox),
+    Migration(10, "statuts_paiement", _0010_statuts_paiement),
+    Migration(11, "refunds", _0011_refunds),
+    Migration(12, "montants_centimes", _0012_montants_centimes),
+    Migration(13, "lignes_fk_vin", _0013_lignes_fk_vin),
+    Migration(14, "taches_planifiees", _0014_taches_planifiees),
+]
+
+
+# ───────────────────────────────────────────
+# 🔎 Requêtes chaudes (EXPLAIN QUERY PLAN avant / après)
+# ───────────────────────────────────────────
+HOT_QUERIES = {
+    "vins.afficher_vins (vins actifs d'une couleur)": (
+        "SELECT id FROM vin WHERE is_active = 1 AND couleur = ? ORDER BY nom",
+        ("rouge",),
+    ),
+    "main.index (vin vedette)": (
+        "SELECT id FROM vin WHERE is_active = 1 AND stock > 0 ORDER BY prix_cents DESC LIMIT 1",
+        (),
+    ),
+    "mark_abandoned_orders (commandes expirées)": (
+        "SELECT id FROM commandes WHERE statut = ? AND date_commande < ? ORDER BY id LIMIT 500",
+        ("en_attente", "2000-01-01 00:00:00"),
+    ),
+    "admin.commandes (par statut, récentes d'abord)": (
+        "SELECT id FROM commandes WHERE statut = ? ORDER BY date_commande DESC, id DESC LIMIT 51",
+        ("payé",),
+    ),
+    "admin.commandes (toutes, page keyset)": (
+        "SELECT id FROM commandes WHERE date_commande < ? OR (date_commande = ? AND id < ?) "
+        "ORDER BY date_commande DESC, id DESC LIMIT 51",
+        ("2100-01-01 00:00:00", "2100-01-01 00:00:00", 1),
+    ),
+    "admin.commandes (synthèse par statut)": (
+        "SELECT statut, count(id) FROM commandes GROUP BY statut",
+        (),
+    ),
+    "compte.commandes (commandes du client)": (
+        "SELECT id FROM commandes WHERE (user_id = ? OR email_client = ?) "
+        "AND statut IN ('payé', 'complétée', 'en_préparation', 'expédiée')",
+        (1, "client@example.com"),
+    ),
+    "stripe_webhook (lignes d'une commande)": (
+        "SELECT id FROM commandes_produits WHERE commande_id = ?",
+        (1,),
+    ),
+    "reservations (stock réservé d'un vin)": (
+        "SELECT SUM(quantite) FROM reservations WHERE vin_id = ? AND statut = 'active' AND expires_at > ?",
+        (1, "2000-01-01 00:00:00"),
+    ),
+    "admin.export_commandes (commandes ⨝ lignes ⟕ vin)": (
+        "SELECT c.id, cp.nom_snapshot, v.annee FROM commandes c "
+        "JOIN commandes_produits cp ON cp.commande_id = c.id "
+        "LEFT JOIN vin v ON v.id = cp.produit_id "
+        "WHERE c.statut = ? ORDER BY c.date_commande DESC, c.id DESC",
+        ("payé",),
+    ),
+    "admin.supprimer_vin (vin déjà commandé ?)": (
+        "SELECT id FROM commandes_produits WHERE produit_id = ? LIMIT 1",
+        (1,),
+    ),
+}
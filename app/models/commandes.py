@@ -1,11 +1,21 @@
 from app.extensions import db
+from app.utils.montant import MontantType
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 class Commande(db.Model):
 
 
 
     __tablename__ = 'commandes'
+    __table_args__ = (
+        # Sweeper Bloc 5 + liste admin (filtre statut, tri par date)
+        db.Index("ix_commandes_statut_date", "statut", "date_commande"),
+        # Espace client (commandes d'un utilisateur par statut)
+        db.Index("ix_commandes_user_statut", "user_id", "statut"),
+        # Liste admin sans filtre de statut (tri date desc, pagination keyset)
+        db.Index("ix_commandes_date_commande", "date_commande"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -13,7 +23,7 @@ class Commande(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=True)
 
     # Données du client (toujours requises même si non connecté)
-    email_client = db.Column(db.String(120), nullable=True)
+    email_client = db.Column(db.String(120), nullable=True, index=True)
     prenom_client = db.Column(db.String(80), nullable=True)
     nom_client = db.Column(db.String(80), nullable=True)
 
@@ -29,7 +39,7 @@ class Commande(db.Model):
     ville_facturation = db.Column(db.String(80))
 
     # Infos de commande
-    total_ttc = db.Column(db.Float, nullable=True)
+    total_ttc_cents = db.Column(MontantType, nullable=True)   # centimes (produits + livraison)
     devise = db.Column(db.String(3), default='EUR')
     stripe_session_id = db.Column(db.String)
 
@@ -58,18 +68,29 @@ class Commande(db.Model):
     abandon_motif = db.Column(db.String(50), nullable=True)  # ex: "ttl_expired"
     
     # Relation vers les produits
-    produits = db.relationship('CommandeProduit', backref='commande', lazy=True)
+    # selectin : une seule requête IN (...) pour les lignes de toutes les commandes chargées
+    # (avec_lignes() : commandes + lignes + vins en UNE requête jointe)
+    produits = db.relationship('CommandeProduit', back_populates='commande', lazy='selectin')
 
 class CommandeProduit(db.Model):
     __tablename__ = 'commandes_produits'
 
     id = db.Column(db.Integer, primary_key=True)
-    commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), nullable=False)
-    produit_id = db.Column(db.Integer, nullable=False)
+    commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), nullable=False, index=True)
+    # NULL : vin supprimé du catalogue avant la FK (la ligne garde nom_snapshot)
+    produit_id = db.Column(db.Integer, db.ForeignKey('vin.id', ondelete='SET NULL'), nullable=True, index=True)
+    nom_snapshot = db.Column(db.String(200), nullable=False)   # nom du vin figé au checkout
     quantite = db.Column(db.Integer, nullable=False)
-    prix_unitaire = db.Column(db.Float, nullable=False)
-
+    prix_unitaire_cents = db.Column(MontantType, nullable=False)   # centimes, figé au checkout
 
+    commande = db.relationship('Commande', back_populates='produits')
+    vin = db.relationship('Vin', back_populates='lignes_commande')
 
+    @property
+    def total_cents(self):
+        return self.prix_unitaire_cents * self.quantite
 
 
+def avec_lignes():
+    """Option de chargement : commande + lignes + vin en UNE requête (LEFT OUTER JOIN)."""
+    return joinedload(Commande.produits).joinedload(CommandeProduit.vin)
@@ -7,7 +7,9 @@ class Domaine(db.Model):
     nom = db.Column(db.String(200), nullable=False)
 
     # Relation vers Vin (ne crée rien en BDD, juste pratique)
-    vins = db.relationship('Vin', backref='domaine', lazy=True)
+    # Vin.domaine est chargé par jointure : toute liste de vins affiche le domaine
+    # sans requête supplémentaire par ligne.
+    vins = db.relationship('Vin', backref=db.backref('domaine', lazy='joined'), lazy=True)
 
     def __repr__(self):
         return f"<Domaine {self.nom}>"
@@ -0,0 +1,38 @@
+from app.extensions import db
+from datetime import datetime
+
+class EmailOutbox(db.Model):
+    """
+    Email transactionnel en attente d'envoi (pattern outbox).
+    Écrit dans la même transaction que le changement métier ; envoyé par
+    app/utils/email_outbox.py. statut : pending -> sending -> sent | dead.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Sender : messages échus, dans l'ordre
+        db.Index("ix_email_outbox_statut_next_attempt", "statut", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Clé d'unicité métier (ex. "paiement:12") : un seul message par événement
+    cle = db.Column(db.String(120), unique=True, nullable=True)
+    commande_id = db.Column(db.Integer, nullable=True, index=True)
+
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    sender = db.Column(db.String(255), nullable=True)
+    recipients = db.Column(db.Text, nullable=False)   # adresses séparées par des virgules
+    reply_to = db.Column(db.String(255), nullable=True)
+
+    statut = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(32), nullable=True, index=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.statut} {self.subject!r}>'
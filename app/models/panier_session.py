@@ -0,0 +1,18 @@
+from app.extensions import db
+from datetime import datetime
+
+class PanierSession(db.Model):
+    """
+    Panier courant côté serveur (backend SQLite du panier_store).
+    La session ne contient que l'identifiant opaque ; les lignes sont
+    stockées en JSON compact : [[vin_id, qty], ...].
+    """
+    __tablename__ = 'paniers_session'
+
+    id = db.Column(db.String(64), primary_key=True)
+    lignes_json = db.Column(db.Text, nullable=False, default='[]')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<PanierSession {self.id}>'
@@ -0,0 +1,36 @@
+from app.extensions import db
+from datetime import datetime
+
+class Remboursement(db.Model):
+    """
+    Remboursement Stripe à exécuter (file de travail).
+    Demandé dans la même transaction que l'annulation / l'echec_stock ;
+    exécuté par app/utils/remboursements.py.
+    statut : requested -> in_flight -> succeeded | failed.
+    """
+    __tablename__ = 'refunds'
+    __table_args__ = (
+        # Exécuteur : demandes échues, dans l'ordre
+        db.Index("ix_refunds_statut_next_attempt", "statut", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Un seul remboursement (total) par commande
+    commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), unique=True, nullable=False)
+    payment_intent_id = db.Column(db.String(255), nullable=False)
+    # Clé d'idempotence Stripe, dérivée de la commande ("refund-<id>")
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    motif = db.Column(db.String(50), nullable=True)
+
+    statut = db.Column(db.String(20), nullable=False, default='requested')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    stripe_refund_id = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Remboursement commande={self.commande_id} {self.statut}>'
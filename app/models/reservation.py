@@ -0,0 +1,30 @@
+from app.extensions import db
+from datetime import datetime
+
+class Reservation(db.Model):
+    """
+    Réservation de stock (une ligne par vin et par commande) posée au checkout.
+
+    statut : 'active' (bloque le stock jusqu'à expires_at),
+             'convertie' (vente confirmée par Stripe, stock décrémenté),
+             'liberee' (commande abandonnée / en échec / hold expiré).
+    Stock disponible = vin.stock - SUM(quantite des réservations actives non expirées).
+    """
+    __tablename__ = 'reservations'
+    __table_args__ = (
+        # Agrégat "stock réservé" par vin (couvrant : vin_id, statut, expires_at, quantite)
+        db.Index("ix_reservations_vin_statut_expires", "vin_id", "statut", "expires_at", "quantite"),
+        # Sweeper : holds actifs expirés
+        db.Index("ix_reservations_statut_expires", "statut", "expires_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), nullable=False, index=True)
+    vin_id = db.Column(db.Integer, db.ForeignKey('vin.id'), nullable=False)
+    quantite = db.Column(db.Integer, nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='active')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<Reservation commande={self.commande_id} vin={self.vin_id} x{self.quantite} {self.statut}>'
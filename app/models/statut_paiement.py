@@ -0,0 +1,20 @@
+from app.extensions import db
+from datetime import datetime
+
+class StatutPaiement(db.Model):
+    """
+    Cache court du statut de paiement par session Stripe (page d'attente).
+    Alimenté par le webhook et par le fallback Stripe ; stripe_verifie_a
+    limite ce fallback à un appel par session et par intervalle.
+    """
+    __tablename__ = 'statuts_paiement'
+
+    stripe_session_id = db.Column(db.String(255), primary_key=True)
+    commande_id = db.Column(db.Integer, nullable=True)
+    statut = db.Column(db.String(50), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    stripe_verifie_a = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<StatutPaiement {self.stripe_session_id} {self.statut}>'
@@ -3,10 +3,23 @@ from app.extensions import db
 
 class StripeEvent(db.Model):
     __tablename__ = "stripe_events"
+    __table_args__ = (
+        # File de traitement asynchrone (cf. app/utils/stripe_events.py)
+        db.Index("ix_stripe_events_statut_next_attempt", "statut", "next_attempt_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.String(255), unique=True, nullable=False, index=True)
     event_type = db.Column(db.String(255), nullable=True)
     stripe_session_id = db.Column(db.String(255), nullable=True, index=True)
     commande_id = db.Column(db.Integer, nullable=True, index=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Traitement asynchrone : pending -> processing -> done | failed
+    payload = db.Column(db.Text, nullable=True)
+    statut = db.Column(db.String(20), nullable=False, default="done")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
@@ -0,0 +1,24 @@
+from app.extensions import db
+
+class TachePlanifiee(db.Model):
+    """
+    Bail d'une tâche périodique partagée entre workers (une ligne par tâche).
+    Un seul process l'exécute à la fois : celui dont l'UPDATE conditionnel
+    a posé locked_by / locked_until (cf. app/utils/abandons.py).
+    """
+    __tablename__ = 'taches_planifiees'
+
+    nom = db.Column(db.String(50), primary_key=True)
+
+    # Bail : détenteur et échéance (un bail expiré est repris par un autre worker)
+    locked_by = db.Column(db.String(64), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+
+    # Dernière exécution (synthèse JSON) et compteurs cumulés
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_result = db.Column(db.Text, nullable=True)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TachePlanifiee {self.nom} runs={self.runs}>"
@@ -1,14 +1,21 @@
 from app.extensions import db
+from app.utils.montant import MontantType
 
 class Vin(db.Model):
     __tablename__ = "vin"
+    __table_args__ = (
+        # Listes par couleur (vins actifs triés par nom)
+        db.Index("ix_vin_active_couleur_nom", "is_active", "couleur", "nom"),
+        # Vin(s) vedette : actifs, en stock, par prix
+        db.Index("ix_vin_active_stock_prix_cents", "is_active", "stock", "prix_cents"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nom = db.Column(db.String(200), nullable=False)
     domaine_id = db.Column(db.Integer, db.ForeignKey("domaine.id"), nullable=False)
     annee = db.Column(db.Integer)
     couleur = db.Column(db.String(50))
-    prix = db.Column(db.Float, nullable=False)
+    prix_cents = db.Column(MontantType, nullable=False)   # centimes d'euro
     stock = db.Column(db.Integer, default=0)
     photo = db.Column(db.String(255))
     description = db.Column(db.Text)
@@ -17,5 +24,8 @@ class Vin(db.Model):
 
     is_active = db.Column(db.Boolean, nullable=False, default=True)
 
+    # Lignes de commande de ce vin (chargées à la demande uniquement)
+    lignes_commande = db.relationship('CommandeProduit', back_populates='vin', passive_deletes=True)
+
     def __repr__(self):
         return f"<Vin {self.nom} ({self.annee})>"
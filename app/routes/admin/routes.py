@@ -1,20 +1,25 @@
+import csv
+import io
 from functools import wraps
-import os, stripe
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import func, or_, and_, select
+from sqlalchemy.orm import contains_eager
 
 from app.extensions import db
 from app.models.vin import Vin
 from app.models.domaine import Domaine
-from app.models.commandes import Commande, CommandeProduit
-from app.utils.stripe_tools import safe_refund, TRANSITIONS_ADMIN, LABELS_STATUT
-from app.utils.email import send_plain_email
+from app.models.commandes import Commande, CommandeProduit, avec_lignes
+from app.utils.stripe_tools import TRANSITIONS_ADMIN, LABELS_STATUT
+from app.utils import email_outbox, stripe_client, remboursements
+from app.utils.catalogue_cache import bump_catalogue_version
+from app.utils.pagination import encoder_curseur, decoder_curseur
+from app.utils.lecture_seule import lecture_seule
+from app.utils.montant import Montant, euros
 
 from app.extensions import csrf
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
-
-
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 
@@ -42,12 +47,13 @@ def add_wine():
                 domaine_id=int(request.form["domaine_id"]),
                 couleur=request.form["couleur"],
                 annee=request.form.get("annee") or None,
-                prix=float(str(request.form["prix"]).replace(",", ".")),
+                prix_cents=Montant.depuis_euros(request.form["prix"]),
                 stock=int(request.form["stock"]),
                 photo=(request.form.get("photo") or "").strip() or None,
             )
             db.session.add(vin)
             db.session.commit()
+            bump_catalogue_version()
             flash("✅ Vin ajouté avec succès.", "success")
             return redirect(url_for("admin.add_wine"))
         except Exception as e:
@@ -57,19 +63,160 @@ def add_wine():
     return render_template("admin/add_wine.html", domaines=domaines, user=current_user)
 
 
+COMMANDES_PAGE_SIZE = 50
+
+
+def _filtres_commandes(args):
+    """Filtres de la liste admin lus dans la query-string (valeurs invalides ignorées)."""
+    def _date(name):
+        try:
+            return datetime.strptime(args.get(name, ""), "%Y-%m-%d")
+        except ValueError:
+            return None
+
+    return {
+        "statut": (args.get("statut") or "").strip() or None,
+        "email": (args.get("email") or "").strip() or None,
+        "du": _date("du"),
+        "au": _date("au"),
+    }
+
+
+def _conditions_commandes(filtres, avec_statut=True):
+    conds = []
+    if avec_statut and filtres["statut"]:
+        conds.append(Commande.statut == filtres["statut"])
+    if filtres["email"]:
+        # Préfixe en plage → utilise ix_commandes_email_client
+        conds.append(Commande.email_client >= filtres["email"])
+        conds.append(Commande.email_client < filtres["email"] + "\uffff")
+    if filtres["du"]:
+        conds.append(Commande.date_commande >= filtres["du"])
+    if filtres["au"]:
+        conds.append(Commande.date_commande < filtres["au"] + timedelta(days=1))
+    return conds
+
+
 @admin_bp.route("/commandes", methods=["GET"])
+@lecture_seule
 @login_required
 @admin_required
 def commandes():
-    commandes = Commande.query.order_by(Commande.date_commande.desc()).all()
+    filtres = _filtres_commandes(request.args)
+
+    # Page keyset sur (date_commande DESC, id DESC) : coût constant quel que soit l'historique
+    # SQLite classe les date_commande NULL (anciennes commandes) en dernier en DESC :
+    # elles forment le dernier segment, parcouru sur id seul (curseur date = None)
+    # Lignes + vins dans la même requête (LEFT OUTER JOIN sur la page keyset)
+    query = Commande.query.options(avec_lignes()).filter(*_conditions_commandes(filtres))
+    apres = decoder_curseur(request.args.get("apres"), 2)
+    if apres:
+        try:
+            id_apres = int(apres[1])
+            if apres[0] is None:
+                query = query.filter(Commande.date_commande.is_(None), Commande.id < id_apres)
+            else:
+                date_apres = datetime.fromisoformat(apres[0])
+                query = query.filter(or_(
+                    Commande.date_commande < date_apres,
+                    and_(Commande.date_commande == date_apres, Commande.id < id_apres),
+                    Commande.date_commande.is_(None),
+                ))
+        except (TypeError, ValueError):
+            apres = None
+
+    lignes = (
+        query.order_by(Commande.date_commande.desc(), Commande.id.desc())
+             .limit(COMMANDES_PAGE_SIZE + 1)
+             .all()
+    )
+    suivant = None
+    if len(lignes) > COMMANDES_PAGE_SIZE:
+        lignes = lignes[:COMMANDES_PAGE_SIZE]
+        dernier = lignes[-1]
+        date_dernier = dernier.date_commande.isoformat() if dernier.date_commande else None
+        suivant = encoder_curseur(date_dernier, dernier.id)
+
+    # Synthèse par statut en un seul GROUP BY (filtres hors statut)
+    compte_par_statut = dict(
+        db.session.query(Commande.statut, func.count(Commande.id))
+        .filter(*_conditions_commandes(filtres, avec_statut=False))
+        .group_by(Commande.statut)
+        .all()
+    )
+
+    total = sum(compte_par_statut.values())
+    # En-tête : commandes listées avec le filtre statut (les boutons gardent tous les statuts)
+    total_filtre = compte_par_statut.get(filtres["statut"], 0) if filtres["statut"] else total
+
+    args_filtres = {k: v for k, v in request.args.items() if k != "apres" and v}
+
     return render_template(
         "admin/commandes.html",
-        commandes=commandes,
+        commandes=lignes,
+        filtres=filtres,
+        args_filtres=args_filtres,
+        compte_par_statut=compte_par_statut,
+        total=total,
+        total_filtre=total_filtre,
+        suivant=suivant,
+        premiere_page=apres is None,
         transitions=TRANSITIONS_ADMIN,
         labels=LABELS_STATUT,
     )
 
 
+EXPORT_COLONNES = (
+    "commande_id", "date_commande", "statut", "email_client", "ville_livraison", "total_ttc",
+    "produit_id", "vin", "annee", "couleur", "quantite", "prix_unitaire", "total_ligne",
+)
+
+
+@admin_bp.route("/commandes/export.csv", methods=["GET"])
+@lecture_seule
+@login_required
+@admin_required
+def export_commandes():
+    """Export CSV (une ligne par ligne de commande), mêmes filtres que la liste."""
+    filtres = _filtres_commandes(request.args)
+    # UNE requête jointe commandes ⨝ lignes ⟕ vin, lue en flux
+    stmt = (
+        select(
+            Commande.id, Commande.date_commande, Commande.statut, Commande.email_client,
+            Commande.ville_livraison, Commande.total_ttc_cents,
+            CommandeProduit.produit_id, CommandeProduit.nom_snapshot, Vin.annee, Vin.couleur,
+            CommandeProduit.quantite, CommandeProduit.prix_unitaire_cents,
+        )
+        .join(CommandeProduit, CommandeProduit.commande_id == Commande.id)
+        .outerjoin(Vin, Vin.id == CommandeProduit.produit_id)
+        .where(*_conditions_commandes(filtres))
+        .order_by(Commande.date_commande.desc(), Commande.id.desc(), CommandeProduit.id)
+    )
+
+    def generer():
+        tampon = io.StringIO()
+        ecrire = csv.writer(tampon, delimiter=";")
+        ecrire.writerow(EXPORT_COLONNES)
+        for (cid, date, statut, email, ville, total, produit_id, nom, annee, couleur,
+             quantite, prix) in db.session.execute(stmt.execution_options(yield_per=500)):
+            ecrire.writerow((
+                cid, date.strftime("%Y-%m-%d %H:%M") if date else "", statut, email or "", ville or "",
+                euros(total), produit_id or "", nom, annee or "", couleur or "",
+                quantite, euros(prix), euros(prix * quantite),
+            ))
+            if tampon.tell() > 64 * 1024:
+                yield tampon.getvalue()
+                tampon.seek(0)
+                tampon.truncate()
+        yield tampon.getvalue()
+
+    return Response(
+        stream_with_context(generer()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=commandes-{datetime.utcnow():%Y%m%d}.csv"},
+    )
+
+
 @admin_bp.route("/commandes/<int:commande_id>/statut", methods=["POST"])
 @login_required
 @admin_required
@@ -84,30 +231,40 @@ def changer_statut(commande_id):
         return redirect(url_for("admin.commandes"))
 
     if nouveau_statut == "annulée":
-        ok, info = safe_refund(commande)
-        if ok:
-            flash(f"💳 Remboursement Stripe effectué (ref. {info}).", "success")
-        elif commande.stripe_payment_intent_id:
-            flash(f"⚠️ Remboursement échoué : {info}", "warning")
-        # Annulation même si remboursement échoue (admin peut gérer manuellement)
+        # Remboursement mis en file (même transaction que l'annulation),
+        # exécuté en arrière-plan ; échecs : flask refunds reconcile
+        if commande.refund_effectue:
+            flash(f"💳 Commande déjà remboursée (ref. {commande.stripe_refund_id}).", "info")
+        elif remboursements.demander(commande, motif="annulation_admin") is not None:
+            flash("💳 Remboursement Stripe demandé : il sera effectué dans quelques instants.", "success")
+        else:
+            flash("⚠️ Aucun payment_intent Stripe associé : remboursement à gérer manuellement.", "warning")
 
     ancien_statut = commande.statut
     commande.statut = nouveau_statut
-    db.session.commit()
-    flash(f"✅ Commande #{commande_id} : {ancien_statut} → {nouveau_statut}.", "success")
 
-    # Email client si adresse connue
+    # Email client si adresse connue (outbox : même transaction que le statut)
     if commande.email_client and nouveau_statut in ("expédiée", "livrée", "annulée"):
         _notifier_client(commande, nouveau_statut)
 
+    db.session.commit()
+    flash(f"✅ Commande #{commande_id} : {ancien_statut} → {nouveau_statut}.", "success")
+
     return redirect(url_for("admin.commandes"))
 
 
 @admin_bp.route("/vins", methods=["GET"])
+@lecture_seule
 @login_required
 @admin_required
 def vins():
-    tous_les_vins = Vin.query.join(Domaine).order_by(Domaine.nom.asc(), Vin.nom.asc()).all()
+    tous_les_vins = (
+        Vin.query
+        .join(Vin.domaine)
+        .options(contains_eager(Vin.domaine))
+        .order_by(Domaine.nom.asc(), Vin.nom.asc())
+        .all()
+    )
     return render_template("admin/vins.html", vins=tous_les_vins)
 
 
@@ -125,11 +282,12 @@ def modifier_vin(vin_id):
             vin.domaine_id = int(request.form["domaine_id"])
             vin.couleur    = request.form["couleur"]
             vin.annee      = request.form.get("annee") or None
-            vin.prix       = float(str(request.form["prix"]).replace(",", "."))
+            vin.prix_cents = Montant.depuis_euros(request.form["prix"])
             vin.stock      = int(request.form["stock"])
             vin.photo      = (request.form.get("photo") or "").strip() or None
             vin.is_active  = "is_active" in request.form
             db.session.commit()
+            bump_catalogue_version()
             flash("✅ Vin modifié avec succès.", "success")
             return redirect(url_for("admin.vins"))
         except Exception as e:
@@ -150,20 +308,50 @@ def supprimer_vin(vin_id):
     if dans_une_commande:
         vin.is_active = False
         db.session.commit()
+        bump_catalogue_version()
         flash(f"⚠️ « {vin.nom} » désactivé du catalogue (commandes existantes conservées).", "warning")
     else:
         db.session.delete(vin)
         db.session.commit()
+        bump_catalogue_version()
         flash(f"🗑️ « {vin.nom} » supprimé définitivement.", "success")
 
     return redirect(url_for("admin.vins"))
 
 
+@admin_bp.route("/emails", methods=["GET"])
+@lecture_seule
+@login_required
+@admin_required
+def emails():
+    """Outbox : messages en retry, bloqués en envoi, ou en dead-letter."""
+    return render_template("admin/emails.html", messages=email_outbox.messages_bloques())
+
+
+@admin_bp.route("/emails/renvoyer", methods=["POST"])
+@login_required
+@admin_required
+@csrf.exempt
+def renvoyer_emails():
+    ids = [int(i) for i in request.form.getlist("message_id") if i.isdigit()]
+    n = email_outbox.remettre_en_file(ids or None)
+    flash(f"↩️ {n} email(s) remis en file d'envoi.", "success")
+    return redirect(url_for("admin.emails"))
+
+
+@admin_bp.route("/stripe/disjoncteur", methods=["GET"])
+@login_required
+@admin_required
+def stripe_disjoncteur():
+    """Monitoring : état du disjoncteur Stripe de ce process."""
+    return jsonify(stripe_client.etat_disjoncteur())
+
+
 # ──────────────────────────────────────────────
 # Helper privé : notification client par email
 # ──────────────────────────────────────────────
 def _notifier_client(commande, statut):
-    from flask import current_app
+    """Met la notification en outbox (sans commit : l'appelant commit le statut)."""
     messages = {
         "expédiée": (
             f"Commande #{commande.id} expédiée – Les Silences du Vin",
@@ -178,22 +366,18 @@ def _notifier_client(commande, statut):
         "annulée": (
             f"Commande #{commande.id} annulée – Les Silences du Vin",
             f"Bonjour,\n\nVotre commande #{commande.id} a été annulée.\n"
-            f"Si un paiement avait été effectué, le remboursement a été initié.\n\n"
+            f"Si un paiement avait été effectué, un remboursement va être effectué.\n\n"
             f"Les Silences du Vin"
         ),
     }
     if statut not in messages:
         return
     subject, body = messages[statut]
-    try:
-        send_plain_email(
-            subject=subject,
-            body=body,
-            sender=current_app.config["MAIL_USERNAME"],
-            recipients=[commande.email_client],
-            reply_to="contact@lessilencesduvin.com",
-        )
-    except Exception as e:
-        current_app.logger.error(
-            f"[ADMIN] Email notif client commande {commande.id} ({statut}): {type(e).__name__} - {e}"
-        )
+    email_outbox.mettre_en_file(
+        subject=subject,
+        body=body,
+        recipients=[commande.email_client],
+        reply_to="contact@lessilencesduvin.com",
+        cle=f"statut:{commande.id}:{statut}",
+        commande_id=commande.id,
+    )
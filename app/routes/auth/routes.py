@@ -5,7 +5,7 @@ from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from app.models.user import User
 from app.forms.auth_form import RegistrationForm, LoginForm
 from app.extensions import db
-from app.utils.email import send_plain_email
+from app.utils import email_outbox
 from app.extensions import csrf
 
 
@@ -78,23 +78,20 @@ def forgot_password():
         if user:
             token = _generate_reset_token(user.email)
             reset_url = url_for('auth.reset_password', token=token, _external=True)
-            try:
-                send_plain_email(
-                    subject="Réinitialisation de votre mot de passe – Les Silences du Vin",
-                    body=(
-                        f"Bonjour,\n\n"
-                        f"Vous avez demandé à réinitialiser votre mot de passe.\n"
-                        f"Cliquez sur le lien ci-dessous (valable 1 heure) :\n\n"
-                        f"{reset_url}\n\n"
-                        f"Si vous n'êtes pas à l'origine de cette demande, ignorez cet e-mail.\n\n"
-                        f"Les Silences du Vin"
-                    ),
-                    sender=current_app.config['MAIL_USERNAME'],
-                    recipients=[user.email],
-                    reply_to="contact@lessilencesduvin.com"
-                )
-            except Exception as e:
-                current_app.logger.error(f"[RESET] Erreur envoi email {user.email}: {e}")
+            email_outbox.mettre_en_file(
+                subject="Réinitialisation de votre mot de passe – Les Silences du Vin",
+                body=(
+                    f"Bonjour,\n\n"
+                    f"Vous avez demandé à réinitialiser votre mot de passe.\n"
+                    f"Cliquez sur le lien ci-dessous (valable 1 heure) :\n\n"
+                    f"{reset_url}\n\n"
+                    f"Si vous n'êtes pas à l'origine de cette demande, ignorez cet e-mail.\n\n"
+                    f"Les Silences du Vin"
+                ),
+                recipients=[user.email],
+                reply_to="contact@lessilencesduvin.com"
+            )
+            db.session.commit()
 
         flash("Si un compte existe avec cet e-mail, un lien de réinitialisation vient d'être envoyé.", "info")
         return redirect(url_for('auth.login'))
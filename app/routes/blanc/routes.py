@@ -1,20 +1,19 @@
 """
 Routes du module blanc.
-Affiche les vins blancs via SQLAlchemy (table vin).
+Affiche les vins blancs actifs via le moteur de requête catalogue.
 """
-from flask import Blueprint, render_template
-from app.models.vin import Vin
+from flask import Blueprint, render_template, request
+from app.utils.catalogue_query import page_depuis_requete
 from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 blanc_bp = Blueprint('blanc', __name__, url_prefix='/blanc')
 
 @blanc_bp.route('/')
+@lecture_seule
+@conditional_get
 def index():
-    vins = (
-        Vin.query
-        .filter(Vin.couleur.ilike('blanc'))
-        .order_by(Vin.nom.asc())
-        .all()
-    )
+    page = page_depuis_requete(request.args, couleur='blanc')
     compteur = get_compteur_panier()
-    return render_template('vins_couleur.html', vins=vins, couleur='Blanc', compteur=compteur)
+    return render_template('vins_couleur.html', vins=page.vins, page=page, couleur='Blanc', compteur=compteur)
@@ -5,11 +5,15 @@ Affiche la page catalogue (liste des vins).
 
 from flask import Blueprint, render_template
 from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 
 catalogue_bp = Blueprint('catalogue', __name__, url_prefix='/catalogue')
 
 @catalogue_bp.route('/')
+@lecture_seule
+@conditional_get
 def index():
     # 🔹 Calcul du compteur
     compteur = get_compteur_panier()
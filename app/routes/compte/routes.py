@@ -1,21 +1,23 @@
 from flask import Blueprint, render_template, request, jsonify, session as flask_session, redirect, url_for, flash
 from app.extensions import db
-from app.models.commandes import Commande
+from app.models.commandes import Commande, avec_lignes
 from app.models.panier_sauvegarde import PanierSauvegarde
 from flask_login import current_user, login_required
 from datetime import datetime
 from app.extensions import csrf
+from app.utils.lecture_seule import lecture_seule
 import json
 
 
 compte_bp = Blueprint('compte', __name__, url_prefix='/compte')
 
 @compte_bp.route('/commandes', methods=['GET', 'POST'])
+@lecture_seule
 @login_required
 def commandes():
 
     STATUTS_EN_COURS = ("payé", "complétée", "en_préparation", "expédiée")
-    commandes = Commande.query.filter(
+    commandes = Commande.query.options(avec_lignes()).filter(
         (
             (Commande.user_id == current_user.user_id) |
             (Commande.email_client == current_user.email)
@@ -38,11 +40,12 @@ def commandes():
     )
 
 @compte_bp.route("/historique")
+@lecture_seule
 @login_required
 def historique():
 
     STATUTS_TERMINES = ("livrée", "annulée")
-    commandes = Commande.query.filter(
+    commandes = Commande.query.options(avec_lignes()).filter(
         (
             (Commande.user_id == current_user.user_id) |
             (Commande.email_client == current_user.email)
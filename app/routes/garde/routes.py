@@ -1,22 +1,20 @@
 """
 Routes du module garde.
-Affiche une sélection "de garde" via SQLAlchemy (table vin).
-Règle V1 : annee <= 2018.
+Affiche une sélection "de garde" (vins actifs) via le moteur de requête catalogue.
+Règle unique : annee <= GARDE_ANNEE_MAX (app/utils/catalogue_query.py).
 """
-from flask import Blueprint, render_template
-from app.models.vin import Vin
+from flask import Blueprint, render_template, request
+from app.utils.catalogue_query import page_depuis_requete, GARDE_ANNEE_MAX
 from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 garde_bp = Blueprint('garde', __name__, url_prefix='/garde')
 
 @garde_bp.route('/')
+@lecture_seule
+@conditional_get
 def index():
-    vins = (
-        Vin.query
-        .filter(Vin.annee.isnot(None))
-        .filter(Vin.annee <= 2018)
-        .order_by(Vin.nom.asc())
-        .all()
-    )
+    page = page_depuis_requete(request.args, annee_max=GARDE_ANNEE_MAX)
     compteur = get_compteur_panier()
-    return render_template('vins_couleur.html', vins=vins, couleur='de garde', compteur=compteur)
+    return render_template('vins_couleur.html', vins=page.vins, page=page, couleur='de garde', compteur=compteur)
@@ -1,24 +1,29 @@
 from flask import Blueprint, render_template
 from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
 
 legales_bp = Blueprint('legales', __name__, url_prefix='/legales')
 
 @legales_bp.route('/mentions')
+@conditional_get
 def mentions():
     compteur = get_compteur_panier()
     return render_template('legales/mentions.html',compteur=compteur)
 
 @legales_bp.route('/cgv')
+@conditional_get
 def cgv():
     compteur = get_compteur_panier()
     return render_template('legales/cgv.html',compteur=compteur)
 
 @legales_bp.route('/confidentialite')
+@conditional_get
 def confidentialite():
     compteur = get_compteur_panier()
     return render_template('legales/confidentialite.html', compteur=compteur)
 
 @legales_bp.route('/livraison')
+@conditional_get
 def livraison():
     compteur = get_compteur_panier()
     return render_template('legales/livraison.html', compteur=compteur)
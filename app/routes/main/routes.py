@@ -1,19 +1,19 @@
 from flask import Blueprint, render_template, Response, request, flash, redirect, url_for
 from app.utils.panier_tools import get_compteur_panier
-from app.models.vin import Vin
+from app.utils.catalogue_cache import vins_vedettes
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 # Création du Blueprint principal
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
+@lecture_seule
+@conditional_get
 def index():
     compteur = get_compteur_panier()
-    vin_vedette = (
-        Vin.query
-        .filter(Vin.is_active == True, Vin.stock > 0)
-        .order_by(Vin.prix.desc())
-        .first()
-    )
+    vedettes = vins_vedettes(1)
+    vin_vedette = vedettes[0] if vedettes else None
     return render_template('accueil.html', compteur=compteur, vin_vedette=vin_vedette)
 
 @main_bp.route('/newsletter', methods=['POST'])
@@ -22,16 +22,15 @@ def newsletter():
     return redirect(url_for('main.index'))
 
 @main_bp.route('/vins-confidentiels-rares')
+@lecture_seule
+@conditional_get
 def vins_confidentiels_rares():
     compteur = get_compteur_panier()
-    vins_vedettes = (
-        Vin.query
-        .filter(Vin.is_active == True, Vin.stock > 0)
-        .order_by(Vin.prix.desc())
-        .limit(3)
-        .all()
+    return render_template(
+        'vins_confidentiels_rares.html',
+        compteur=compteur,
+        vins_vedettes=vins_vedettes(3)
     )
-    return render_template('vins_confidentiels_rares.html', compteur=compteur, vins_vedettes=vins_vedettes)
 
 
 # ---------------------------
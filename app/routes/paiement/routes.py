@@ -1,21 +1,20 @@
 import os, stripe
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from flask import Blueprint, render_template, request, jsonify, session as flask_session, redirect, url_for, flash
 from flask import current_app
 from flask_login import current_user
 
 from app.extensions import db
 from app.models.commandes import Commande, CommandeProduit
-from app.models.stripe_event import StripeEvent
 
 from app.forms.checkout import GuestCheckoutForm
-from app.models.vin import Vin
-from app.utils.panier_tools import get_session_panier
-from app.utils.email import send_plain_email
+from app.utils.panier_tools import revalider_panier, message_probleme, vider_panier
+from app.utils import reservations, stripe_events, email_outbox, stripe_client, statut_paiement, evenements_vus
 
-from decimal import Decimal
-from app.utils.panier_tools import money2, compute_shipping
+from app.utils.panier_tools import compute_shipping
+from app.utils.montant import ZERO, euros
 
+from sqlalchemy import select, insert, update
 from sqlalchemy.exc import IntegrityError
 from app.extensions import csrf
 
@@ -31,9 +30,6 @@ from app.extensions import csrf
 # ======================================================
 paiement_bp = Blueprint('paiement', __name__, url_prefix='/paiement')
 
-# Configuration Stripe
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
-
 # ======================================================
 # 🟢 /paiement/create-checkout-session
 # ------------------------------------------------------
@@ -43,38 +39,82 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 # ➜ Redirige ensuite vers Stripe Checkout
 # ======================================================
 
+def _abandonner_commande(commande_id, motif, commit=True):
+    """
+    Bascule une commande encore en_attente en 'abandonnee' et libère ses
+    réservations de stock : une seule transaction (date_abandon en vrai DateTime).
+    """
+    try:
+        result = db.session.execute(
+            update(Commande)
+            .where(Commande.id == commande_id, Commande.statut == 'en_attente')
+            .values(statut='abandonnee', date_abandon=datetime.utcnow(), abandon_motif=motif[:50])
+        )
+        if result.rowcount:
+            reservations.liberer_commande(commande_id)
+        if commit:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"[CHECKOUT] Abandon commande {commande_id} impossible : {type(e).__name__} - {e}")
+
+
+def _remplacer_commande(commande_id):
+    """
+    Un nouveau checkout remplace le précédent (annulé / onglet fermé). La
+    session Stripe de l'ancienne commande est d'abord expirée : tant qu'elle
+    est ouverte, elle reste payable et ses holds ne sont pas rendus. Si Stripe
+    ne confirme pas l'expiration, la commande reste en_attente et ses holds
+    tombent à leur échéance (alignée sur celle de la session). Ne commit pas.
+    """
+    precedente = db.session.execute(
+        select(Commande.statut, Commande.stripe_session_id).where(Commande.id == commande_id)
+    ).first()
+    if precedente is None or precedente.statut != 'en_attente':
+        return
+
+    if precedente.stripe_session_id:
+        try:
+            stripe_client.expirer_session_checkout(precedente.stripe_session_id)
+        except Exception as e:
+            current_app.logger.warning(
+                f"[CHECKOUT] Session {precedente.stripe_session_id} de la commande {commande_id} "
+                f"non expirée ({type(e).__name__} - {e}) : réservations conservées jusqu'à échéance"
+            )
+            return
+
+    _abandonner_commande(commande_id, "remplacee_par_nouveau_checkout", commit=False)
+
+
 @paiement_bp.route('/create-checkout-session', methods=['POST'])
 @csrf.exempt
 def create_checkout_session():
-    panier = get_session_panier()
+    # ✅ Revalidation (une requête IN) AVANT toute écriture en base ou appel Stripe
+    panier = revalider_panier()
     if not panier:
         flash("Votre panier est vide.", "warning")
         return redirect(url_for('catalogue.index'))
 
+    problemes = [message_probleme(l) for l in panier if l["probleme"]]
+    if problemes:
+        current_app.logger.info(f"[CHECKOUT] Panier refusé avant paiement : {problemes}")
+        return jsonify({"error": "panier_invalide", "messages": problemes}), 409
+
     # ✅ Base URL (local vs prod)
     if request.host.startswith("127.0.0.1") or "localhost" in request.host:
         base_url = "http://127.0.0.1:5000"
     else:
         base_url = "https://www.lessilencesduvin.fr"
 
-    # ✅ Calcul robustes (mêmes règles que le panier)
-    from decimal import Decimal
-    from app.utils.panier_tools import money2, compute_shipping
+    # ✅ Totaux en centimes (mêmes règles que le panier, additions d'entiers)
+    subtotal = sum((i["prix"] * int(i["qty"]) for i in panier), ZERO)
+    shipping = compute_shipping(subtotal)
+    total_ttc = subtotal + shipping
 
-    subtotal = Decimal("0.00")
-    for i in panier:
-        subtotal += Decimal(str(i["prix"])) * Decimal(str(i["qty"]))
-    subtotal = money2(subtotal)
-
-    shipping = money2(compute_shipping(subtotal))
-    total_ttc = money2(subtotal + shipping)
-
-    subtotal_cents = int((subtotal * 100).to_integral_value())
-    shipping_cents = int((shipping * 100).to_integral_value())
-    
-    # 🧾 Étape 1 : création commande "en attente" avec le TOTAL TTC (produits + livraison)
+    # 🧾 Étape 1 : commande "en attente" (TOTAL TTC = produits + livraison)
+    # + lignes figées, dans UNE seule transaction (un seul verrou d'écriture SQLite)
     commande = Commande(
-        total_ttc=float(total_ttc),
+        total_ttc_cents=total_ttc,
         statut='en_attente',
         date_commande=datetime.utcnow()
     )
@@ -82,25 +122,49 @@ def create_checkout_session():
     if current_user.is_authenticated:
         commande.user_id = current_user.user_id
 
+    # Un nouveau checkout remplace le précédent : session Stripe expirée, puis holds rendus
+    commande_precedente = flask_session.get('commande_id')
+    if commande_precedente:
+        _remplacer_commande(commande_precedente)
+
     db.session.add(commande)
-    db.session.commit()
+    db.session.flush()  # attribue commande.id sans commit
+
+    db.session.execute(
+        insert(CommandeProduit),
+        [
+            {
+                "commande_id": commande.id,
+                "produit_id": item["vin_id"],
+                "nom_snapshot": item["nom"],
+                "quantite": int(item["qty"]),
+                "prix_unitaire_cents": item["prix"],
+            }
+            for item in panier
+        ],
+    )
+
+    # 🔒 Réservation du stock (même transaction) : la dernière bouteille
+    # ne peut être réservée que par un seul checkout
+    try:
+        reservation_expire = reservations.reserver(commande.id, [(i["vin_id"], i["qty"]) for i in panier])
+    except reservations.StockInsuffisant as e:
+        db.session.rollback()
+        current_app.logger.info(f"[CHECKOUT] Réservation refusée : {e}")
+        nom = next((i["nom"] for i in panier if i["vin_id"] == e.vin_id), "Un vin")
+        return jsonify({
+            "error": "panier_invalide",
+            "messages": [f"{nom} vient d'être réservé par un autre client : stock insuffisant."],
+        }), 409
 
-    # 🔒 Étape 1 bis : figer les lignes du panier dans la commande
-    for item in panier:
-        ligne = CommandeProduit(
-            commande_id=commande.id,
-            produit_id=item["vin_id"],
-            quantite=int(item["qty"]),
-            prix_unitaire=float(item["prix"])
-        )
-        db.session.add(ligne)
     db.session.commit()
 
 
     # Stocker temporairement dans la session Flask
-    flask_session['commande_id'] = commande.id
+    commande_id = commande.id
+    flask_session['commande_id'] = commande_id
     current_app.logger.info(
-        f"[CHECKOUT] Commande {commande.id} créée (statut=en_attente, total_ttc={total_ttc} EUR)"
+        f"[CHECKOUT] Commande {commande.id} créée (statut=en_attente, total_ttc={euros(total_ttc)} EUR)"
     )
 
     try:
@@ -110,18 +174,18 @@ def create_checkout_session():
                 "price_data": {
                     "currency": "eur",
                     "product_data": {"name": "Vins - Les Silences du Vin"},
-                    "unit_amount": subtotal_cents,
+                    "unit_amount": int(subtotal),
                 },
                 "quantity": 1,
             }
         ]
 
-        if shipping_cents > 0:
+        if shipping > 0:
             line_items.append({
                 "price_data": {
                     "currency": "eur",
                     "product_data": {"name": "Livraison (France métropolitaine)"},
-                    "unit_amount": shipping_cents,
+                    "unit_amount": int(shipping),
                 },
                 "quantity": 1,
             })
@@ -129,9 +193,9 @@ def create_checkout_session():
         # ✅ metadata Stripe (utile pour debug; Option A reste la source de vérité via commande.user_id)
         metadata = {
             "commande_id": str(commande.id),
-            "subtotal_eur": str(subtotal),
-            "shipping_eur": str(shipping),
-            "total_ttc_eur": str(total_ttc),
+            "subtotal_eur": euros(subtotal),
+            "shipping_eur": euros(shipping),
+            "total_ttc_eur": euros(total_ttc),
         }
         if current_user.is_authenticated:
             metadata["user_id"] = str(current_user.user_id)
@@ -139,18 +203,25 @@ def create_checkout_session():
         # Pré-remplir l'email si le client est connecté
         customer_email = current_user.email if current_user.is_authenticated else None
 
-        stripe_session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=line_items,
-            mode="payment",
-            success_url=f"{base_url}/paiement/success?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{base_url}/paiement/cancel",
-            metadata=metadata,
-            **({"customer_email": customer_email} if customer_email else {}),
-            invoice_creation={"enabled": True},
-        )
+        params = {
+            "payment_method_types": ["card"],
+            "line_items": line_items,
+            "mode": "payment",
+            "success_url": f"{base_url}/paiement/success?session_id={{CHECKOUT_SESSION_ID}}",
+            "cancel_url": f"{base_url}/paiement/cancel",
+            "metadata": metadata,
+            # Session Stripe alignée sur la réservation (Stripe impose 30 min minimum)
+            "expires_at": int(max(reservation_expire, datetime.utcnow() + timedelta(minutes=30))
+                              .replace(tzinfo=timezone.utc).timestamp()),
+            "invoice_creation": {"enabled": True},
+        }
+        if customer_email:
+            params["customer_email"] = customer_email
 
-        # 🔗 Lier commande ↔ Stripe session (une seule fois)
+        # Clé d'idempotence = commande : un retry réseau ne crée pas de 2e session
+        stripe_session = stripe_client.creer_session_checkout(params, idempotency_key=f"checkout-{commande.id}")
+
+        # 🔗 Lier commande ↔ Stripe session (une seule écriture)
         try:
             commande.stripe_session_id = stripe_session.id
             db.session.commit()
@@ -158,11 +229,7 @@ def create_checkout_session():
             db.session.rollback()
             current_app.logger.error(f"DB error after Stripe session created: {db_e}")
             # Option V1: marquer abandonnée pour éviter une commande "fantôme"
-            commande.statut = "abandonnee"
-            commande.date_abandon = datetime.utcnow().isoformat()
-            commande.abandon_motif = f"db_error_after_stripe_session:{type(db_e).__name__}"
-            db.session.add(commande)
-            db.session.commit()
+            _abandonner_commande(commande_id, f"db_error_after_stripe_session:{type(db_e).__name__}")
             raise
 
         current_app.logger.info(
@@ -173,10 +240,8 @@ def create_checkout_session():
 
 
     except Exception as e:
-        commande.statut = "abandonnee"
-        commande.date_abandon = datetime.utcnow().isoformat()
-        commande.abandon_motif = f"stripe_error:{type(e).__name__}"
-        db.session.commit()
+        db.session.rollback()
+        _abandonner_commande(commande_id, f"stripe_error:{type(e).__name__}")
         current_app.logger.error(f"Erreur Stripe : {type(e).__name__} - {e}")
         flash("Le service de paiement est momentanément indisponible. Veuillez réessayer plus tard.", "warning")
         return redirect(url_for('catalogue.index'))
@@ -187,7 +252,8 @@ def create_checkout_session():
 # ------------------------------------------------------
 # ➜ Appelé automatiquement par Stripe
 # ➜ Vérifie la signature de sécurité
-# ➜ Met à jour la commande en "payé"
+# ➜ Enregistre l'événement (pending) et répond tout de suite ;
+#   la commande passe en "payé" via les workers (app/utils/stripe_events.py)
 # ======================================================
 @paiement_bp.route('/webhook/stripe', methods=['POST'])
 @csrf.exempt
@@ -206,193 +272,42 @@ def stripe_webhook():
         return "Webhook invalide", 400
 
     # On ne traite que cet event en V1
-    if event.get('type') != 'checkout.session.completed':
+    if event.get('type') not in stripe_events.TYPES_TRAITES:
         return '', 200
 
-    session_stripe = event['data']['object']
-
-    # --- Stripe IDs ---
     event_id = event.get("id")
-    stripe_session_id = session_stripe.get("id")
-    payment_intent_id = session_stripe.get("payment_intent")
-
+    stripe_session_id = ((event.get("data") or {}).get("object") or {}).get("id")
     if not event_id or not stripe_session_id:
         current_app.logger.error(f"[WEBHOOK] event_id ou stripe_session_id manquant (event_id={event_id}, session_id={stripe_session_id})")
         return '', 200
 
-    # ✅ Barrière #1 : idempotence Stripe par event.id (UNIQUE)
-    # Si Stripe rejoue le même event, l'insert échoue -> on retourne 200 immédiatement.
+    # ✅ Barrière #0 : doublon récent (mémoire + fichier annexe partagé),
+    # écarté sans toucher à vins.db (tempêtes de retries Stripe)
+    if evenements_vus.deja_vu(event_id):
+        current_app.logger.info(f"[WEBHOOK] Duplicate event ignoré (déjà vu) event_id={event_id}")
+        return '', 200
+
+    # ✅ Barrière #1 : idempotence Stripe par event.id (UNIQUE, source de vérité)
+    # Événement brut persisté en 'pending' ; le traitement (stock, emails,
+    # refund) est fait par les workers stripe_events, hors requête.
     try:
-        db.session.add(StripeEvent(
-            event_id=event_id,
-            event_type=event.get("type"),
-            stripe_session_id=stripe_session_id
-        ))
-        db.session.commit()
+        stripe_events.enregistrer_evenement(event, payload)
     except IntegrityError:
         db.session.rollback()
+        evenements_vus.marquer(event_id)
         current_app.logger.info(f"[WEBHOOK] Duplicate event ignoré event_id={event_id}")
         return '', 200
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"[WEBHOOK] Erreur insert stripe_events event_id={event_id}: {type(e).__name__} - {e}")
-        return '', 200
+        # Non persisté : Stripe doit rejouer
+        return '', 500
 
-    # Récupération commande
-    commande = Commande.query.filter_by(stripe_session_id=stripe_session_id).first()
-    if not commande:
-        current_app.logger.error(f"[WEBHOOK] Commande introuvable pour stripe_session_id={stripe_session_id} (event_id={event_id})")
-        return '', 200
+    evenements_vus.marquer(event_id)
+    current_app.logger.info(f"[WEBHOOK] Event {event_id} enregistré (pending)")
+    return '', 200
 
-    # (optionnel mais utile) : relier l'event à la commande pour audit
-    try:
-        StripeEvent.query.filter_by(event_id=event_id).update({"commande_id": commande.id})
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-
-    # 🔗 Audit : mémoriser payment_intent sur la commande
-    if payment_intent_id and commande.stripe_payment_intent_id != payment_intent_id:
-        commande.stripe_payment_intent_id = payment_intent_id
-        db.session.commit()
-
-    # ✅ Barrière #2 : garde métier (filet)
-    if commande.statut in ('payé', 'complétée', 'echec_stock'):
-        current_app.logger.info(f"[WEBHOOK] Commande {commande.id} déjà traitée (statut={commande.statut}) event_id={event_id}")
-        return '', 200
 
-    # Helper refund idempotent
-    def _safe_refund(commande_obj, payment_intent):
-        if not payment_intent:
-            return
-        if commande_obj.refund_effectue:
-            current_app.logger.info(
-                f"[WEBHOOK] Refund déjà effectué commande {commande_obj.id} refund_id={commande_obj.stripe_refund_id}"
-            )
-            return
-        try:
-            refund = stripe.Refund.create(payment_intent=payment_intent)
-            commande_obj.refund_effectue = True
-            commande_obj.stripe_refund_id = refund.get("id")
-            commande_obj.date_refund = datetime.utcnow()
-            db.session.commit()
-            current_app.logger.info(f"[WEBHOOK] Refund OK commande {commande_obj.id} refund_id={commande_obj.stripe_refund_id}")
-        except Exception as e:
-            current_app.logger.error(f"[WEBHOOK] Refund échoué commande {commande_obj.id}: {type(e).__name__} - {e}")
-
-    # Charger les lignes figées en base
-    lignes = CommandeProduit.query.filter_by(commande_id=commande.id).all()
-    if not lignes:
-        current_app.logger.error(f"[WEBHOOK] Commande {commande.id} sans lignes produits -> echec_stock + refund (event_id={event_id})")
-        commande.statut = 'echec_stock'
-        db.session.commit()
-        _safe_refund(commande, payment_intent_id)
-        return '', 200
-
-    # Décrémentation stock atomique ligne à ligne
-    from sqlalchemy import update
-
-    try:
-        for l in lignes:
-            vin_id = int(l.produit_id)
-            qty = int(l.quantite)
-
-            stmt = (
-                update(Vin)
-                .where(Vin.id == vin_id)
-                .where(Vin.is_active == True)
-                .where(Vin.stock >= qty)
-                .values(stock=Vin.stock - qty)
-            )
-            result = db.session.execute(stmt)
-            if result.rowcount != 1:
-                raise ValueError(f"Stock insuffisant pour vin_id={vin_id}, qty={qty}")
-
-        # Si tout est OK, on valide stock + statut
-        commande.statut = 'payé'
-        db.session.commit()
-        current_app.logger.info(f"[WEBHOOK] Commande {commande.id} -> payé (stock OK) event_id={event_id}")
-
-        # ✅ Email "Paiement confirmé" (idempotent via flag)
-        # Stripe fournit l'email dans customer_details.email (le plus fiable), sinon customer_email.
-        stripe_email = None
-        try:
-            customer_details = session_stripe.get("customer_details") or {}
-            stripe_email = customer_details.get("email") or session_stripe.get("customer_email")
-        except Exception:
-            stripe_email = None
-
-        if stripe_email and not commande.email_paiement_envoye:
-            try:
-                body = (
-                    f"Bonjour,\n\n"
-                    f"Votre paiement pour la commande #{commande.id} a bien été confirmé.\n"
-                    f"Montant : {commande.total_ttc} €\n\n"
-                    f"✅ Dernière étape : merci de renseigner votre adresse de livraison ici :\n"
-                    f"https://www.lessilencesduvin.fr/paiement/infos-livraison\n\n"
-                    f"Sans ces informations, nous ne pourrons pas expédier votre commande.\n\n"
-                    f"Les Silences du Vin"
-                )
-                
-                send_plain_email(
-                    subject=f"Paiement confirmé – Commande #{commande.id}",
-                    body=body,
-                    sender=current_app.config['MAIL_USERNAME'],
-                    recipients=[stripe_email],
-                    reply_to="contact@lessilencesduvin.com"
-                )
-                commande.email_paiement_envoye = True
-                commande.date_email_paiement = datetime.utcnow()
-
-                # On en profite pour pré-remplir email_client si vide (utile pour admin)
-                if not commande.email_client:
-                    commande.email_client = stripe_email
-
-                db.session.commit()
-                current_app.logger.info(f"[WEBHOOK] Email paiement envoyé commande {commande.id} -> {stripe_email}")
-            except Exception as e:
-                current_app.logger.error(f"[WEBHOOK] Erreur envoi email paiement commande {commande.id}: {type(e).__name__} - {e}")
-        else:
-            if not stripe_email:
-                current_app.logger.warning(f"[WEBHOOK] Email Stripe absent, email paiement non envoyé commande {commande.id}")
-            elif commande.email_paiement_envoye:
-                current_app.logger.info(f"[WEBHOOK] Email paiement déjà envoyé commande {commande.id}")
-
-
-
-
-        return '', 200
-
-    except Exception as e:
-        db.session.rollback()
-
-        current_app.logger.warning(f"[WEBHOOK] Commande {commande.id} -> echec_stock ({type(e).__name__}: {e}) event_id={event_id}")
-        commande.statut = 'echec_stock'
-        db.session.commit()
-
-        _safe_refund(commande, payment_intent_id)
-
-        # Option : email justificatif si email déjà connu
-        if commande.email_client:
-            try:
-                body = (
-                    f"Bonjour,\n\n"
-                    f"Votre commande #{commande.id} a été remboursée automatiquement.\n"
-                    f"Motif : le vin a été vendu simultanément et le stock n'était plus suffisant.\n\n"
-                    f"Le remboursement a été initié immédiatement. Selon votre banque, il peut apparaître sous quelques jours.\n\n"
-                    f"Les Silences du Vin"
-                )
-                send_plain_email(
-                    subject="Remboursement automatique – rupture de stock",
-                    body=body,
-                    sender=current_app.config['MAIL_USERNAME'],
-                    recipients=[commande.email_client],
-                    reply_to="contact@lessilencesduvin.com"
-                )
-            except Exception as me:
-                current_app.logger.error(f"[WEBHOOK] Erreur email remboursement commande {commande.id}: {type(me).__name__} - {me}")
-
-        return '', 200
 # ======================================================
 # 🟣 /paiement/infos-livraison
 # ------------------------------------------------------
@@ -462,6 +377,26 @@ def infos_livraison():
 
         try:
             result = db.session.execute(stmt)
+            if result.rowcount == 1:
+                # ✅ Email "Informations reçues" en outbox, dans la transaction
+                # qui pose le verrou (exactly-once côté file)
+                body = (
+                    f"Bonjour {form.prenom.data},\n\n"
+                    f"Nous avons bien reçu vos informations de livraison pour la commande #{commande.id}.\n"
+                    f"Montant : {euros(commande.total_ttc_cents)} €\n\n"
+                    f"Adresse de livraison :\n"
+                    f"{form.adresse_livraison.data}\n"
+                    f"{form.code_postal_livraison.data} {form.ville_livraison.data}\n\n"
+                    f"Les Silences du Vin"
+                )
+                email_outbox.mettre_en_file(
+                    subject=f"Informations reçues – Commande #{commande.id}",
+                    body=body,
+                    recipients=[form.email.data],
+                    reply_to="contact@lessilencesduvin.com",
+                    cle=f"completion:{commande.id}",
+                    commande_id=commande.id,
+                )
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -495,35 +430,10 @@ def infos_livraison():
             flash("Cette commande a déjà été traitée ou n'est pas éligible.", "warning")
             return redirect(url_for("catalogue.index"))
 
-        # ✅ Email "Informations reçues" (exactly-once grâce au verrou DB ci-dessus)
-        try:
-            body = (
-                f"Bonjour {form.prenom.data},\n\n"
-                f"Nous avons bien reçu vos informations de livraison pour la commande #{commande.id}.\n"
-                f"Montant : {commande.total_ttc} €\n\n"
-                f"Adresse de livraison :\n"
-                f"{form.adresse_livraison.data}\n"
-                f"{form.code_postal_livraison.data} {form.ville_livraison.data}\n\n"
-                f"Les Silences du Vin"
-            )
-            send_plain_email(
-                subject=f"Informations reçues – Commande #{commande.id}",
-                body=body,
-                sender=current_app.config['MAIL_USERNAME'],
-                recipients=[form.email.data],
-                reply_to="contact@lessilencesduvin.com"
-            )
-            current_app.logger.info(f"[INFOS] Email complétion envoyé commande {commande.id} -> {form.email.data}")
-        except Exception as e:
-            # V1: on ne "déverrouille" pas le flag, sinon risque de doubles envois.
-            current_app.logger.error(
-                f"[INFOS] Erreur envoi email complétion commande {commande.id}: {type(e).__name__} - {e}"
-            )
-
         flash("Merci ! Vos informations ont bien été enregistrées.", "success")
 
         # Nettoyage session
-        flask_session.pop('panier', None)
+        vider_panier()
         flask_session.pop('commande_id', None)
 
         return redirect(url_for('catalogue.index'))
@@ -554,52 +464,19 @@ def success():
 
     # ✅ /success ne décide pas du statut: le webhook est l'autorité
     if commande.statut == 'echec_stock':
-        flash("Désolé, le stock n'était plus disponible. Votre paiement a été remboursé automatiquement.", "warning")
+        flash("Désolé, le stock n'était plus disponible. Un remboursement intégral va être effectué.", "warning")
         return render_template('paiement/cancel.html')
 
     if commande.statut == 'en_attente':
-        # Vérifier directement auprès de Stripe si le paiement est confirmé
-        # (fallback quand le webhook n'a pas encore été reçu, ou stripe listen absent en dev)
-        try:
-            stripe_session_obj = stripe.checkout.Session.retrieve(session_id)
-            if stripe_session_obj.payment_status != 'paid':
-                # Paiement pas encore confirmé côté Stripe
-                return render_template('paiement/pending.html')
-
-            # Stripe confirme le paiement : décrémentation stock + mise à jour statut
-            from sqlalchemy import update as sa_update
-            lignes = CommandeProduit.query.filter_by(commande_id=commande.id).all()
-            if not lignes:
-                current_app.logger.error(f"[SUCCESS] Commande {commande.id} sans lignes produits")
-                return render_template('paiement/pending.html')
-
-            try:
-                for l in lignes:
-                    stmt = (
-                        sa_update(Vin)
-                        .where(Vin.id == int(l.produit_id))
-                        .where(Vin.is_active == True)
-                        .where(Vin.stock >= int(l.quantite))
-                        .values(stock=Vin.stock - int(l.quantite))
-                    )
-                    result = db.session.execute(stmt)
-                    if result.rowcount != 1:
-                        raise ValueError(f"Stock insuffisant pour vin_id={l.produit_id}")
-
-                payment_intent_id = stripe_session_obj.get("payment_intent")
-                commande.statut = 'payé'
-                if payment_intent_id:
-                    commande.stripe_payment_intent_id = payment_intent_id
-                db.session.commit()
-                current_app.logger.info(f"[SUCCESS] Commande {commande.id} -> payé (fallback Stripe API)")
-            except Exception as e:
-                db.session.rollback()
-                current_app.logger.error(f"[SUCCESS] Erreur stock commande {commande.id}: {e}")
-                return render_template('paiement/pending.html')
+        # Fallback quand le webhook n'a pas encore été reçu (ou stripe listen absent en dev) :
+        # au plus un appel Stripe par session et par intervalle, puis la page d'attente
+        # interroge /paiement/statut
+        if statut_paiement.verifier_aupres_de_stripe(commande) == 'en_attente':
+            return render_template('paiement/pending.html', session_id=session_id)
 
-        except Exception as e:
-            current_app.logger.error(f"[SUCCESS] Erreur Stripe retrieve session={session_id}: {e}")
-            return render_template('paiement/pending.html')
+        if commande.statut == 'echec_stock':
+            flash("Désolé, le stock n'était plus disponible. Un remboursement intégral va être effectué.", "warning")
+            return render_template('paiement/cancel.html')
 
     if commande.statut not in ('payé',):
         # statut inattendu (abandonnee, complétée, etc.)
@@ -619,6 +496,25 @@ def success():
     # Rediriger vers la page de saisie des informations client
     return redirect(url_for('paiement.infos_livraison'))
 
+# ======================================================
+# 🔵 4 bis. Route /statut (JSON, page d'attente)
+# ------------------------------------------------------
+# ➜ Interrogée par pending.html avec backoff
+# ➜ Cache court par session + fallback Stripe limité (app/utils/statut_paiement.py)
+# ======================================================
+@paiement_bp.route('/statut')
+def statut():
+    session_id = request.args.get('session_id', '')
+    if not session_id:
+        return jsonify({"error": "session_id manquant"}), 400
+
+    statut_commande, _ = statut_paiement.statut_session(session_id)
+    return jsonify({
+        "statut": statut_commande,
+        "final": statut_commande in statut_paiement.STATUTS_FINAUX,
+        "redirect": url_for('paiement.success', session_id=session_id),
+    })
+
 # ======================================================
 # 🔴 5. Route /cancel
 # ------------------------------------------------------
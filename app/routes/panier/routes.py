@@ -3,16 +3,16 @@ import json
 from flask import Blueprint, render_template, request, jsonify,redirect,url_for, flash
 from flask_login import current_user, login_required
 from app.models.panier_sauvegarde import PanierSauvegarde
-from app.models.vin import Vin
 from app.extensions import db
-from decimal import Decimal
 from app.extensions import csrf
 from app.utils.panier_tools import (
     get_session_panier,
     set_session_panier,
-    get_compteur_panier,
-    compute_shipping,
-    money2,
+    lignes_panier,
+    appliquer_operations,
+    revalider_panier,
+    resume_panier,
+    MAX_OPERATIONS_PANIER,
     FREE_SHIPPING_THRESHOLD
 )
 
@@ -27,37 +27,18 @@ panier_bp = Blueprint('panier', __name__, url_prefix='/panier')
 def render_panier():
     stripe_public_key = os.getenv("STRIPE_PUBLIC_KEY")
 
-    panier = get_session_panier()
-    items = [
-        {
-            'vin_id': i['vin_id'],
-            'nom': i['nom'],
-            'prix': float(i['prix']),  # on garde float pour l'affichage ligne si tu veux
-            'qty': i['qty'],
-            'line_total': float(i['prix']) * i['qty']
-        }
-        for i in panier
-    ]
-
-    # ✅ Totaux en Decimal (fiables)
-    subtotal = sum((Decimal(str(i['prix'])) * Decimal(str(i['qty']))) for i in panier) if panier else Decimal("0.00")
-    subtotal = money2(subtotal)
-
-    shipping = compute_shipping(subtotal)
-    shipping = money2(shipping)
-
-    total_ttc = money2(subtotal + shipping)
-
-    compteur = get_compteur_panier()
+    # ✅ Prix, disponibilité et stock relus en une requête ; lignes à corriger signalées
+    resume = resume_panier(revalider_panier())
 
     return render_template(
         'shoppingbasket.html',
-        items=items,
-        subtotal=float(subtotal),
-        shipping=float(shipping),
-        total_ttc=float(total_ttc),
-        free_shipping_threshold=float(FREE_SHIPPING_THRESHOLD),
-        compteur=compteur,
+        items=resume["items"],
+        subtotal=resume["subtotal"],
+        shipping=resume["shipping"],
+        total_ttc=resume["total_ttc"],
+        free_shipping_threshold=FREE_SHIPPING_THRESHOLD,
+        compteur=resume["compteur"],
+        panier_bloquant=resume["bloquant"],
         stripe_public_key=stripe_public_key
     )
 
@@ -66,106 +47,63 @@ def index():
     return render_panier()
 
 
-@panier_bp.route('/ajouter', methods=['POST'])
+@panier_bp.route('/update_cart', methods=['POST'])
 @csrf.exempt
-def ajouter():
-    panier = get_session_panier()
-    data = request.get_json(silent=True) or {}
-
-    vin_id = int(data.get("vin_id"))
-
-    vin = Vin.query.get(vin_id)
-    if not vin:
-        return jsonify({"error": "Vin introuvable"}), 404
-
-
-    # 🔒 Blocage V1 : impossible de dépasser le stock réel
-    if vin.stock <= 0:
-        return jsonify({
-            "error": "stock_insuffisant",
-            "message": "Ce vin est en rupture.",
-            "stock_dispo": int(vin.stock),
-            "qty_actuelle": 0
-        }), 409
-
-    qty_actuelle = 0
-    for it in panier:
-        if int(it.get("vin_id")) == vin_id:
-            qty_actuelle = int(it.get("qty", 0))
-            break
-
-    if qty_actuelle + 1 > int(vin.stock):
-        flash(f"Stock limité : {vin.stock} bouteille(s) disponible(s).", "warning")
-        return jsonify({"error": "stock_insuffisant"}), 409
+def update_cart():
+    """Repli sans JavaScript (formulaires de la page panier) : une opération, page re-rendue."""
+    operation = {"vin_id": request.form.get('vin_id'), "op": request.form.get('action')}
+    lignes, erreurs = appliquer_operations(lignes_panier(), [operation])
+    for erreur in erreurs:
+        flash(erreur["message"], "warning")
 
+    # ✅ Sauvegarde le panier mis à jour
+    set_session_panier(lignes)
 
-    nom = vin.nom
-    prix = float(vin.prix)
+    return render_panier()
 
-    # Comparaison en int
-    for item in panier:
-        if int(item["vin_id"]) == vin_id:
-            item["qty"] += 1
-            break
-    else:
-        panier.append({
-            "vin_id": vin_id,  # stocké en int
-            "nom": nom,
-            "prix": prix,
-            "qty": 1
-        })
 
-    set_session_panier(panier)
+def _en_euros(montant):
+    # API JSON : montants en euros (nombre), comme avant le passage aux centimes
+    return float(montant.euros)
 
-    total_qty = sum(int(item.get('qty', 0)) for item in panier)
 
-    return jsonify({
-        "message": f"{nom} ajouté",
-        "total_qty": total_qty
-    }), 200
+def _panier_json(resume, erreurs):
+    return {
+        "lignes": [
+            {**l, "prix": _en_euros(l["prix"]), "line_total": _en_euros(l["line_total"])}
+            for l in resume["items"]
+        ],
+        "subtotal": _en_euros(resume["subtotal"]),
+        "shipping": _en_euros(resume["shipping"]),
+        "total_ttc": _en_euros(resume["total_ttc"]),
+        "free_shipping_threshold": _en_euros(FREE_SHIPPING_THRESHOLD),
+        "compteur": resume["compteur"],
+        "bloquant": resume["bloquant"],
+        "erreurs": erreurs,
+    }
 
 
-@panier_bp.route('/update_cart', methods=['POST'])
+@panier_bp.route('/api/lignes', methods=['POST'])
 @csrf.exempt
-def update_cart():
-    panier=get_session_panier()
-    vin_id = request.form.get('vin_id')
-    action = request.form.get('action')
-
-    for item in panier:
-        if str(item['vin_id']) == str(vin_id):
-
-            if action == 'increase':
-                vin = Vin.query.get(int(item["vin_id"]))
-                if not vin or not vin.is_active:
-                    flash("Ce vin n'est plus disponible.", "warning")
-                elif int(item['qty']) + 1 > int(vin.stock):
-                    flash(f"Stock limité : {vin.stock} bouteille(s) disponible(s).", "warning")
-                else:
-                    item['qty'] += 1
-
-            elif action == 'decrease':
-                item['qty'] -= 1
-            elif action == 'remove':
-                panier.remove(item)
-            break
-
-    # 🔹 Supprime les vins dont la quantité est tombée à 0 ou moins
-    panier = [i for i in panier if i['qty'] > 0]
-
-    # ✅ Sauvegarde le panier mis à jour dans la session
-    set_session_panier(panier)    
-
-    return render_panier()
-
-@panier_bp.route('/compteur', methods=['GET'])
-def compteur():
+def api_lignes():
     """
-    Retourne en JSON le nombre total d'articles dans le panier de la session.
-    Sert aux mises à jour dynamiques du compteur (AJAX / fetch JS).
+    Mutation groupée du panier en JSON.
+    Corps : {"operations": [{"vin_id": 3, "op": "add"}, {"vin_id": 5, "op": "set", "qty": 2}]}
+    Réponse : lignes, totaux (sous-total, livraison, TTC), compteur et erreurs éventuelles,
+    en un seul aller-retour (plus de rendu HTML ni d'appel /compteur).
     """
-    total = get_compteur_panier()
-    return jsonify({'compteur': total})
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations_manquantes"}), 400
+    if len(operations) > MAX_OPERATIONS_PANIER:
+        return jsonify({"error": "trop_d_operations", "max": MAX_OPERATIONS_PANIER}), 400
+
+    lignes, erreurs = appliquer_operations(lignes_panier(), operations)
+    set_session_panier(lignes)
+
+    return jsonify(_panier_json(resume_panier(revalider_panier(lignes)), erreurs)), 200
+
 
 from flask import flash, redirect, url_for, jsonify, request
 
@@ -0,0 +1,5 @@
+"""
+Initialisation du module recherche.
+Expose le Blueprint 'recherche_bp' à l'application.
+"""
+from .routes import recherche_bp
@@ -0,0 +1,30 @@
+"""
+Routes du module recherche.
+Recherche plein texte des vins (FTS5) : page de résultats + autocomplétion JSON.
+"""
+from flask import Blueprint, render_template, request, jsonify, url_for
+from app.utils.recherche import rechercher, suggestions
+from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
+
+recherche_bp = Blueprint('recherche', __name__, url_prefix='/recherche')
+
+@recherche_bp.route('/')
+@lecture_seule
+@conditional_get
+def index():
+    q = (request.args.get('q') or '').strip()
+    vins = rechercher(q) if q else []
+    compteur = get_compteur_panier()
+    return render_template('recherche.html', q=q, vins=vins, compteur=compteur)
+
+@recherche_bp.route('/suggestions')
+@lecture_seule
+@conditional_get
+def autocomplete():
+    q = (request.args.get('q') or '').strip()
+    resultats = suggestions(q) if len(q) >= 2 else []
+    for r in resultats:
+        r["url"] = url_for('vins.vin_detail', vin_id=r["id"])
+    return jsonify({"q": q, "resultats": resultats})
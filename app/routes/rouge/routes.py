@@ -1,20 +1,19 @@
 """
 Routes du module rouge.
-Affiche les vins rouges via SQLAlchemy (table vin).
+Affiche les vins rouges actifs via le moteur de requête catalogue.
 """
-from flask import Blueprint, render_template
-from app.models.vin import Vin
+from flask import Blueprint, render_template, request
+from app.utils.catalogue_query import page_depuis_requete
 from app.utils.panier_tools import get_compteur_panier
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 rouge_bp = Blueprint('rouge', __name__, url_prefix='/rouge')
 
 @rouge_bp.route('/')
+@lecture_seule
+@conditional_get
 def index():
-    vins = (
-        Vin.query
-        .filter(Vin.couleur.ilike('rouge'))
-        .order_by(Vin.nom.asc())
-        .all()
-    )
+    page = page_depuis_requete(request.args, couleur='rouge')
     compteur = get_compteur_panier()
-    return render_template('vins_couleur.html', vins=vins, couleur='Rouge', compteur=compteur)
+    return render_template('vins_couleur.html', vins=page.vins, page=page, couleur='Rouge', compteur=compteur)
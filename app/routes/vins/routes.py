@@ -1,31 +1,22 @@
-from flask import Blueprint, render_template, abort
-from sqlalchemy.orm import joinedload
-from app.models.vin import Vin
+from flask import Blueprint, render_template, abort, request
+from app.utils.catalogue_cache import get_vin_actif
+from app.utils.catalogue_query import page_depuis_requete, GARDE_ANNEE_MAX
+from app.utils.http_cache import conditional_get
+from app.utils.lecture_seule import lecture_seule
 
 vins_bp = Blueprint('vins', __name__)
 
 @vins_bp.route('/vins/<couleur>')
+@lecture_seule
+@conditional_get
 def afficher_vins(couleur):
     couleur_norm = couleur.strip().lower()
 
     if couleur_norm == "garde":
-        vins = (
-            Vin.query
-            .options(joinedload(Vin.domaine))
-            .filter(Vin.is_active.is_(True))
-            .order_by(Vin.nom.asc())
-            .all()
-        )
+        page = page_depuis_requete(request.args, annee_max=GARDE_ANNEE_MAX)
         libelle = "Garde"
     else:
-        vins = (
-            Vin.query
-            .options(joinedload(Vin.domaine))
-            .filter(Vin.is_active.is_(True))
-            .filter(Vin.couleur.ilike(couleur_norm))
-            .order_by(Vin.nom.asc())
-            .all()
-        )
+        page = page_depuis_requete(request.args, couleur=couleur_norm)
         libelle = couleur_norm.capitalize() + "s" if couleur_norm != "rose" else "Rosés"
 
     textes_intro = {
@@ -39,22 +30,18 @@ def afficher_vins(couleur):
 
     return render_template(
         'vins_couleur.html',
-        vins=vins,
+        vins=page.vins,
+        page=page,
         couleur=libelle,
         texte_intro=texte_intro
     )
 
 # Fiche vin (détail)
 @vins_bp.route('/vin/<int:vin_id>')
+@lecture_seule
+@conditional_get
 def vin_detail(vin_id):
-    vin = (
-        Vin.query
-        .options(joinedload(Vin.domaine))
-        .filter(Vin.is_active.is_(True))
-        .filter(Vin.id == vin_id)
-        .first()
-    )
-    
+    vin = get_vin_actif(vin_id)
     if not vin:
         abort(404)
     return render_template('vin_detail.html', vin=vin)
@@ -1,28 +1,33 @@
-function ajouterPanier(id) {
-  fetch('/panier/ajouter', {
+// ───────────────────────────────────────────
+// 🛒 API panier groupée : un seul aller-retour JSON
+// (lignes + totaux + compteur dans la même réponse)
+// ───────────────────────────────────────────
+function envoyerOperationsPanier(operations) {
+  return fetch('/panier/api/lignes', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ vin_id: id })
-  })
-  .then(async (res) => {
+    body: JSON.stringify({ operations: operations })
+  }).then(async (res) => {
     const data = await res.json().catch(() => ({}));
-    if (!res.ok) {
-      alert(data.message || "Impossible d’ajouter ce vin au panier.");
-      return;
-    }
-    majCompteurPanier();
-  })
-  .catch(err => console.error('Erreur panier :', err));
+    if (!res.ok) throw new Error(data.error || 'Erreur panier');
+    majCompteurPanier(data.compteur);
+    return data;
+  });
 }
 
-function majCompteurPanier() {
-  fetch("/panier/compteur")
-    .then(res => res.json())
-    .then(data => {
-      const compteur = document.getElementById("compteur-panier");
-      if (compteur) compteur.textContent = data.compteur;
+function ajouterPanier(id) {
+  envoyerOperationsPanier([{ op: 'add', vin_id: id }])
+    .then((data) => {
+      if (data.erreurs && data.erreurs.length) {
+        alert(data.erreurs[0].message || "Impossible d’ajouter ce vin au panier.");
+      }
     })
-    .catch(err => console.error("Erreur mise à jour compteur :", err));
+    .catch(err => console.error('Erreur panier :', err));
+}
+
+function majCompteurPanier(valeur) {
+  const compteur = document.getElementById("compteur-panier");
+  if (compteur) compteur.textContent = valeur;
 }
 
 
@@ -46,4 +51,63 @@ document.addEventListener("click", (e) => {
   if (!vinId) return;
 
   ajouterPanier(vinId);
-});
\ No newline at end of file
+});
+
+
+// ───────────────────────────────────────────
+// 🧾 Page panier : +/−/Retirer sans recharger la page
+// (les formulaires restent fonctionnels sans JavaScript)
+// ───────────────────────────────────────────
+function euros(valeur) {
+  return Number(valeur).toFixed(2) + ' €';
+}
+
+function majPagePanier(data) {
+  if (!data.lignes.length) {
+    window.location.reload();  // message "panier vide" rendu côté serveur
+    return;
+  }
+
+  const lignes = new Map(data.lignes.map(l => [String(l.vin_id), l]));
+  document.querySelectorAll('tr[data-vin-id]').forEach((tr) => {
+    const ligne = lignes.get(tr.dataset.vinId);
+    if (!ligne) {
+      tr.remove();
+      return;
+    }
+    tr.querySelector('.js-qty').textContent = ligne.qty;
+    tr.querySelector('.js-line-total').textContent = euros(ligne.line_total);
+    tr.querySelector('.js-probleme').textContent = ligne.message || '';
+  });
+
+  // Paiement bloqué tant qu'une ligne est indisponible ou dépasse le stock
+  const checkoutBtn = document.getElementById('checkout-button');
+  const cgv = document.getElementById('accept-cgv');
+  document.getElementById('panier-bloquant').hidden = !data.bloquant;
+  checkoutBtn.dataset.bloquant = data.bloquant ? 'true' : 'false';
+  checkoutBtn.disabled = data.bloquant || !(cgv && cgv.checked);
+
+  document.getElementById('panier-subtotal').textContent = euros(data.subtotal);
+  document.getElementById('panier-shipping').textContent =
+    data.shipping === 0 ? 'Offerts' : euros(data.shipping);
+  document.getElementById('panier-shipping-info').hidden = data.shipping === 0;
+  document.getElementById('panier-total-ttc').textContent = euros(data.total_ttc);
+}
+
+document.addEventListener("submit", (e) => {
+  const form = e.target.closest(".js-maj-panier");
+  if (!form) return;
+  e.preventDefault();
+
+  const operation = {
+    op: form.elements.action.value,
+    vin_id: parseInt(form.elements.vin_id.value, 10)
+  };
+
+  envoyerOperationsPanier([operation])
+    .then((data) => {
+      if (data.erreurs && data.erreurs.length) alert(data.erreurs[0].message);
+      majPagePanier(data);
+    })
+    .catch(() => form.submit());  // repli : rendu serveur classique
+});
@@ -0,0 +1,48 @@
+// Autocomplétion de la recherche (navbar + page /recherche)
+// URL de l'endpoint JSON fournie par le formulaire : data-suggestions
+(function () {
+  const forms = document.querySelectorAll(".js-recherche");
+
+  forms.forEach((form) => {
+    const input = form.querySelector('input[name="q"]');
+    const url = form.dataset.suggestions;
+    if (!input || !url) return;
+
+    const liste = document.createElement("div");
+    liste.className = "list-group position-absolute shadow-sm";
+    liste.style.cssText = "top:100%; right:0; z-index:1050; width:420px; max-width:90vw;";
+    form.appendChild(liste);
+
+    let timer = null;
+    let derniere = "";
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (q.length < 2) { liste.innerHTML = ""; return; }
+
+      // Petite temporisation : une requête par pause de frappe
+      timer = setTimeout(() => {
+        derniere = q;
+        fetch(url + "?q=" + encodeURIComponent(q))
+          .then((res) => res.json())
+          .then((data) => {
+            if (data.q !== derniere) return;  // réponse périmée
+            liste.innerHTML = "";
+            (data.resultats || []).forEach((r) => {
+              const a = document.createElement("a");
+              a.className = "list-group-item list-group-item-action small";
+              a.href = r.url;
+              a.textContent = r.nom + (r.annee ? " (" + r.annee + ")" : "") + (r.domaine ? " · " + r.domaine : "");
+              liste.appendChild(a);
+            });
+          })
+          .catch((err) => console.error("Erreur suggestions :", err));
+      }, 150);
+    });
+
+    document.addEventListener("click", (e) => {
+      if (!form.contains(e.target)) liste.innerHTML = "";
+    });
+  });
+})();
@@ -0,0 +1,334 @@
+"""
+Sweeper des commandes abandonnées : 'en_attente' depuis plus de N heures
+-> 'abandonnee' (motif ttl_expired).
+
+Set-based, par lots courts : chaque lot est UN
+    UPDATE commandes SET statut = 'abandonnee', ...
+    WHERE id IN (SELECT id FROM commandes WHERE statut = 'en_attente'
+                 AND date_commande < :seuil ORDER BY id LIMIT :lot)
+suivi de son commit. Aucun objet ORM chargé, et le verrou d'écriture
+SQLite n'est tenu que le temps d'un lot (le checkout et le webhook passent
+entre deux lots). Les holds de stock des commandes abandonnées sont ensuite
+rendus (reservations.liberer_abandonnees).
+
+Garanties (inchangées) :
+- ne touche jamais aux commandes payées / complétées / etc. ;
+- idempotent : une commande déjà basculée n'est jamais retraitée ;
+- --limit borne le nombre de commandes basculées par passage.
+
+Exécution, sous un bail partagé (table taches_planifiees) : un seul
+balayage à la fois, quels que soient le nombre de workers et le cron.
+- cron : flask mark_abandoned_orders [--hours 24] [--limit 500] [--batch-size 200] [--dry-run]
+- planificateur intégré (ABANDON_SWEEP_ENABLED) : un thread par process,
+  au plus un passage par ABANDON_SWEEP_INTERVAL_SECONDS pour l'ensemble
+  des workers.
+
+Synthèse de chaque passage (commandes balayées, lots, holds libérés, durée) :
+log "[BLOC5] mark_abandoned_orders" et `flask abandons status`.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.commandes import Commande
+from app.models.tache_planifiee import TachePlanifiee
+from app.utils.reservations import liberer_abandonnees
+
+logger = logging.getLogger(__name__)
+
+TACHE = "mark_abandoned_orders"
+EN_ATTENTE = "en_attente"
+ABANDONNEE = "abandonnee"
+MOTIF = "ttl_expired"
+
+
+def _expirees(seuil):
+    return (Commande.statut == EN_ATTENTE, Commande.date_commande < seuil)
+
+
+# ───────────────────────────────────────────
+# 🧹 Balayage par lots (commit par lot)
+# ───────────────────────────────────────────
+def balayer(heures, limite, lot):
+    """
+    Bascule jusqu'à `limite` commandes expirées, par lots de `lot`, puis
+    libère leurs holds. Retourne la synthèse du passage (dict).
+    """
+    debut = time.perf_counter()
+    now = datetime.utcnow()
+    seuil = now - timedelta(hours=heures)
+
+    balayees = lots = 0
+    while balayees < limite:
+        taille = min(lot, limite - balayees)
+        ids = select(Commande.id).where(*_expirees(seuil)).order_by(Commande.id.asc()).limit(taille)
+        changees = db.session.execute(
+            update(Commande)
+            # garde défensive : même si la sous-requête filtre déjà
+            .where(Commande.id.in_(ids), Commande.statut == EN_ATTENTE)
+            .values(statut=ABANDONNEE, date_abandon=now, abandon_motif=MOTIF)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        lots += 1
+        balayees += changees
+        if changees < taille:
+            break
+
+    # Stock réservé par les commandes abandonnées : rendu en une requête
+    liberees = liberer_abandonnees()
+    db.session.commit()
+
+    return {
+        "balayees": balayees,
+        "lots": lots,
+        "liberees": liberees,
+        "limite_atteinte": balayees >= limite,
+        "duree_ms": round((time.perf_counter() - debut) * 1000, 1),
+        "heures": heures,
+        "seuil": seuil.isoformat(timespec="seconds"),
+    }
+
+
+def apercu(heures, limite, n=20):
+    """Dry-run : (nombre de commandes qui seraient basculées, les n premières)."""
+    seuil = datetime.utcnow() - timedelta(hours=heures)
+    ids = select(Commande.id).where(*_expirees(seuil)).order_by(Commande.id.asc()).limit(limite).subquery()
+    total = db.session.execute(select(func.count()).select_from(ids)).scalar()
+    premieres = db.session.execute(
+        select(Commande.id, Commande.date_commande, Commande.stripe_session_id)
+        .where(*_expirees(seuil)).order_by(Commande.id.asc()).limit(min(n, limite))
+    ).all()
+    return total, premieres, seuil
+
+
+# ───────────────────────────────────────────
+# 🔐 Bail partagé entre workers (UPDATE conditionnel)
+# ───────────────────────────────────────────
+def prendre_bail(nom, duree, intervalle=None):
+    """
+    Pose le bail de la tâche `nom` pour `duree` secondes. Avec `intervalle`,
+    refuse aussi si la tâche a tourné il y a moins de `intervalle` secondes.
+    Retourne le jeton du détenteur, ou None.
+    """
+    if db.session.get(TachePlanifiee, nom) is None:
+        try:
+            db.session.add(TachePlanifiee(nom=nom, runs=0, total_rows=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # créée au même instant par un autre worker
+
+    now = datetime.utcnow()
+    conds = [
+        TachePlanifiee.nom == nom,
+        or_(TachePlanifiee.locked_until.is_(None), TachePlanifiee.locked_until < now),
+    ]
+    if intervalle:
+        conds.append(or_(
+            TachePlanifiee.last_run_at.is_(None),
+            TachePlanifiee.last_run_at <= now - timedelta(seconds=intervalle),
+        ))
+
+    jeton = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    pris = db.session.execute(
+        update(TachePlanifiee).where(*conds)
+        .values(locked_by=jeton, locked_until=now + timedelta(seconds=duree))
+    ).rowcount
+    db.session.commit()
+    return jeton if pris == 1 else None
+
+
+def rendre_bail(nom, jeton, resultat=None, lignes=0):
+    """Libère le bail ; avec `resultat`, enregistre la synthèse du passage."""
+    valeurs = {"locked_by": None, "locked_until": None}
+    if resultat is not None:
+        valeurs.update(
+            last_run_at=datetime.utcnow(),
+            last_result=json.dumps(resultat),
+            runs=TachePlanifiee.runs + 1,
+            total_rows=TachePlanifiee.total_rows + lignes,
+        )
+    db.session.execute(
+        update(TachePlanifiee)
+        .where(TachePlanifiee.nom == nom, TachePlanifiee.locked_by == jeton)
+        .values(**valeurs)
+    )
+    db.session.commit()
+
+
+def executer(heures=None, limite=None, lot=None, forcer=False):
+    """
+    Un passage du sweeper sous bail. Sans `forcer`, respecte l'intervalle
+    ABANDON_SWEEP_INTERVAL_SECONDS depuis le dernier passage (tous workers).
+    Retourne la synthèse, ou None si un autre process détient le bail.
+    """
+    cfg = current_app.config
+    heures = heures or int(cfg.get("ABANDON_SWEEP_HOURS", 24))
+    limite = limite or int(cfg.get("ABANDON_SWEEP_LIMIT", 500))
+    lot = lot or int(cfg.get("ABANDON_SWEEP_BATCH_SIZE", 200))
+    intervalle = None if forcer else int(cfg.get("ABANDON_SWEEP_INTERVAL_SECONDS", 900))
+
+    jeton = prendre_bail(TACHE, int(cfg.get("ABANDON_SWEEP_LEASE_SECONDS", 300)), intervalle)
+    if jeton is None:
+        return None
+
+    resultat = None
+    try:
+        resultat = balayer(heures, limite, lot)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        rendre_bail(TACHE, jeton, resultat, resultat["balayees"] if resultat else 0)
+
+    logger.info(
+        f"[BLOC5] mark_abandoned_orders changed={resultat['balayees']} lots={resultat['lots']} "
+        f"liberees={resultat['liberees']} duree_ms={resultat['duree_ms']} "
+        f"hours={heures} threshold={resultat['seuil']}Z limit={limite} batch_size={lot}"
+        + (" (limite atteinte)" if resultat["limite_atteinte"] else "")
+    )
+    return resultat
+
+
+# ───────────────────────────────────────────
+# ⏱️ Planificateur intégré (optionnel)
+# ───────────────────────────────────────────
+_planificateur = []
+_reveil = threading.Event()
+
+
+def reveiller_planificateur():
+    _reveil.set()
+
+
+def _boucle_planificateur(app, attente):
+    while True:
+        _reveil.wait(timeout=attente)
+        _reveil.clear()
+        try:
+            with app.app_context():
+                executer()
+        except Exception as e:
+            logger.error(f"[ABANDONS] Planificateur : {type(e).__name__} - {e}")
+
+
+def demarrer_planificateur(app):
+    if _planificateur:
+        return
+    # Réveil fréquent et bon marché : le bail décide qui balaie, et quand
+    attente = min(60, int(app.config.get("ABANDON_SWEEP_INTERVAL_SECONDS", 900)))
+    t = threading.Thread(target=_boucle_planificateur, args=(app, attente),
+                         name="abandons-sweeper", daemon=True)
+    t.start()
+    _planificateur.append(t)
+    logger.info("[ABANDONS] Planificateur démarré")
+
+
+# ───────────────────────────────────────────
+# 🛠️ CLI
+# Usage (cron, si le planificateur intégré est désactivé) :
+#   flask mark_abandoned_orders --hours 24
+#   flask mark_abandoned_orders --hours 24 --dry-run
+#   flask abandons status
+# ───────────────────────────────────────────
+@click.command("mark_abandoned_orders")
+@click.option("--hours", default=24, type=int, show_default=True,
+              help="Seuil d'expiration en heures avant abandon.")
+@click.option("--dry-run", is_flag=True,
+              help="Simule l'opération sans modifier la base de données.")
+@click.option("--limit", default=500, type=int, show_default=True,
+              help="Nombre max de commandes traitées par exécution (sécurité V1).")
+@click.option("--batch-size", default=200, type=int, show_default=True,
+              help="Commandes basculées par transaction (UPDATE ... LIMIT).")
+@with_appcontext
+def mark_abandoned_orders_command(hours, dry_run, limit, batch_size):
+    """Marque comme 'abandonnee' les commandes 'en_attente' plus anciennes que le seuil."""
+    if hours <= 0:
+        click.echo("❌ --hours doit être strictement supérieur à 0.")
+        return
+    if limit <= 0:
+        click.echo("❌ --limit doit être > 0")
+        return
+    if batch_size <= 0:
+        click.echo("❌ --batch-size doit être > 0")
+        return
+
+    if dry_run:
+        total, premieres, seuil = apercu(hours, limit)
+        click.echo(
+            f"🧾 Dry-run: jusqu'à {limit} commande(s) max "
+            f"(seuil={hours}h, avant {seuil.isoformat()} UTC)"
+        )
+        for cid, date_commande, session_id in premieres:
+            click.echo(f" - id={cid} | date_commande={date_commande} | stripe_session_id={session_id}")
+        if total == 0:
+            click.echo("✅ 0 commande à abandonner.")
+        elif total > len(premieres):
+            click.echo(f"... (+{total - len(premieres)} autres)")
+        click.echo("✅ Dry-run terminé. Aucune modification effectuée.")
+        return
+
+    resultat = executer(hours, limit, batch_size, forcer=True)
+    if resultat is None:
+        tache = db.session.get(TachePlanifiee, TACHE)
+        click.echo(f"⏳ Balayage déjà en cours ({tache.locked_by}, bail jusqu'à {tache.locked_until} UTC).")
+        return
+
+    if resultat["liberees"]:
+        click.echo(f"🔓 {resultat['liberees']} réservation(s) de stock libérée(s).")
+    click.echo(
+        f"✅ {resultat['balayees']} commande(s) marquée(s) 'abandonnee' "
+        f"({resultat['lots']} lot(s), {resultat['duree_ms']} ms)."
+    )
+    if resultat["limite_atteinte"]:
+        click.echo(f"ℹ️  --limit={limit} atteint : d'autres commandes expirées restent à traiter.")
+
+
+@click.group("abandons", cls=AppGroup)
+def abandons_cli():
+    """Sweeper des commandes abandonnées."""
+
+
+@abandons_cli.command("status")
+def status_command():
+    """Synthèse du dernier passage et cumul depuis la mise en service."""
+    tache = db.session.get(TachePlanifiee, TACHE)
+    if tache is None or not tache.runs:
+        click.echo("ℹ️  Aucun passage enregistré.")
+        return
+
+    dernier = json.loads(tache.last_result or "{}")
+    click.echo(f"  dernier passage  {tache.last_run_at:%Y-%m-%d %H:%M:%S} UTC")
+    click.echo(
+        f"  balayées         {dernier.get('balayees', 0)} en {dernier.get('lots', 0)} lot(s), "
+        f"{dernier.get('duree_ms', 0)} ms (seuil {dernier.get('heures')}h)"
+    )
+    click.echo(f"  holds libérés    {dernier.get('liberees', 0)}")
+    if dernier.get("limite_atteinte"):
+        click.echo("  ⚠️  limite atteinte au dernier passage")
+    click.echo(f"  cumul            {tache.total_rows} commande(s) en {tache.runs} passage(s)")
+    en_attente = db.session.execute(
+        select(func.count(Commande.id)).where(*_expirees(datetime.utcnow() - timedelta(hours=dernier.get("heures", 24))))
+    ).scalar()
+    click.echo(f"  restantes        {en_attente} commande(s) expirée(s) en attente")
+    if tache.locked_until and tache.locked_until > datetime.utcnow():
+        click.echo(f"  bail             {tache.locked_by} jusqu'à {tache.locked_until:%H:%M:%S} UTC")
+
+
+def init_app(app, demarrer=False):
+    app.cli.add_command(mark_abandoned_orders_command)
+    app.cli.add_command(abandons_cli)
+    if demarrer and app.config.get("ABANDON_SWEEP_ENABLED"):
+        demarrer_planificateur(app)
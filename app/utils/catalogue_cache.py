@@ -0,0 +1,178 @@
+"""
+Cache catalogue en mémoire (lecture seule) pour Vin / Domaine.
+
+Principe :
+- Chaque worker garde en mémoire un instantané des vins actifs + domaines.
+- La "révision" du catalogue est un petit fichier partagé (data/catalogue.version)
+  qui contient un horodatage en nanosecondes. Toute écriture catalogue
+  (admin, décrément de stock) appelle bump_catalogue_version() APRÈS commit.
+- À chaque lecture, on compare (inode, mtime) du fichier via os.stat :
+  pas de requête SQLite tant que le catalogue n'a pas changé.
+
+Le fichier est remplacé atomiquement (os.replace) → tous les workers gunicorn
+voient la nouvelle révision dès leur prochaine requête.
+"""
+import os
+import time
+import threading
+import logging
+
+from flask import current_app
+
+from sqlalchemy.orm import lazyload
+
+logger = logging.getLogger(__name__)
+
+
+# ───────────────────────────────────────────
+# 📦 Instantanés (objets figés, partagés entre threads)
+# ───────────────────────────────────────────
+class DomaineSnapshot:
+    __slots__ = ("id", "nom")
+
+    def __init__(self, domaine):
+        self.id = domaine.id
+        self.nom = domaine.nom
+
+    def __repr__(self):
+        return f"<DomaineSnapshot {self.nom}>"
+
+
+class VinSnapshot:
+    __slots__ = (
+        "id", "nom", "domaine_id", "domaine", "annee", "couleur", "prix_cents",
+        "stock", "photo", "description", "typologie", "accord", "is_active",
+    )
+
+    def __init__(self, vin, domaine):
+        self.id = vin.id
+        self.nom = vin.nom
+        self.domaine_id = vin.domaine_id
+        self.domaine = domaine
+        self.annee = vin.annee
+        self.couleur = vin.couleur
+        self.prix_cents = vin.prix_cents
+        self.stock = vin.stock
+        self.photo = vin.photo
+        self.description = vin.description
+        self.typologie = vin.typologie
+        self.accord = vin.accord
+        self.is_active = vin.is_active
+
+    def __repr__(self):
+        return f"<VinSnapshot {self.nom} ({self.annee})>"
+
+
+class Catalogue:
+    """Instantané complet : vins actifs triés par nom + index par id."""
+
+    def __init__(self, revision, vins, domaines):
+        self.revision = revision
+        self.vins = vins
+        self.domaines = domaines
+        self.par_id = {v.id: v for v in vins}
+
+
+# ───────────────────────────────────────────
+# 🔢 Révision partagée (fichier)
+# ───────────────────────────────────────────
+def _version_path():
+    return current_app.config["CATALOGUE_VERSION_PATH"]
+
+
+def bump_catalogue_version():
+    """
+    Invalide le cache catalogue de TOUS les workers.
+    À appeler après un commit qui modifie Vin / Domaine (y compris le stock).
+    """
+    path = _version_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    revision = time.time_ns()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(str(revision))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Pas bloquant pour l'écriture métier, mais le cache resterait périmé
+        logger.error(f"[CATALOGUE] Impossible d'écrire la révision : {e}")
+        return None
+    return revision
+
+
+_lock = threading.Lock()
+_stat_key = None
+_revision = None
+_catalogue = None
+
+
+def get_catalogue_revision():
+    """
+    Retourne la révision courante du catalogue (int, horodatage ns).
+    Coût en régime établi : un os.stat, aucune requête SQL.
+    """
+    global _stat_key, _revision
+    path = _version_path()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        # Première utilisation : on initialise le fichier
+        revision = bump_catalogue_version()
+        if revision is None:
+            return 0
+        st = os.stat(path)
+
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if key != _stat_key:
+        try:
+            with open(path) as f:
+                _revision = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            _revision = st.st_mtime_ns
+        _stat_key = key
+    return _revision
+
+
+# ───────────────────────────────────────────
+# 📚 Lecture du catalogue (read-through)
+# ───────────────────────────────────────────
+def _charger_catalogue(revision):
+    from app.models.vin import Vin
+    from app.models.domaine import Domaine
+
+    domaines = {d.id: DomaineSnapshot(d) for d in Domaine.query.all()}
+    vins = (
+        Vin.query
+        .options(lazyload(Vin.domaine))  # domaines déjà chargés ci-dessus
+        .filter(Vin.is_active.is_(True))
+        .order_by(Vin.nom.asc(), Vin.id.asc())
+        .all()
+    )
+    snapshots = [VinSnapshot(v, domaines.get(v.domaine_id)) for v in vins]
+    logger.info(f"[CATALOGUE] Cache reconstruit ({len(snapshots)} vins, revision={revision})")
+    return Catalogue(revision, snapshots, domaines)
+
+
+def get_catalogue():
+    """Retourne l'instantané du catalogue, rechargé uniquement si la révision a changé."""
+    global _catalogue
+    revision = get_catalogue_revision()
+    catalogue = _catalogue
+    if catalogue is not None and catalogue.revision == revision:
+        return catalogue
+
+    with _lock:
+        if _catalogue is None or _catalogue.revision != revision:
+            _catalogue = _charger_catalogue(revision)
+        return _catalogue
+
+
+def get_vin_actif(vin_id):
+    """Vin actif par id, ou None."""
+    return get_catalogue().par_id.get(vin_id)
+
+
+def vins_vedettes(limit):
+    """Vins actifs en stock, du plus cher au moins cher."""
+    en_stock = [v for v in get_catalogue().vins if (v.stock or 0) > 0]
+    return sorted(en_stock, key=lambda v: v.prix_cents, reverse=True)[:limit]
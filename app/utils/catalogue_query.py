@@ -0,0 +1,282 @@
+"""
+Moteur de requête catalogue unique (rouge / blanc / garde / vins par couleur).
+
+- Facettes combinables : couleur, millésime min/max, prix min/max (centimes,
+  saisis en euros dans l'URL), domaine, en stock.
+- Pagination keyset sur (nom, id) : coût constant quelle que soit la page.
+- Comptes de facettes calculés en UNE requête GROUP BY (couleur, domaine, en stock).
+
+SQLite ne renvoie que des ids (index ix_vin_active_couleur_nom) ; les vins
+sont ensuite hydratés depuis le cache catalogue. Les résultats sont mémorisés
+par révision du catalogue : en régime établi, aucune requête SQL.
+"""
+import threading
+from collections import OrderedDict
+
+from flask import request, url_for
+from sqlalchemy import select, func, case, and_, or_
+
+from app.extensions import db
+from app.models.vin import Vin
+from app.utils.catalogue_cache import get_catalogue, get_catalogue_revision
+from app.utils.pagination import encoder_curseur, decoder_curseur
+from app.utils.montant import Montant, euros
+
+
+# Règle métier unique "vin de garde" (pages /garde et /vins/garde)
+GARDE_ANNEE_MAX = 2018
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+# ───────────────────────────────────────────
+# 🎛️ Filtres
+# ───────────────────────────────────────────
+class FiltresCatalogue:
+    """Filtres combinables. Les champs à None ne filtrent pas."""
+
+    CHAMPS = ("couleur", "annee_min", "annee_max", "prix_min", "prix_max", "domaine_id", "en_stock")
+    __slots__ = CHAMPS
+
+    def __init__(self, couleur=None, annee_min=None, annee_max=None,
+                 prix_min=None, prix_max=None, domaine_id=None, en_stock=False):
+        self.couleur = couleur.strip().lower() if couleur else None
+        self.annee_min = annee_min
+        self.annee_max = annee_max
+        self.prix_min = prix_min
+        self.prix_max = prix_max
+        self.domaine_id = domaine_id
+        self.en_stock = bool(en_stock)
+
+    def cle(self):
+        return tuple(getattr(self, c) for c in self.CHAMPS)
+
+    def remplacer(self, **changes):
+        valeurs = {c: getattr(self, c) for c in self.CHAMPS}
+        valeurs.update(changes)
+        return FiltresCatalogue(**valeurs)
+
+    def to_args(self):
+        """Paramètres de query-string (pour url_for) des facettes actives."""
+        args = {}
+        for c in ("annee_min", "annee_max", "domaine_id"):
+            if getattr(self, c) is not None:
+                args[c] = getattr(self, c)
+        for c in ("prix_min", "prix_max"):   # centimes -> euros dans l'URL
+            if getattr(self, c) is not None:
+                args[c] = euros(getattr(self, c))
+        if self.en_stock:
+            args["en_stock"] = 1
+        return args
+
+    @classmethod
+    def depuis_args(cls, args, **base):
+        """
+        Construit les filtres depuis request.args.
+        `base` (ex. couleur imposée par la route) prime sur la query-string.
+        Les valeurs invalides sont ignorées silencieusement.
+        """
+        def _int(name):
+            try:
+                return int(args.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        def _montant(name):
+            # Saisie en euros ("18,50") -> centimes
+            if args.get(name) in (None, ""):
+                return None
+            try:
+                return Montant.depuis_euros(args.get(name))
+            except ValueError:
+                return None
+
+        valeurs = {
+            "couleur": args.get("couleur") or None,
+            "annee_min": _int("annee_min"),
+            "annee_max": _int("annee_max"),
+            "prix_min": _montant("prix_min"),
+            "prix_max": _montant("prix_max"),
+            "domaine_id": _int("domaine_id"),
+            "en_stock": args.get("en_stock") in ("1", "true", "on"),
+        }
+        for k, v in base.items():
+            if k in ("annee_min", "prix_min") and valeurs[k] is not None and v is not None:
+                v = max(v, valeurs[k])
+            elif k in ("annee_max", "prix_max") and valeurs[k] is not None and v is not None:
+                v = min(v, valeurs[k])
+            valeurs[k] = v
+        return cls(**valeurs)
+
+
+def _conditions(filtres, sauf=()):
+    """Clauses WHERE correspondant aux filtres (hors dimensions listées dans `sauf`)."""
+    conds = [Vin.is_active.is_(True)]
+    if filtres.couleur and "couleur" not in sauf:
+        conds.append(Vin.couleur == filtres.couleur)
+    if filtres.domaine_id is not None and "domaine_id" not in sauf:
+        conds.append(Vin.domaine_id == filtres.domaine_id)
+    if filtres.en_stock and "en_stock" not in sauf:
+        conds.append(Vin.stock > 0)
+    if filtres.annee_min is not None:
+        conds.append(Vin.annee >= filtres.annee_min)
+    if filtres.annee_max is not None:
+        conds.append(Vin.annee <= filtres.annee_max)
+    if filtres.prix_min is not None:
+        conds.append(Vin.prix_cents >= filtres.prix_min)
+    if filtres.prix_max is not None:
+        conds.append(Vin.prix_cents <= filtres.prix_max)
+    return conds
+
+
+# ───────────────────────────────────────────
+# 🔖 Curseur keyset (nom, id) — opaque côté client
+# ───────────────────────────────────────────
+def _decoder_apres(token):
+    valeurs = decoder_curseur(token, 2)
+    if valeurs is None:
+        return None
+    try:
+        return str(valeurs[0]), int(valeurs[1])
+    except (TypeError, ValueError):
+        return None
+
+
+# ───────────────────────────────────────────
+# 📄 Résultat
+# ───────────────────────────────────────────
+class PageCatalogue:
+    def __init__(self, filtres, vins, suivant, facettes):
+        self.filtres = filtres
+        self.vins = vins
+        self.suivant = suivant      # curseur de la page suivante (ou None)
+        self.facettes = facettes    # cf. compter_facettes()
+
+    # Liens calculés à l'appel (la page est partagée entre requêtes via le mémo)
+    def lien_suivant(self):
+        if not self.suivant:
+            return None
+        return url_for(request.endpoint, **request.view_args, **self.filtres.to_args(), apres=self.suivant)
+
+    def lien_facette(self, **changes):
+        filtres = self.filtres.remplacer(**changes)
+        return url_for(request.endpoint, **request.view_args, **filtres.to_args())
+
+
+def _ids_page(filtres, apres, limite):
+    stmt = select(Vin.id, Vin.nom).where(*_conditions(filtres))
+    if apres:
+        nom, vin_id = apres
+        stmt = stmt.where(or_(Vin.nom > nom, and_(Vin.nom == nom, Vin.id > vin_id)))
+    stmt = stmt.order_by(Vin.nom.asc(), Vin.id.asc()).limit(limite + 1)
+    return db.session.execute(stmt).all()
+
+
+def compter_facettes(filtres):
+    """
+    Une seule requête groupée (couleur, domaine, en stock) ; chaque facette
+    est ensuite comptée en appliquant les AUTRES facettes sélectionnées.
+    """
+    en_stock = case((Vin.stock > 0, 1), else_=0)
+    stmt = (
+        select(Vin.couleur, Vin.domaine_id, en_stock, func.count(Vin.id))
+        .where(*_conditions(filtres, sauf=("couleur", "domaine_id", "en_stock")))
+        .group_by(Vin.couleur, Vin.domaine_id, en_stock)
+    )
+    rows = db.session.execute(stmt).all()
+
+    def _retenu(row, sauf):
+        couleur, domaine_id, stock_ok, _ = row
+        if filtres.couleur and sauf != "couleur" and couleur != filtres.couleur:
+            return False
+        if filtres.domaine_id is not None and sauf != "domaine_id" and domaine_id != filtres.domaine_id:
+            return False
+        if filtres.en_stock and sauf != "en_stock" and not stock_ok:
+            return False
+        return True
+
+    couleurs, domaines = {}, {}
+    nb_en_stock = total = 0
+    for row in rows:
+        couleur, domaine_id, stock_ok, n = row
+        if _retenu(row, "couleur"):
+            couleurs[couleur] = couleurs.get(couleur, 0) + n
+        if _retenu(row, "domaine_id"):
+            domaines[domaine_id] = domaines.get(domaine_id, 0) + n
+        if _retenu(row, "en_stock") and stock_ok:
+            nb_en_stock += n
+        if _retenu(row, None):
+            total += n
+
+    noms = get_catalogue().domaines
+    return {
+        "total": total,
+        "couleurs": dict(sorted(couleurs.items(), key=lambda kv: kv[0] or "")),
+        "domaines": sorted(
+            ((noms.get(d_id), n) for d_id, n in domaines.items() if noms.get(d_id)),
+            key=lambda dn: dn[0].nom,
+        ),
+        "en_stock": nb_en_stock,
+    }
+
+
+# ───────────────────────────────────────────
+# 🧠 Mémo par révision du catalogue
+# ───────────────────────────────────────────
+_MEMO_MAX = 256
+_memo_lock = threading.Lock()
+_memo_revision = None
+_memo = OrderedDict()
+
+
+def _memo_get(revision, key):
+    with _memo_lock:
+        if revision != _memo_revision:
+            return None
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+        return value
+
+
+def _memo_set(revision, key, value):
+    global _memo_revision
+    with _memo_lock:
+        if revision != _memo_revision:
+            _memo.clear()
+            _memo_revision = revision
+        _memo[key] = value
+        while len(_memo) > _MEMO_MAX:
+            _memo.popitem(last=False)
+
+
+def rechercher_vins(filtres, curseur=None, limite=PAGE_SIZE):
+    """Point d'entrée unique : une page de vins + les comptes de facettes."""
+    limite = max(1, min(int(limite), MAX_PAGE_SIZE))
+    apres = _decoder_apres(curseur)
+    revision = get_catalogue_revision()
+    key = (filtres.cle(), apres, limite)
+
+    page = _memo_get(revision, key)
+    if page is not None:
+        return page
+
+    rows = _ids_page(filtres, apres, limite)
+    suivant = None
+    if len(rows) > limite:
+        rows = rows[:limite]
+        suivant = encoder_curseur(rows[-1].nom, rows[-1].id)
+
+    par_id = get_catalogue().par_id
+    vins = [par_id[r.id] for r in rows if r.id in par_id]
+
+    page = PageCatalogue(filtres, vins, suivant, compter_facettes(filtres))
+    _memo_set(revision, key, page)
+    return page
+
+
+def page_depuis_requete(args, **base):
+    """Helper des blueprints : filtres + curseur lus dans request.args."""
+    filtres = FiltresCatalogue.depuis_args(args, **base)
+    return rechercher_vins(filtres, curseur=args.get("apres"))
@@ -1,37 +1,204 @@
+"""
+Envoi d'emails (SMTP OVH).
+
+Les connexions SMTP authentifiées sont gardées dans un pool (SMTPPool) et
+réutilisées d'un envoi à l'autre : la poignée de main TCP + TLS + AUTH
+(300 à 800 ms vers ssl0.ovh.net) n'est payée qu'à l'ouverture.
+
+- Contrôle de santé : NOOP avant réutilisation si la connexion est restée
+  inactive plus de MAIL_POOL_NOOP_AFTER_SECONDS.
+- Recyclage : après MAIL_POOL_MAX_MESSAGES envois ou MAIL_POOL_IDLE_SECONDS
+  d'inactivité (le serveur coupe de toute façon les sessions trop longues).
+- Thread-safe : au plus MAIL_POOL_SIZE connexions par process, une
+  connexion n'est prêtée qu'à un seul thread à la fois.
+"""
 import ssl
+import time
+import atexit
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from flask import current_app
 
-def send_plain_email(subject, body, sender, recipients, reply_to=None):
+BCC_DEFAUT = "contact@lessilencesduvin.fr"
+
+
+# ───────────────────────────────────────────
+# 🔌 Pool de connexions SMTP
+# ───────────────────────────────────────────
+class _Connexion:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.ouverte_a = time.monotonic()
+        self.utilisee_a = self.ouverte_a
+        self.envois = 0
+
+
+class SMTPPool:
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 taille=2, max_messages=50, idle_seconds=60, noop_after_seconds=5,
+                 timeout=15, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self.noop_after_seconds = noop_after_seconds
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._libres = []                       # connexions au repos (LIFO : la plus chaude d'abord)
+        self._verrou = threading.Lock()
+        self._places = threading.BoundedSemaphore(taille)
+        self.stats = {"ouvertures": 0, "reutilisations": 0, "recyclages": 0}
+
+    # ── Cycle de vie d'une connexion ──
+    def _ouvrir(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                    context=self.ssl_context or ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._fermer(smtp)
+            raise
+        with self._verrou:
+            self.stats["ouvertures"] += 1
+        return _Connexion(smtp)
+
+    @staticmethod
+    def _fermer(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _utilisable(self, conn):
+        """Âge / volume / NOOP : False si la connexion doit être recyclée."""
+        maintenant = time.monotonic()
+        if conn.envois >= self.max_messages or maintenant - conn.utilisee_a > self.idle_seconds:
+            return False
+        if maintenant - conn.utilisee_a > self.noop_after_seconds:
+            try:
+                return conn.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _emprunter(self):
+        """Retourne (connexion, reutilisee)."""
+        while True:
+            with self._verrou:
+                conn = self._libres.pop() if self._libres else None
+            if conn is None:
+                return self._ouvrir(), False
+            if self._utilisable(conn):
+                with self._verrou:
+                    self.stats["reutilisations"] += 1
+                return conn, True
+            with self._verrou:
+                self.stats["recyclages"] += 1
+            self._fermer(conn.smtp)
+
+    def _rendre(self, conn):
+        conn.utilisee_a = time.monotonic()
+        with self._verrou:
+            self._libres.append(conn)
+
+    # ── API ──
+    def envoyer(self, msg):
+        """
+        Envoie un message sur une connexion du pool. Si une connexion
+        réutilisée s'avère coupée, elle est jetée et l'envoi est retenté
+        une fois sur une connexion neuve.
+        """
+        self._places.acquire()
+        try:
+            conn, reutilisee = self._emprunter()
+            try:
+                conn.smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._fermer(conn.smtp)
+                if not reutilisee:
+                    raise
+                current_app.logger.info(f"[MAIL] Connexion SMTP réutilisée coupée ({type(e).__name__}), nouvel essai")
+                conn = self._ouvrir()
+                try:
+                    conn.smtp.send_message(msg)
+                except Exception:
+                    self._fermer(conn.smtp)
+                    raise
+            except Exception:
+                # Erreur SMTP (destinataire refusé...) : état de session incertain, on jette
+                self._fermer(conn.smtp)
+                raise
+            conn.envois += 1
+            self._rendre(conn)
+        finally:
+            self._places.release()
+
+    def fermer(self):
+        with self._verrou:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            self._fermer(conn.smtp)
+
+
+_creation_pool = threading.Lock()
+
+
+def get_smtp_pool(app=None):
+    """Pool SMTP de l'application (créé au premier envoi)."""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get("smtp_pool")
+    if pool is None:
+        with _creation_pool:
+            pool = app.extensions.get("smtp_pool")
+            if pool is None:
+                cfg = app.config
+                pool = SMTPPool(
+                    cfg["MAIL_SERVER"],
+                    cfg["MAIL_PORT"],
+                    username=cfg.get("MAIL_USERNAME"),
+                    password=cfg.get("MAIL_PASSWORD"),
+                    use_ssl=cfg.get("MAIL_USE_SSL", True),
+                    taille=int(cfg.get("MAIL_POOL_SIZE", 2)),
+                    max_messages=int(cfg.get("MAIL_POOL_MAX_MESSAGES", 50)),
+                    idle_seconds=float(cfg.get("MAIL_POOL_IDLE_SECONDS", 60)),
+                    noop_after_seconds=float(cfg.get("MAIL_POOL_NOOP_AFTER_SECONDS", 5)),
+                    timeout=float(cfg.get("MAIL_TIMEOUT_SECONDS", 15)),
+                )
+                app.extensions["smtp_pool"] = pool
+                atexit.register(pool.fermer)
+    return pool
+
+
+# ───────────────────────────────────────────
+# ✉️ Envoi
+# ───────────────────────────────────────────
+def send_plain_email(subject, body, sender, recipients, reply_to=None, bcc=BCC_DEFAUT):
     msg = MIMEText(body, "plain", "utf-8")
     msg["Subject"] = subject
     msg["From"] = sender
     msg["To"] = ", ".join(recipients)
     if reply_to:
         msg["Reply-To"] = reply_to
-    msg["Bcc"] = "contact@lessilencesduvin.fr"
-
+    if bcc:
+        msg["Bcc"] = bcc
 
     current_app.logger.info(
         f"[MAIL] subject={msg['Subject']} to={msg.get('To')} bcc={msg.get('Bcc')} from={msg.get('From')}"
     )
 
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL(
-        current_app.config['MAIL_SERVER'],
-        current_app.config['MAIL_PORT'],
-        context=context
-    ) as server:
-        server.login(
-            current_app.config['MAIL_USERNAME'],
-            current_app.config['MAIL_PASSWORD']
-        )
-
-
-        try:
-            server.send_message(msg)
-        except Exception as e:
-            current_app.logger.error(f"[MAIL] send failed: {type(e).__name__} - {e}")
-            raise
-        
\ No newline at end of file
+    try:
+        get_smtp_pool().envoyer(msg)
+    except Exception as e:
+        current_app.logger.error(f"[MAIL] send failed: {type(e).__name__} - {e}")
+        raise
@@ -0,0 +1,261 @@
+"""
+Outbox des emails transactionnels.
+
+- mettre_en_file() ajoute le message à la session SQLAlchemy SANS commit :
+  il est écrit dans la même transaction que le changement métier
+  (statut payé, complétée, expédiée...). Pas de commit = pas d'email ;
+  commit = email garanti, même si SMTP est en panne.
+- Une clé métier unique (ex. "paiement:12") empêche tout doublon.
+- Un sender en arrière-plan (EMAIL_OUTBOX_WORKERS threads par process)
+  réserve les messages échus par lots, les envoie, et les repasse en file
+  avec backoff exponentiel en cas d'erreur ; au-delà de
+  EMAIL_OUTBOX_MAX_ATTEMPTS tentatives, le message part en 'dead'
+  (visible dans /admin/emails, renvoyable).
+
+CLI : flask emails drain | flask emails retry-dead
+"""
+import uuid
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, select, update, or_, and_
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.email_outbox import EmailOutbox
+from app.utils.email import send_plain_email
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+# ───────────────────────────────────────────
+# 📥 Mise en file (dans la transaction de l'appelant)
+# ───────────────────────────────────────────
+def mettre_en_file(subject, body, recipients, sender=None, reply_to=None, cle=None, commande_id=None):
+    """
+    Ajoute un email à l'outbox (sans commit). Si `cle` est déjà présente
+    dans la file, rien n'est ajouté et None est retourné.
+    """
+    if cle is not None:
+        deja = db.session.execute(select(EmailOutbox.id).where(EmailOutbox.cle == cle)).scalar()
+        if deja is not None:
+            logger.info(f"[OUTBOX] Email déjà en file (cle={cle}), ignoré")
+            return None
+
+    message = EmailOutbox(
+        cle=cle,
+        commande_id=commande_id,
+        subject=subject,
+        body=body,
+        sender=sender,
+        recipients=", ".join(recipients),
+        reply_to=reply_to,
+        statut=PENDING,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(message)
+    # Réveil des senders au commit de CETTE transaction
+    db.session.info["outbox_reveil"] = True
+    return message
+
+
+@event.listens_for(Session, "after_commit")
+def _apres_commit(session):
+    if session.info.pop("outbox_reveil", False):
+        reveiller_senders()
+
+
+@event.listens_for(Session, "after_rollback")
+def _apres_rollback(session):
+    session.info.pop("outbox_reveil", None)
+
+
+# ───────────────────────────────────────────
+# 📤 Envoi par lots
+# ───────────────────────────────────────────
+def _delai_backoff(tentatives):
+    base = int(current_app.config.get("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+    plafond = int(current_app.config.get("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", 6 * 3600))
+    return min(base * (2 ** max(tentatives - 1, 0)), plafond)
+
+
+def reserver_lot(taille):
+    """
+    Réserve jusqu'à `taille` messages échus (ou dont le bail a expiré) en un
+    seul UPDATE marqué d'un jeton, puis les relit. Retourne la liste.
+    """
+    now = datetime.utcnow()
+    bail = now - timedelta(seconds=int(current_app.config.get("EMAIL_OUTBOX_LEASE_SECONDS", 300)))
+    eligible = or_(
+        and_(EmailOutbox.statut == PENDING, EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.statut == SENDING, EmailOutbox.locked_at < bail),
+    )
+    jeton = uuid.uuid4().hex
+    ids = select(EmailOutbox.id).where(eligible).order_by(EmailOutbox.id.asc()).limit(taille)
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids.scalar_subquery()), eligible)
+        .values(statut=SENDING, locked_at=now, locked_by=jeton, attempts=EmailOutbox.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return EmailOutbox.query.filter_by(locked_by=jeton, statut=SENDING).order_by(EmailOutbox.id.asc()).all()
+
+
+def _envoyer(message):
+    send_plain_email(
+        subject=message.subject,
+        body=message.body,
+        sender=message.sender or current_app.config["MAIL_USERNAME"],
+        recipients=[r.strip() for r in message.recipients.split(",") if r.strip()],
+        reply_to=message.reply_to,
+    )
+
+
+def envoyer_lot(taille=None):
+    """Réserve et envoie un lot. Retourne le nombre de messages traités."""
+    taille = taille or int(current_app.config.get("EMAIL_OUTBOX_BATCH_SIZE", 20))
+    lot = reserver_lot(taille)
+    if not lot:
+        return 0
+
+    max_attempts = int(current_app.config.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 6))
+    for message in lot:
+        try:
+            _envoyer(message)
+        except Exception as e:
+            message.last_error = f"{type(e).__name__}: {e}"[:1000]
+            message.locked_at = None
+            message.locked_by = None
+            if message.attempts >= max_attempts:
+                message.statut = DEAD
+                logger.error(f"[OUTBOX] Email {message.id} en dead-letter après {message.attempts} tentative(s) : {message.last_error}")
+            else:
+                message.statut = PENDING
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=_delai_backoff(message.attempts))
+                logger.warning(f"[OUTBOX] Email {message.id} tentative {message.attempts} échouée : {message.last_error}")
+        else:
+            message.statut = SENT
+            message.sent_at = datetime.utcnow()
+            message.locked_at = None
+            message.locked_by = None
+            message.last_error = None
+        # Commit par message : un envoi réussi n'est jamais rejoué si le suivant plante
+        db.session.commit()
+    return len(lot)
+
+
+def drainer():
+    """Envoie tous les messages échus (synchrone). Retourne le nombre traité."""
+    total = 0
+    while True:
+        n = envoyer_lot()
+        if not n:
+            return total
+        total += n
+
+
+# ───────────────────────────────────────────
+# 🧵 Senders (threads du process web)
+# ───────────────────────────────────────────
+_reveil = threading.Event()
+_senders = []
+
+
+def reveiller_senders():
+    _reveil.set()
+
+
+def _boucle_sender(app, intervalle):
+    while True:
+        _reveil.wait(timeout=intervalle)
+        _reveil.clear()
+        try:
+            with app.app_context():
+                drainer()
+        except Exception as e:
+            logger.error(f"[OUTBOX] Sender : {type(e).__name__} - {e}")
+            time.sleep(intervalle)
+
+
+def demarrer_senders(app):
+    if _senders:
+        return
+    intervalle = float(app.config.get("EMAIL_OUTBOX_POLL_SECONDS", 10))
+    for i in range(int(app.config.get("EMAIL_OUTBOX_WORKERS", 1))):
+        t = threading.Thread(target=_boucle_sender, args=(app, intervalle),
+                             name=f"email-outbox-{i}", daemon=True)
+        t.start()
+        _senders.append(t)
+    if _senders:
+        logger.info(f"[OUTBOX] {len(_senders)} sender(s) démarré(s)")
+
+
+# ───────────────────────────────────────────
+# 🔎 Messages bloqués (vue admin)
+# ───────────────────────────────────────────
+def messages_bloques(limite=200):
+    """Dead-letters, messages en retry, et envois dont le bail a expiré."""
+    bail = datetime.utcnow() - timedelta(seconds=int(current_app.config.get("EMAIL_OUTBOX_LEASE_SECONDS", 300)))
+    return (
+        EmailOutbox.query
+        .filter(or_(
+            EmailOutbox.statut == DEAD,
+            and_(EmailOutbox.statut == PENDING, EmailOutbox.attempts > 0),
+            and_(EmailOutbox.statut == SENDING, EmailOutbox.locked_at < bail),
+        ))
+        .order_by(EmailOutbox.id.desc())
+        .limit(limite)
+        .all()
+    )
+
+
+def remettre_en_file(message_ids=None):
+    """Repasse des messages (ou tous les dead-letters) en pending, tentatives remises à zéro."""
+    stmt = update(EmailOutbox).values(
+        statut=PENDING, attempts=0, next_attempt_at=datetime.utcnow(), locked_at=None, locked_by=None
+    )
+    if message_ids:
+        stmt = stmt.where(EmailOutbox.id.in_(message_ids), EmailOutbox.statut != SENT)
+    else:
+        stmt = stmt.where(EmailOutbox.statut == DEAD)
+    n = db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.session.info["outbox_reveil"] = True
+    db.session.commit()
+    return n
+
+
+# ───────────────────────────────────────────
+# 🛠️ CLI
+# ───────────────────────────────────────────
+@click.group("emails", cls=AppGroup)
+def emails_cli():
+    """Outbox des emails transactionnels."""
+
+
+@emails_cli.command("drain")
+def drain_command():
+    """Envoie maintenant tous les messages échus."""
+    click.echo(f"✅ {drainer()} message(s) traité(s).")
+
+
+@emails_cli.command("retry-dead")
+def retry_dead_command():
+    """Remet en file tous les messages en dead-letter."""
+    click.echo(f"↩️  {remettre_en_file()} message(s) remis en file.")
+
+
+def init_app(app, demarrer=False):
+    app.cli.add_command(emails_cli)
+    if demarrer:
+        demarrer_senders(app)
@@ -0,0 +1,92 @@
+"""
+Événements Stripe récemment vus (filtre anti-doublons du webhook).
+
+Lors d'une tempête de retries Stripe (après une panne, Stripe rejoue des
+centaines d'événements déjà reçus), chaque doublon prenait le verrou
+d'écriture de vins.db pour un INSERT voué à l'IntegrityError.
+
+Deux niveaux, consultés AVANT toute écriture en base principale :
+- un LRU en mémoire par process (STRIPE_EVENTS_SEEN_MEMORY entrées) ;
+- un petit fichier SQLite annexe (STRIPE_EVENTS_SEEN_PATH), partagé par
+  tous les workers, en WAL et synchronous=OFF : c'est un cache, il peut
+  être perdu sans conséquence.
+
+Un event_id n'est marqué qu'APRÈS le commit de stripe_events (ou quand
+l'index unique a déjà signalé le doublon) : l'index unique de
+stripe_events.event_id reste la source de vérité, le filtre ne fait
+qu'éviter le chemin coûteux. Toute erreur du fichier annexe est ignorée
+(on retombe sur l'INSERT + IntegrityError).
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_lru = OrderedDict()
+_lru_verrou = threading.Lock()
+_local = threading.local()
+_PURGE_TOUTES_LES = 500   # insertions entre deux purges du fichier annexe
+_insertions = 0
+
+
+def _connexion():
+    chemin = current_app.config["STRIPE_EVENTS_SEEN_PATH"]
+    conn = getattr(_local, "connexions", {}).get(chemin)
+    if conn is None:
+        os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        conn = sqlite3.connect(chemin, timeout=0.2, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE IF NOT EXISTS evenements_vus (event_id TEXT PRIMARY KEY, vu_a REAL NOT NULL) WITHOUT ROWID")
+        _local.connexions = {**getattr(_local, "connexions", {}), chemin: conn}
+    return conn
+
+
+def _memoriser(event_id):
+    taille = int(current_app.config.get("STRIPE_EVENTS_SEEN_MEMORY", 4096))
+    with _lru_verrou:
+        _lru[event_id] = True
+        _lru.move_to_end(event_id)
+        while len(_lru) > taille:
+            _lru.popitem(last=False)
+
+
+def deja_vu(event_id):
+    """True si l'événement a déjà été persisté récemment (aucune écriture en base principale)."""
+    with _lru_verrou:
+        if event_id in _lru:
+            _lru.move_to_end(event_id)
+            return True
+    try:
+        ttl = float(current_app.config.get("STRIPE_EVENTS_SEEN_TTL_HOURS", 72)) * 3600
+        ligne = _connexion().execute(
+            "SELECT 1 FROM evenements_vus WHERE event_id = ? AND vu_a > ?", (event_id, time.time() - ttl)
+        ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"[EVENTS-VUS] Lecture impossible ({e}) : vérification par la base principale")
+        return False
+    if ligne:
+        _memoriser(event_id)
+        return True
+    return False
+
+
+def marquer(event_id):
+    """À appeler une fois l'événement persisté (ou reconnu comme doublon par l'index unique)."""
+    global _insertions
+    _memoriser(event_id)
+    try:
+        conn = _connexion()
+        conn.execute("INSERT OR REPLACE INTO evenements_vus (event_id, vu_a) VALUES (?, ?)", (event_id, time.time()))
+        _insertions += 1
+        if _insertions % _PURGE_TOUTES_LES == 0:
+            ttl = float(current_app.config.get("STRIPE_EVENTS_SEEN_TTL_HOURS", 72)) * 3600
+            conn.execute("DELETE FROM evenements_vus WHERE vu_a <= ?", (time.time() - ttl,))
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"[EVENTS-VUS] Écriture impossible ({e}) : filtre limité au process")
@@ -0,0 +1,116 @@
+"""
+GET conditionnels (ETag / Last-Modified / 304) pour les pages catalogue.
+
+Le validateur est calculé SANS rendu ni requête SQL :
+- révision du catalogue (fichier partagé, cf. catalogue_cache),
+- état visible propre au visiteur lu dans le cookie de session
+  (compteur panier recopié par panier_tools, utilisateur connecté, jeton
+  CSRF embarqué dans les formulaires de la page),
+- version de l'application (templates / statiques),
+- une fenêtre temporelle, pour ne jamais resservir un jeton CSRF expiré.
+
+Last-Modified / If-Modified-Since ne couvrent que la révision du catalogue
+et la fenêtre CSRF : ils ne sont émis et honorés que pour un visiteur sans
+état propre (anonyme, panier vide, sans jeton CSRF). Sinon seul l'ETag
+valide la page.
+
+Le jeton CSRF n'est posé en session qu'au rendu (csrf_token()) : les
+validateurs envoyés sont recalculés après la vue, pour décrire la page
+réellement servie. Une session réinitialisée (nouveau jeton) ne reçoit
+donc jamais de 304 sur une page portant l'ancien jeton.
+
+Les réponses sont marquées "private, no-cache" : le navigateur garde la page
+mais revalide à chaque visite, et reçoit un 304 vide si rien n'a changé.
+"""
+import time
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, session, current_app, make_response
+
+from app.utils.catalogue_cache import get_catalogue_revision
+from app.utils.panier_tools import compteur_session
+
+
+def _fenetre():
+    return int(current_app.config.get("HTTP_CACHE_ETAG_WINDOW", 1800))
+
+
+def _jeton_csrf():
+    return session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token")) or ""
+
+
+def _compute_etag(revision):
+    window = _fenetre()
+    parts = (
+        str(revision),
+        current_app.config.get("APP_VERSION", "dev"),
+        str(session.get("_user_id") or ""),
+        str(compteur_session()),
+        _jeton_csrf(),
+        str(int(time.time() // window) if window > 0 else 0),
+        request.full_path,
+    )
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _last_modified(revision):
+    """
+    Date de la révision du catalogue, avancée au début de la fenêtre CSRF
+    courante (une page d'une fenêtre passée n'est jamais validée) ; None si
+    le visiteur a un état propre que la date ne peut pas couvrir.
+    """
+    if session.get("_user_id") or compteur_session() or _jeton_csrf():
+        return None
+    secondes = revision // 1_000_000_000   # précision HTTP = seconde
+    window = _fenetre()
+    if window > 0:
+        secondes = max(secondes, int(time.time() // window) * window)
+    return datetime.fromtimestamp(secondes, tz=timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    """Applique la sémantique RFC 9110 : If-None-Match prime sur If-Modified-Since."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def conditional_get(view):
+    """
+    Décorateur de vue : répond 304 avant d'appeler la vue si le client
+    possède déjà la bonne version, sinon pose ETag (+ Last-Modified pour un
+    visiteur sans état).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Messages flash en attente : la page est unique, on ne la valide pas
+        if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+            return view(*args, **kwargs)
+
+        revision = get_catalogue_revision()
+        etag = _compute_etag(revision)
+        last_modified = _last_modified(revision)
+
+        if _not_modified(etag, last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            # Le rendu a pu poser un jeton CSRF : validateurs de la page servie
+            etag = _compute_etag(revision)
+            last_modified = _last_modified(revision)
+
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        return response
+
+    return wrapper
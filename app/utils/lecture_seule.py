@@ -0,0 +1,98 @@
+"""
+Moteur SQLite en lecture seule pour les pages GET idempotentes.
+
+Catalogue, fiche vin, historique client et listes admin n'écrivent jamais :
+leurs requêtes passent par un second moteur ouvert en `mode=ro` avec
+`PRAGMA query_only=1`, et son propre pool.
+- En WAL, ces lecteurs ne bloquent jamais le webhook ni le checkout, et
+  n'occupent plus les connexions du moteur principal ;
+- une requête de rapport qui s'emballe ne peut pas prendre de verrou
+  d'écriture (toute écriture échoue : "attempt to write a readonly database").
+
+Routage :
+- @lecture_seule sur la vue (sous @route) : en GET/HEAD, la session
+  SQLAlchemy de la requête lit via le moteur en lecture seule ;
+- échappatoire : `with primaire():` dans la vue (ou toute requête non
+  marquée) revient au moteur principal, pour une page qui doit écrire ou
+  relire ses propres écritures de la même requête.
+
+Même fichier, pas de réplica : un commit est visible de la lecture
+suivante, la page affichée après un POST/redirect voit donc ses écritures.
+panier_store utilise db.engine directement et reste sur le moteur principal.
+"""
+import os
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+
+
+class SessionRoutee(Session):
+    """Session Flask-SQLAlchemy : moteur en lecture seule si la requête est marquée."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get("db_lecture_seule"):
+            moteur = current_app.extensions.get("db_lecture")
+            if moteur is not None:
+                return moteur
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def lecture_seule(view):
+    """Marque une vue GET idempotente (lue via le moteur en lecture seule)."""
+    view._lecture_seule = True
+    return view
+
+
+@contextmanager
+def primaire():
+    """Force le moteur principal dans le bloc (écriture, read-your-writes)."""
+    precedent = g.get("db_lecture_seule", False)
+    g.db_lecture_seule = False
+    try:
+        yield
+    finally:
+        g.db_lecture_seule = precedent
+
+
+def creer_moteur_lecture(app, moteur):
+    """Moteur `mode=ro` + query_only sur le même fichier SQLite, ou None."""
+    url = moteur.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+
+    from app.utils import sqlite_tuning
+
+    chemin = os.path.abspath(url.database)
+    lecture = create_engine(
+        f"sqlite:///file:{chemin}?mode=ro&uri=true",
+        pool_size=int(app.config.get("DB_LECTURE_SEULE_POOL_SIZE", 10)),
+        max_overflow=int(app.config.get("DB_LECTURE_SEULE_MAX_OVERFLOW", 10)),
+    )
+    # journal_mode ne se règle pas en lecture seule (le fichier est déjà en WAL)
+    profil = {k: v for k, v in sqlite_tuning.profil_depuis_config(app.config).items() if k != "journal_mode"}
+    profil["query_only"] = 1
+    sqlite_tuning.installer(lecture, profil)
+    return lecture
+
+
+def init_app(app):
+    if not app.config.get("DB_LECTURE_SEULE", True):
+        return
+
+    from app.extensions import db
+
+    with app.app_context():
+        lecture = creer_moteur_lecture(app, db.engine)
+    if lecture is None:
+        return
+    app.extensions["db_lecture"] = lecture
+
+    @app.before_request
+    def _router_lecture_seule():
+        if request.method not in ("GET", "HEAD") or request.endpoint is None:
+            return
+        view = app.view_functions.get(request.endpoint)
+        if getattr(view, "_lecture_seule", False):
+            g.db_lecture_seule = True
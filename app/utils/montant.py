@@ -0,0 +1,89 @@
+"""
+Montants en centimes d'euro (entiers).
+
+Les prix (vin.prix_cents), totaux de commande et prix figés des lignes sont
+stockés en INTEGER : le panier et le checkout n'additionnent que des
+entiers, sans Decimal(str(float)) par ligne ni arrondi flottant.
+
+- Montant : int (centimes) dont l'arithmétique reste un Montant
+  (+, -, × quantité entière) ; .euros donne le Decimal exact ;
+- Montant.depuis_euros("18,50") : saisie admin / filtres d'URL -> centimes ;
+- MontantType : type de colonne SQLAlchemy (INTEGER) qui relit en Montant ;
+- euros(montant) : "18.50" (filtre Jinja `euros`, emails, logs).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy.types import Integer, TypeDecorator
+
+
+class Montant(int):
+    """Montant en centimes d'euro."""
+    __slots__ = ()
+
+    @classmethod
+    def depuis_euros(cls, valeur):
+        """'18,50' / '18.5' / Decimal / float -> Montant (arrondi au centime, demi vers le haut)."""
+        try:
+            d = Decimal(str(valeur).strip().replace(",", "."))
+        except InvalidOperation:
+            raise ValueError(f"Montant invalide : {valeur!r}")
+        if not d.is_finite():
+            raise ValueError(f"Montant invalide : {valeur!r}")
+        return cls(int((d * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)))
+
+    @property
+    def euros(self):
+        return Decimal(int(self)).scaleb(-2)
+
+    def __add__(self, autre):
+        if not isinstance(autre, int):
+            return NotImplemented
+        return Montant(int(self) + int(autre))
+
+    __radd__ = __add__
+
+    def __sub__(self, autre):
+        if not isinstance(autre, int):
+            return NotImplemented
+        return Montant(int(self) - int(autre))
+
+    def __rsub__(self, autre):
+        if not isinstance(autre, int):
+            return NotImplemented
+        return Montant(int(autre) - int(self))
+
+    def __mul__(self, quantite):
+        # Prix × quantité : entiers uniquement (pas de montant × montant)
+        if not isinstance(quantite, int) or isinstance(quantite, Montant):
+            return NotImplemented
+        return Montant(int(self) * quantite)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Montant(-int(self))
+
+    def __repr__(self):
+        return f"Montant({int(self)})"
+
+
+ZERO = Montant(0)
+
+
+def euros(montant):
+    """Centimes -> '18.50' (None -> '')."""
+    if montant is None:
+        return ""
+    return f"{Montant(montant).euros:.2f}"
+
+
+class MontantType(TypeDecorator):
+    """Colonne INTEGER en centimes, relue en Montant."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else Montant(value)
@@ -0,0 +1,28 @@
+"""
+Curseurs opaques pour la pagination keyset.
+
+Un curseur encode la clé de tri du dernier élément affiché
+(ex. (nom, id) pour le catalogue, (date_commande, id) pour l'admin) :
+la page suivante est obtenue par "WHERE clé > curseur", à coût constant.
+"""
+import json
+import base64
+
+
+def encoder_curseur(*valeurs):
+    raw = json.dumps(list(valeurs), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decoder_curseur(token, nb_valeurs):
+    """Retourne la liste des valeurs, ou None si le curseur est absent / invalide."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        valeurs = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != nb_valeurs:
+        return None
+    return valeurs
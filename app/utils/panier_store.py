@@ -0,0 +1,194 @@
+"""
+Stockage serveur du panier courant.
+
+La session (cookie signé) ne transporte plus que `panier_id`, un identifiant
+opaque ; les lignes vivent dans un backend interchangeable :
+
+- "sqlite" (défaut) : table paniers_session, partagée par tous les workers ;
+- "memory" : dictionnaire à TTL du process (dev / worker unique).
+
+Représentation compacte d'une ligne : [vin_id, qty]. Le nom et le prix sont
+relus dans le catalogue à l'affichage (cf. panier_tools.get_session_panier).
+
+Les paniers expirent PANIER_TTL_HOURS après leur dernière modification ;
+`flask paniers purge` supprime les paniers expirés (cron).
+"""
+import json
+import time
+import secrets
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.models.panier_session import PanierSession  # noqa: F401 (table connue de db.create_all)
+
+logger = logging.getLogger(__name__)
+
+
+def nouvel_identifiant():
+    """Identifiant opaque non devinable (192 bits)."""
+    return secrets.token_urlsafe(24)
+
+
+def compacter(lignes):
+    """[{vin_id, qty, ...}] ou [[vin_id, qty]] → [[vin_id, qty]] (qty > 0)."""
+    compact = []
+    for ligne in lignes or []:
+        try:
+            if isinstance(ligne, dict):
+                vin_id, qty = int(ligne["vin_id"]), int(ligne.get("qty", 1))
+            else:
+                vin_id, qty = int(ligne[0]), int(ligne[1])
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        if qty > 0:
+            compact.append([vin_id, qty])
+    return compact
+
+
+# ───────────────────────────────────────────
+# 🧠 Backend mémoire (TTL)
+# ───────────────────────────────────────────
+class MemoryPanierStore:
+    nom = "memory"
+    PURGE_TOUTES_LES = 500   # écritures entre deux purges automatiques
+
+    def __init__(self, ttl_seconds):
+        self.ttl = ttl_seconds
+        self._data = {}          # panier_id -> (expire_a, lignes)
+        self._lock = threading.Lock()
+        self._ecritures = 0
+
+    def get(self, panier_id):
+        with self._lock:
+            entree = self._data.get(panier_id)
+            if entree is None:
+                return []
+            if entree[0] <= time.monotonic():
+                del self._data[panier_id]
+                return []
+            return [list(l) for l in entree[1]]
+
+    def set(self, panier_id, lignes):
+        with self._lock:
+            self._data[panier_id] = (time.monotonic() + self.ttl, [list(l) for l in lignes])
+            self._ecritures += 1
+            purge_due = self._ecritures % self.PURGE_TOUTES_LES == 0
+        if purge_due:
+            self.purger()
+
+    def delete(self, panier_id):
+        with self._lock:
+            self._data.pop(panier_id, None)
+
+    def purger(self):
+        maintenant = time.monotonic()
+        with self._lock:
+            expires = [k for k, (expire_a, _) in self._data.items() if expire_a <= maintenant]
+            for k in expires:
+                del self._data[k]
+        return len(expires)
+
+
+# ───────────────────────────────────────────
+# 🗄️ Backend SQLite (table paniers_session)
+# Transactions courtes sur une connexion dédiée : n'interfère pas
+# avec la session ORM de la requête.
+# ───────────────────────────────────────────
+class SQLitePanierStore:
+    nom = "sqlite"
+
+    _SQL_GET = text("SELECT lignes_json FROM paniers_session WHERE id = :id AND expires_at > :now")
+    _SQL_SET = text("""
+        INSERT INTO paniers_session (id, lignes_json, updated_at, expires_at)
+        VALUES (:id, :lignes, :now, :expires)
+        ON CONFLICT(id) DO UPDATE SET
+            lignes_json = excluded.lignes_json,
+            updated_at = excluded.updated_at,
+            expires_at = excluded.expires_at
+    """)
+    _SQL_DELETE = text("DELETE FROM paniers_session WHERE id = :id")
+    _SQL_PURGE = text("DELETE FROM paniers_session WHERE expires_at <= :now")
+
+    def __init__(self, ttl_seconds):
+        self.ttl = ttl_seconds
+
+    def _execute(self, stmt, params):
+        try:
+            with db.engine.begin() as conn:
+                return conn.execute(stmt, params)
+        except OperationalError as e:
+            logger.error(f"[PANIER] Table paniers_session indisponible ({e}). Lancer `flask db-migrate`.")
+            return None
+
+    def get(self, panier_id):
+        try:
+            with db.engine.connect() as conn:
+                brut = conn.execute(self._SQL_GET, {"id": panier_id, "now": datetime.utcnow()}).scalar()
+        except OperationalError as e:
+            logger.error(f"[PANIER] Table paniers_session indisponible ({e}). Lancer `flask db-migrate`.")
+            return []
+        if not brut:
+            return []
+        try:
+            return compacter(json.loads(brut))
+        except ValueError:
+            return []
+
+    def set(self, panier_id, lignes):
+        now = datetime.utcnow()
+        self._execute(self._SQL_SET, {
+            "id": panier_id,
+            "lignes": json.dumps(lignes, separators=(",", ":")),
+            "now": now,
+            "expires": now + timedelta(seconds=self.ttl),
+        })
+
+    def delete(self, panier_id):
+        self._execute(self._SQL_DELETE, {"id": panier_id})
+
+    def purger(self):
+        result = self._execute(self._SQL_PURGE, {"now": datetime.utcnow()})
+        return result.rowcount if result is not None else 0
+
+
+BACKENDS = {
+    MemoryPanierStore.nom: MemoryPanierStore,
+    SQLitePanierStore.nom: SQLitePanierStore,
+}
+
+
+def get_panier_store():
+    return current_app.extensions["panier_store"]
+
+
+# ───────────────────────────────────────────
+# 🧹 CLI : purge des paniers expirés
+# ───────────────────────────────────────────
+@click.group("paniers", cls=AppGroup)
+def paniers_cli():
+    """Paniers courants stockés côté serveur."""
+
+
+@paniers_cli.command("purge")
+def purge_command():
+    """Supprime les paniers expirés (à planifier en cron)."""
+    store = get_panier_store()
+    n = store.purger()
+    click.echo(f"🧹 {n} panier(s) expiré(s) supprimé(s) (backend {store.nom}).")
+
+
+def init_app(app):
+    backend = app.config.get("PANIER_STORE", "sqlite")
+    if backend not in BACKENDS:
+        raise RuntimeError(f"PANIER_STORE inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+    ttl = int(app.config.get("PANIER_TTL_HOURS", 72)) * 3600
+    app.extensions["panier_store"] = BACKENDS[backend](ttl)
+    app.cli.add_command(paniers_cli)
@@ -1,25 +1,286 @@
 
-from flask import session
-from decimal import Decimal, ROUND_HALF_UP
+from flask import session, g
 
-FREE_SHIPPING_THRESHOLD = Decimal("100.00")
-SHIPPING_FEE = Decimal("9.90")
+from app.utils.panier_store import get_panier_store, compacter, nouvel_identifiant
+from app.utils.montant import Montant, ZERO
 
-def compute_shipping(subtotal_eur: Decimal) -> Decimal:
-    return Decimal("0.00") if subtotal_eur >= FREE_SHIPPING_THRESHOLD else SHIPPING_FEE
+# Montants en centimes (app/utils/montant.py)
+FREE_SHIPPING_THRESHOLD = Montant(10000)
+SHIPPING_FEE = Montant(990)
+
+def compute_shipping(subtotal: Montant) -> Montant:
+    return ZERO if subtotal >= FREE_SHIPPING_THRESHOLD else SHIPPING_FEE
+
+# ───────────────────────────────────────────
+# 🛒 Panier courant (stocké côté serveur, cf. panier_store)
+# La session ne contient que l'identifiant opaque "panier_id" et le nombre
+# de bouteilles "panier_compteur" (lu par l'ETag des GET conditionnels).
+# ───────────────────────────────────────────
+def _lignes_compactes():
+    """[[vin_id, qty], ...] du panier courant (mémorisé pour la requête, lecture seule)."""
+    if "panier_lignes" in g:
+        return g.panier_lignes
+
+    # Ancien panier complet stocké dans le cookie : lu tel quel, repris
+    # dans le store à la première écriture (_enregistrer)
+    if 'panier' in session:
+        lignes = compacter(session['panier'])
+    else:
+        panier_id = session.get('panier_id')
+        lignes = get_panier_store().get(panier_id) if panier_id else []
+
+    g.panier_lignes = lignes
+    return lignes
+
+
+def _enregistrer(lignes):
+    session.pop('panier', None)
+    panier_id = session.get('panier_id')
+    if not lignes:
+        if panier_id:
+            get_panier_store().delete(panier_id)
+    else:
+        if not panier_id:
+            panier_id = session['panier_id'] = nouvel_identifiant()
+        get_panier_store().set(panier_id, lignes)
+    _memoriser_compteur(lignes)
+    g.panier_lignes = lignes
+
+
+def _memoriser_compteur(lignes):
+    """Nombre de bouteilles recopié dans la session (ETag sans accès au store)."""
+    compteur = sum(qty for _, qty in lignes)
+    if compteur:
+        if session.get('panier_compteur') != compteur:
+            session['panier_compteur'] = compteur
+    else:
+        session.pop('panier_compteur', None)
+
+
+def compteur_session():
+    """Nombre de bouteilles d'après le cookie de session seul (aucune requête SQL)."""
+    if 'panier' in session:
+        return sum(qty for _, qty in compacter(session['panier']))
+    return int(session.get('panier_compteur') or 0)
+
+
+def lignes_panier():
+    """Lignes compactes du panier courant : [[vin_id, qty], ...]."""
+    return [list(l) for l in _lignes_compactes()]
+
+
+# ───────────────────────────────────────────
+# ✅ Revalidation (prix, disponibilité, stock) en UNE requête
+# ───────────────────────────────────────────
+INDISPONIBLE = "indisponible"
+STOCK_INSUFFISANT = "stock_insuffisant"
+
+
+def revalider_panier(lignes=None):
+    """
+    Relit en base, en une seule requête IN (...), tous les vins du panier
+    (panier courant par défaut) : nom et prix actuels, disponibilité, stock
+    disponible (stock - réservations actives).
+
+    Retourne [{vin_id, nom, prix, qty, stock, probleme}, ...] (prix : Montant,
+    en centimes) où probleme vaut
+    None, INDISPONIBLE (vin supprimé ou désactivé) ou STOCK_INSUFFISANT.
+    """
+    from sqlalchemy import select
+    from app.extensions import db
+    from app.models.vin import Vin
+    from app.utils.reservations import stock_disponible_expr
+
+    lignes = compacter(_lignes_compactes() if lignes is None else lignes)
+    if not lignes:
+        return []
+
+    # Stock disponible = stock - réservations actives (hors checkout en cours du visiteur)
+    disponible = stock_disponible_expr(exclure_commande_id=session.get('commande_id'))
+    ids = {vin_id for vin_id, _ in lignes}
+    vins = {
+        row.id: row
+        for row in db.session.execute(
+            select(Vin.id, Vin.nom, Vin.prix_cents, disponible, Vin.is_active).where(Vin.id.in_(ids))
+        )
+    }
+
+    panier = []
+    for vin_id, qty in lignes:
+        vin = vins.get(vin_id)
+        if vin is None:
+            panier.append({"vin_id": vin_id, "nom": "Vin retiré du catalogue", "prix": ZERO,
+                           "qty": qty, "stock": 0, "probleme": INDISPONIBLE})
+            continue
+        stock = max(int(vin.stock_disponible or 0), 0)
+        if not vin.is_active:
+            probleme = INDISPONIBLE
+        elif qty > stock:
+            probleme = STOCK_INSUFFISANT
+        else:
+            probleme = None
+        panier.append({"vin_id": vin_id, "nom": vin.nom, "prix": vin.prix_cents,
+                       "qty": qty, "stock": stock, "probleme": probleme})
+    return panier
+
+
+def message_probleme(ligne):
+    if ligne["probleme"] == INDISPONIBLE:
+        return f"{ligne['nom']} n'est plus disponible."
+    if ligne["probleme"] == STOCK_INSUFFISANT:
+        if ligne["stock"] <= 0:
+            return f"{ligne['nom']} est en rupture."
+        return f"{ligne['nom']} : stock limité à {ligne['stock']} bouteille(s)."
+    return None
 
-def money2(x: Decimal) -> Decimal:
-    return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 def get_session_panier():
-    """Retourne le panier stocké dans la session, ou une liste vide."""
-    return session.get('panier', [])
+    """Retourne le panier courant : [{vin_id, nom, prix, qty}, ...] (prix et noms actuels)."""
+    return [
+        {"vin_id": l["vin_id"], "nom": l["nom"], "prix": l["prix"], "qty": l["qty"]}
+        for l in revalider_panier()
+    ]
+
 
 def set_session_panier(panier):
-    """Enregistre le panier mis à jour dans la session."""
-    session['panier'] = panier
+    """Enregistre le panier mis à jour (seuls vin_id et qty sont conservés)."""
+    _enregistrer(compacter(panier))
+
+
+def vider_panier():
+    """Supprime le panier courant (après paiement)."""
+    _enregistrer([])
+    session.pop('panier_id', None)
+    session.pop('panier_compteur', None)
+
 
 def get_compteur_panier():
-    """Calcule le nombre total de bouteilles dans le panier de la session."""
-    panier = session.get('panier', [])
-    return sum(item.get('qty', 1) for item in panier)
+    """Calcule le nombre total de bouteilles dans le panier courant."""
+    lignes = _lignes_compactes()
+    if 'panier' not in session:
+        _memoriser_compteur(lignes)  # resynchronise (panier expiré dans le store, ancienne session)
+    return sum(qty for _, qty in lignes)
+
+
+# ───────────────────────────────────────────
+# 🧮 Opérations groupées sur le panier (API JSON)
+# ───────────────────────────────────────────
+OPERATIONS_PANIER = ("add", "increase", "decrease", "remove", "set")
+MAX_OPERATIONS_PANIER = 50
+
+
+def _erreur(vin_id, code, message, **extra):
+    return {"vin_id": vin_id, "code": code, "message": message, **extra}
+
+
+def appliquer_operations(lignes, operations):
+    """
+    Applique une liste d'opérations aux lignes compactes [[vin_id, qty], ...] :
+        [{"vin_id": 3, "op": "add"}, {"vin_id": 5, "op": "set", "qty": 2}, ...]
+
+    - add / increase : +qty (1 par défaut) ; set : quantité absolue (0 = retrait)
+    - decrease : -1 ; remove : retire la ligne
+    Stock et disponibilité sont vérifiés en UNE requête IN pour tous les vins
+    concernés. Une opération refusée ne modifie pas sa ligne.
+
+    Retourne (nouvelles_lignes, erreurs).
+    """
+    from sqlalchemy import select
+    from app.extensions import db
+    from app.models.vin import Vin
+    from app.utils.reservations import stock_disponible_expr
+
+    quantites = {vin_id: qty for vin_id, qty in compacter(lignes)}
+    erreurs = []
+
+    ops = []
+    for brute in operations:
+        try:
+            vin_id = int(brute.get("vin_id"))
+            op = str(brute.get("op", ""))
+            qty = int(brute.get("qty", 1))
+        except (AttributeError, TypeError, ValueError):
+            erreurs.append(_erreur(None, "operation_invalide", "Opération invalide."))
+            continue
+        if op not in OPERATIONS_PANIER:
+            erreurs.append(_erreur(vin_id, "operation_invalide", f"Opération inconnue : {op}"))
+            continue
+        ops.append((vin_id, op, qty))
+
+    # 🔎 Une seule requête pour tous les vins dont la quantité peut augmenter
+    ids = {vin_id for vin_id, op, _ in ops if op in ("add", "increase", "set")}
+    disponible = stock_disponible_expr(exclure_commande_id=session.get('commande_id'))
+    vins = {
+        row.id: row
+        for row in db.session.execute(select(Vin.id, Vin.is_active, disponible).where(Vin.id.in_(ids)))
+    } if ids else {}
+
+    for vin_id, op, qty in ops:
+        actuelle = quantites.get(vin_id, 0)
+
+        if op == "remove":
+            quantites.pop(vin_id, None)
+            continue
+        if op == "decrease":
+            if actuelle > 1:
+                quantites[vin_id] = actuelle - 1
+            else:
+                quantites.pop(vin_id, None)
+            continue
+
+        cible = qty if op == "set" else actuelle + max(qty, 1)
+        if cible <= 0:
+            quantites.pop(vin_id, None)
+            continue
+        if cible <= actuelle:
+            quantites[vin_id] = cible
+            continue
+
+        vin = vins.get(vin_id)
+        if not vin or not vin.is_active:
+            erreurs.append(_erreur(vin_id, INDISPONIBLE, "Ce vin n'est plus disponible."))
+            continue
+        stock = max(int(vin.stock_disponible or 0), 0)
+        if cible > stock:
+            message = "Ce vin est en rupture." if stock <= 0 else f"Stock limité : {stock} bouteille(s) disponible(s)."
+            erreurs.append(_erreur(vin_id, STOCK_INSUFFISANT, message, stock_dispo=stock))
+            continue
+
+        quantites[vin_id] = cible
+
+    return [[vin_id, qty] for vin_id, qty in quantites.items()], erreurs
+
+
+def resume_panier(panier):
+    """
+    Lignes + totaux (Montant, centimes) + compteur : source unique pour la page
+    panier et l'API JSON. Additions d'entiers uniquement.
+    Les lignes indisponibles sont affichées mais exclues des totaux ; `bloquant`
+    indique qu'au moins une ligne doit être corrigée avant paiement.
+    """
+    items = [
+        {
+            'vin_id': i['vin_id'],
+            'nom': i['nom'],
+            'prix': i['prix'],
+            'qty': i['qty'],
+            'line_total': i['prix'] * int(i['qty']),
+            'stock': i.get('stock'),
+            'probleme': i.get('probleme'),
+            'message': message_probleme(i) if i.get('probleme') else None,
+        }
+        for i in panier
+    ]
+
+    payables = [i for i in panier if i.get('probleme') != INDISPONIBLE]
+    subtotal = sum((i['prix'] * int(i['qty']) for i in payables), ZERO)
+    shipping = compute_shipping(subtotal) if payables else ZERO
+
+    return {
+        "items": items,
+        "subtotal": subtotal,
+        "shipping": shipping,
+        "total_ttc": subtotal + shipping,
+        "compteur": sum(int(i.get('qty', 1)) for i in panier),
+        "bloquant": any(i.get('probleme') for i in panier),
+    }
@@ -0,0 +1,99 @@
+"""
+Recherche plein texte des vins (SQLite FTS5, table vin_fts).
+
+- Index maintenu par triggers (migration 0004) : une modification admin
+  est cherchable immédiatement, sans tâche de réindexation.
+- Classement bm25 pondéré (nom > domaine > typologie > accord/millésime > description).
+- Chaque mot saisi est cherché en préfixe ("pino" → "pinot").
+
+Les résultats ne contiennent que des ids ; les vins sont hydratés depuis le
+cache catalogue (vins actifs uniquement).
+"""
+import re
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.utils.catalogue_cache import get_catalogue
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMES = 8
+LIMITE_RESULTATS = 50
+LIMITE_SUGGESTIONS = 8
+
+# Poids bm25 dans l'ordre des colonnes de vin_fts
+# (nom, domaine, typologie, accord, annee, description)
+_POIDS_BM25 = "10.0, 5.0, 3.0, 2.0, 2.0, 1.0"
+
+_SQL_RECHERCHE = text(f"""
+    SELECT vin_fts.rowid AS id
+    FROM vin_fts
+    JOIN vin ON vin.id = vin_fts.rowid
+    WHERE vin_fts MATCH :requete AND vin.is_active = 1
+    ORDER BY bm25(vin_fts, {_POIDS_BM25})
+    LIMIT :limite
+""")
+
+_TERME = re.compile(r"\w+", re.UNICODE)
+
+
+def construire_requete_fts(saisie):
+    """
+    Transforme la saisie utilisateur en requête FTS5 sûre :
+    chaque mot devient un terme préfixe entre guillemets ("mot"*), combinés en ET.
+    Retourne None si rien d'exploitable.
+    """
+    termes = _TERME.findall(saisie or "")[:MAX_TERMES]
+    if not termes:
+        return None
+    return " ".join(f'"{t}"*' for t in termes)
+
+
+def _recherche_memoire(saisie, limite):
+    """Repli si vin_fts est absente (migration 0004 non appliquée) : sous-chaînes."""
+    termes = [t.lower() for t in _TERME.findall(saisie or "")[:MAX_TERMES]]
+    if not termes:
+        return []
+    resultats = []
+    for v in get_catalogue().vins:
+        texte = " ".join(str(x or "") for x in (
+            v.nom, v.domaine.nom if v.domaine else "", v.typologie, v.accord, v.annee, v.description
+        )).lower()
+        if all(t in texte for t in termes):
+            resultats.append(v)
+            if len(resultats) >= limite:
+                break
+    return resultats
+
+
+def rechercher(saisie, limite=LIMITE_RESULTATS):
+    """Vins actifs correspondant à la saisie, du plus pertinent au moins pertinent."""
+    requete = construire_requete_fts(saisie)
+    if requete is None:
+        return []
+
+    try:
+        ids = db.session.execute(_SQL_RECHERCHE, {"requete": requete, "limite": limite}).scalars().all()
+    except OperationalError as e:
+        db.session.rollback()
+        logger.warning(f"[RECHERCHE] FTS5 indisponible ({e}) — repli en mémoire. Lancer `flask db-migrate`.")
+        return _recherche_memoire(saisie, limite)
+
+    par_id = get_catalogue().par_id
+    return [par_id[i] for i in ids if i in par_id]
+
+
+def suggestions(saisie, limite=LIMITE_SUGGESTIONS):
+    """Autocomplétion : liste compacte sérialisable en JSON."""
+    return [
+        {
+            "id": v.id,
+            "nom": v.nom,
+            "annee": v.annee,
+            "domaine": v.domaine.nom if v.domaine else None,
+        }
+        for v in rechercher(saisie, limite=limite)
+    ]
@@ -0,0 +1,297 @@
+"""
+File des remboursements Stripe.
+
+Ni l'admin (annulation) ni le traitement du webhook (echec_stock) n'appellent
+plus Stripe eux-mêmes :
+- demander() ajoute une ligne 'requested' à la session SANS commit, dans la
+  même transaction que le changement de statut de la commande ;
+- un exécuteur en arrière-plan (REFUNDS_WORKERS threads par process)
+  réserve les demandes échues (UPDATE conditionnel + bail), appelle Stripe
+  avec une clé d'idempotence dérivée de la commande ("refund-<id>") : un
+  rejeu, un bail expiré ou deux process concurrents ne remboursent jamais
+  deux fois ;
+- échec transitoire -> nouvelle tentative avec backoff exponentiel, puis
+  'failed' après REFUNDS_MAX_ATTEMPTS tentatives ; une requête refusée par
+  Stripe (InvalidRequestError) part directement en 'failed'.
+
+CLI : flask refunds reconcile [--concurrency N] [--dry-run]
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+import stripe
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, select, update, or_, and_
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.commandes import Commande
+from app.models.remboursement import Remboursement
+from app.utils import stripe_client
+
+logger = logging.getLogger(__name__)
+
+REQUESTED = "requested"
+IN_FLIGHT = "in_flight"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def cle_idempotence(commande_id):
+    # Une clé par commande : les retries réseau et les reprises du worker
+    # (demande reprise après un crash) renvoient le même refund Stripe, tant
+    # que la clé est conservée par Stripe (24 h). Aucune déduplication avec
+    # un refund créé sans cette clé (appels antérieurs, dashboard Stripe).
+    return f"refund-{commande_id}"
+
+
+# ───────────────────────────────────────────
+# 📥 Demande (dans la transaction de l'appelant)
+# ───────────────────────────────────────────
+def demander(commande, motif=None):
+    """
+    Met en file le remboursement total de la commande (sans commit).
+    Retourne la demande (existante ou nouvelle), ou None si la commande n'a
+    pas de payment_intent ou est déjà remboursée.
+    """
+    if not commande.stripe_payment_intent_id or commande.refund_effectue:
+        return None
+
+    existante = Remboursement.query.filter_by(commande_id=commande.id).first()
+    if existante is not None:
+        return existante
+
+    demande = Remboursement(
+        commande_id=commande.id,
+        payment_intent_id=commande.stripe_payment_intent_id,
+        idempotency_key=cle_idempotence(commande.id),
+        motif=motif,
+        statut=REQUESTED,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(demande)
+    # Réveil de l'exécuteur au commit de CETTE transaction
+    db.session.info["refunds_reveil"] = True
+    return demande
+
+
+@event.listens_for(Session, "after_commit")
+def _apres_commit(session):
+    if session.info.pop("refunds_reveil", False):
+        reveiller_executeurs()
+
+
+@event.listens_for(Session, "after_rollback")
+def _apres_rollback(session):
+    session.info.pop("refunds_reveil", None)
+
+
+# ───────────────────────────────────────────
+# 🔁 Réservation / exécution / backoff
+# ───────────────────────────────────────────
+def _delai_backoff(tentatives):
+    base = int(current_app.config.get("REFUNDS_BACKOFF_SECONDS", 30))
+    plafond = int(current_app.config.get("REFUNDS_BACKOFF_MAX_SECONDS", 3600))
+    return min(base * (2 ** max(tentatives - 1, 0)), plafond)
+
+
+def _eligible(now):
+    bail = now - timedelta(seconds=int(current_app.config.get("REFUNDS_LEASE_SECONDS", 300)))
+    return or_(
+        and_(Remboursement.statut == REQUESTED, Remboursement.next_attempt_at <= now),
+        and_(Remboursement.statut == IN_FLIGHT, Remboursement.locked_at < bail),
+    )
+
+
+def reserver_prochain():
+    """Réserve la plus ancienne demande échue (ou au bail expiré). Retourne son id, ou None."""
+    now = datetime.utcnow()
+    eligible = _eligible(now)
+    for _ in range(3):
+        refund_pk = db.session.execute(
+            select(Remboursement.id).where(eligible).order_by(Remboursement.id.asc()).limit(1)
+        ).scalar()
+        if refund_pk is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Remboursement)
+            .where(Remboursement.id == refund_pk, eligible)
+            .values(statut=IN_FLIGHT, locked_at=now, attempts=Remboursement.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed == 1:
+            return refund_pk
+    return None  # forte concurrence : on laisse la main
+
+
+def executer(refund_pk):
+    """Appelle Stripe pour une demande réservée. Retourne True si remboursée."""
+    demande = db.session.get(Remboursement, refund_pk)
+    try:
+        refund = stripe_client.creer_remboursement(demande.payment_intent_id, idempotency_key=demande.idempotency_key)
+    except Exception as e:
+        db.session.rollback()
+        demande = db.session.get(Remboursement, refund_pk)
+        max_attempts = int(current_app.config.get("REFUNDS_MAX_ATTEMPTS", 8))
+        demande.last_error = f"{type(e).__name__}: {e}"[:1000]
+        demande.locked_at = None
+        if isinstance(e, stripe.InvalidRequestError) or demande.attempts >= max_attempts:
+            demande.statut = FAILED
+            logger.error(f"[REFUNDS] Commande {demande.commande_id} : remboursement en échec après {demande.attempts} tentative(s) : {demande.last_error}")
+        else:
+            demande.statut = REQUESTED
+            demande.next_attempt_at = datetime.utcnow() + timedelta(seconds=_delai_backoff(demande.attempts))
+            logger.warning(f"[REFUNDS] Commande {demande.commande_id} tentative {demande.attempts} échouée, nouvel essai {demande.next_attempt_at} : {demande.last_error}")
+        db.session.commit()
+        return False
+
+    now = datetime.utcnow()
+    demande.statut = SUCCEEDED
+    demande.stripe_refund_id = refund.get("id")
+    demande.completed_at = now
+    demande.locked_at = None
+    demande.last_error = None
+    db.session.execute(
+        update(Commande)
+        .where(Commande.id == demande.commande_id)
+        .values(refund_effectue=True, stripe_refund_id=demande.stripe_refund_id, date_refund=now)
+    )
+    db.session.commit()
+    logger.info(f"[REFUNDS] Commande {demande.commande_id} remboursée refund_id={demande.stripe_refund_id}")
+    return True
+
+
+def drainer(limite=None):
+    """Exécute les demandes échues (synchrone). Retourne le nombre traité."""
+    n = 0
+    while limite is None or n < limite:
+        refund_pk = reserver_prochain()
+        if refund_pk is None:
+            break
+        executer(refund_pk)
+        n += 1
+    return n
+
+
+# ───────────────────────────────────────────
+# 🧵 Exécuteurs (threads du process web)
+# ───────────────────────────────────────────
+_reveil = threading.Event()
+_executeurs = []
+
+
+def reveiller_executeurs():
+    _reveil.set()
+
+
+def _boucle_executeur(app, intervalle):
+    while True:
+        _reveil.wait(timeout=intervalle)
+        _reveil.clear()
+        try:
+            with app.app_context():
+                drainer()
+        except Exception as e:
+            logger.error(f"[REFUNDS] Exécuteur : {type(e).__name__} - {e}")
+            time.sleep(intervalle)
+
+
+def demarrer_executeurs(app):
+    if _executeurs:
+        return
+    intervalle = float(app.config.get("REFUNDS_POLL_SECONDS", 15))
+    for i in range(int(app.config.get("REFUNDS_WORKERS", 1))):
+        t = threading.Thread(target=_boucle_executeur, args=(app, intervalle),
+                             name=f"refunds-{i}", daemon=True)
+        t.start()
+        _executeurs.append(t)
+    if _executeurs:
+        logger.info(f"[REFUNDS] {len(_executeurs)} exécuteur(s) démarré(s)")
+
+
+# ───────────────────────────────────────────
+# 🔎 Demandes en souffrance
+# ───────────────────────────────────────────
+def en_souffrance(limite=500):
+    """Demandes non abouties : en file, en échec, ou en vol depuis plus que le bail."""
+    bail = datetime.utcnow() - timedelta(seconds=int(current_app.config.get("REFUNDS_LEASE_SECONDS", 300)))
+    return (
+        Remboursement.query
+        .filter(or_(
+            Remboursement.statut.in_((REQUESTED, FAILED)),
+            and_(Remboursement.statut == IN_FLIGHT, Remboursement.locked_at < bail),
+        ))
+        .order_by(Remboursement.id.asc())
+        .limit(limite)
+        .all()
+    )
+
+
+def _drainer_parallele(app, concurrence):
+    def _tache():
+        with app.app_context():
+            try:
+                return drainer()
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        return sum(f.result() for f in [pool.submit(_tache) for _ in range(concurrence)])
+
+
+# ───────────────────────────────────────────
+# 🛠️ CLI
+# ───────────────────────────────────────────
+@click.group("refunds", cls=AppGroup)
+def refunds_cli():
+    """File des remboursements Stripe."""
+
+
+@refunds_cli.command("reconcile")
+@click.option("--concurrency", default=None, type=int, help="Appels Stripe simultanés (défaut REFUNDS_RECONCILE_CONCURRENCY).")
+@click.option("--dry-run", is_flag=True, help="Liste seulement, sans rien relancer.")
+def reconcile_command(concurrency, dry_run):
+    """Liste les remboursements en attente / en échec et les relance en masse."""
+    demandes = en_souffrance()
+    if not demandes:
+        click.echo("✅ Aucun remboursement en attente.")
+        return
+
+    for d in demandes:
+        click.echo(
+            f"  #{d.commande_id:<6} {d.statut:<10} tentatives={d.attempts} pi={d.payment_intent_id}"
+            f"{'  ' + d.last_error[:80] if d.last_error else ''}"
+        )
+    if dry_run:
+        click.echo(f"🔍 {len(demandes)} remboursement(s) en attente (dry-run).")
+        return
+
+    remis = db.session.execute(
+        update(Remboursement)
+        .where(Remboursement.statut == FAILED)
+        .values(statut=REQUESTED, attempts=0, next_attempt_at=datetime.utcnow(), locked_at=None)
+    ).rowcount
+    db.session.commit()
+    if remis:
+        click.echo(f"↩️  {remis} remboursement(s) en échec remis en file.")
+
+    concurrence = max(1, concurrency or int(current_app.config.get("REFUNDS_RECONCILE_CONCURRENCY", 4)))
+    n = _drainer_parallele(current_app._get_current_object(), concurrence)
+    restants = db.session.execute(
+        select(Remboursement.statut, db.func.count(Remboursement.id))
+        .where(Remboursement.statut.in_((REQUESTED, IN_FLIGHT, FAILED)))
+        .group_by(Remboursement.statut)
+    ).all()
+    click.echo(f"✅ {n} remboursement(s) traité(s). Restants : {dict(restants) or 0}")
+
+
+def init_app(app, demarrer=False):
+    app.cli.add_command(refunds_cli)
+    if demarrer:
+        demarrer_executeurs(app)
@@ -0,0 +1,174 @@
+"""
+Réservations de stock entre le checkout et la confirmation Stripe.
+
+- create_checkout_session pose un hold par ligne (reserver), dans la MÊME
+  transaction que la commande : si un vin n'a plus assez de stock disponible,
+  tout est annulé avant d'appeler Stripe.
+- Le webhook (ou le fallback /success) convertit les holds en vente
+  (convertir), dans la transaction qui décrémente le stock.
+- Abandon / échec / expiration libèrent les holds (liberer_commande,
+  liberer_abandonnees, liberer_expirees).
+
+Stock disponible = vin.stock - holds actifs non expirés, calculé par un
+agrégat couvert par ix_reservations_vin_statut_expires.
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, update, func, text
+
+from app.extensions import db
+from app.models.reservation import Reservation
+from app.models.vin import Vin
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+CONVERTIE = "convertie"
+LIBEREE = "liberee"
+
+
+class StockInsuffisant(Exception):
+    def __init__(self, vin_id, quantite):
+        super().__init__(f"Stock disponible insuffisant pour vin_id={vin_id} (demandé {quantite})")
+        self.vin_id = vin_id
+        self.quantite = quantite
+
+
+def duree_reservation():
+    return timedelta(minutes=int(current_app.config.get("RESERVATION_TTL_MINUTES", 35)))
+
+
+# ───────────────────────────────────────────
+# 📊 Stock disponible
+# ───────────────────────────────────────────
+def stock_reserve_expr(exclure_commande_id=None, maintenant=None):
+    """Sous-requête corrélée : quantité réservée (holds actifs) du vin courant."""
+    conds = [
+        Reservation.vin_id == Vin.id,
+        Reservation.statut == ACTIVE,
+        Reservation.expires_at > (maintenant or datetime.utcnow()),
+    ]
+    if exclure_commande_id is not None:
+        conds.append(Reservation.commande_id != exclure_commande_id)
+    return func.coalesce(
+        select(func.sum(Reservation.quantite)).where(*conds).correlate(Vin).scalar_subquery(),
+        0,
+    )
+
+
+def stock_disponible_expr(exclure_commande_id=None):
+    """Colonne SQL : stock - holds actifs (les holds de `exclure_commande_id` sont ignorés)."""
+    return (Vin.stock - stock_reserve_expr(exclure_commande_id)).label("stock_disponible")
+
+
+# ───────────────────────────────────────────
+# 🔒 Pose des holds (dans la transaction du checkout)
+# ───────────────────────────────────────────
+_SQL_RESERVER = text("""
+    INSERT INTO reservations (commande_id, vin_id, quantite, statut, created_at, expires_at)
+    SELECT :commande_id, v.id, :quantite, 'active', :now, :expires_at
+    FROM vin v
+    WHERE v.id = :vin_id
+      AND v.is_active = 1
+      AND v.stock - COALESCE((
+            SELECT SUM(r.quantite) FROM reservations r
+            WHERE r.vin_id = v.id AND r.statut = 'active' AND r.expires_at > :now
+          ), 0) >= :quantite
+""")
+
+
+def reserver(commande_id, lignes, maintenant=None):
+    """
+    Pose un hold par ligne [(vin_id, quantite), ...] pour la commande.
+    Chaque INSERT ... SELECT vérifie le disponible et réserve en une seule
+    instruction ; SQLite sérialisant les écritures, deux checkouts ne peuvent
+    pas réserver la même dernière bouteille.
+
+    Ne commit pas. Lève StockInsuffisant : l'appelant annule la transaction.
+    Retourne la date d'expiration des holds.
+    """
+    now = maintenant or datetime.utcnow()
+    expires_at = now + duree_reservation()
+    for vin_id, quantite in lignes:
+        result = db.session.execute(_SQL_RESERVER, {
+            "commande_id": commande_id,
+            "vin_id": int(vin_id),
+            "quantite": int(quantite),
+            "now": now,
+            "expires_at": expires_at,
+        })
+        if result.rowcount != 1:
+            raise StockInsuffisant(int(vin_id), int(quantite))
+    return expires_at
+
+
+# ───────────────────────────────────────────
+# 🔁 Conversion / libération (ne commit pas)
+# ───────────────────────────────────────────
+def convertir(commande_id):
+    """Vente confirmée : les holds de la commande deviennent 'convertie'."""
+    return db.session.execute(
+        update(Reservation)
+        .where(Reservation.commande_id == commande_id, Reservation.statut == ACTIVE)
+        .values(statut=CONVERTIE)
+    ).rowcount
+
+
+def liberer_commande(commande_id):
+    """Commande abandonnée / en échec : rend le stock réservé."""
+    return db.session.execute(
+        update(Reservation)
+        .where(Reservation.commande_id == commande_id, Reservation.statut == ACTIVE)
+        .values(statut=LIBEREE)
+    ).rowcount
+
+
+def liberer_abandonnees():
+    """Holds encore actifs de commandes déjà abandonnées ou en échec (set-based)."""
+    from app.models.commandes import Commande
+
+    commandes_closes = select(Commande.id).where(Commande.statut.in_(("abandonnee", "echec_stock")))
+    return db.session.execute(
+        update(Reservation)
+        .where(Reservation.statut == ACTIVE, Reservation.commande_id.in_(commandes_closes))
+        .values(statut=LIBEREE)
+    ).rowcount
+
+
+def liberer_expirees(maintenant=None):
+    """
+    Holds actifs expirés -> 'liberee'. Un hold expiré ne bloque déjà plus le
+    stock (filtre expires_at de l'agrégat) : le sweeper garde l'index compact.
+    """
+    return db.session.execute(
+        update(Reservation)
+        .where(Reservation.statut == ACTIVE, Reservation.expires_at <= (maintenant or datetime.utcnow()))
+        .values(statut=LIBEREE)
+    ).rowcount
+
+
+# ───────────────────────────────────────────
+# 🧹 CLI : sweeper des holds
+# Usage (cron) : flask reservations release
+# ───────────────────────────────────────────
+@click.group("reservations", cls=AppGroup)
+def reservations_cli():
+    """Réservations de stock (holds checkout)."""
+
+
+@reservations_cli.command("release")
+def release_command():
+    """Libère les holds expirés et ceux des commandes abandonnées."""
+    expirees = liberer_expirees()
+    abandonnees = liberer_abandonnees()
+    db.session.commit()
+    logger.info(f"[RESERVATIONS] release expirees={expirees} abandonnees={abandonnees}")
+    click.echo(f"✅ {expirees} hold(s) expiré(s) et {abandonnees} hold(s) de commandes closes libéré(s).")
+
+
+def init_app(app):
+    app.cli.add_command(reservations_cli)
@@ -0,0 +1,71 @@
+"""
+Comptage des requêtes SQL (détection des N+1).
+
+- compter_requetes() : context manager qui compte les requêtes émises.
+- assert_max_requetes(n) : idem, lève AssertionError si le plafond est dépassé
+  (à utiliser dans les tests : une page liste doit rester bornée quel que
+  soit le nombre de lignes).
+- init_app(app) : si SQL_COUNT_REQUESTS est actif, ajoute l'en-tête
+  X-SQL-Queries à chaque réponse (diagnostic en dev).
+"""
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class CompteurRequetes:
+    def __init__(self):
+        self.requetes = []
+
+    @property
+    def total(self):
+        return len(self.requetes)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.requetes.append(statement)
+
+
+@contextmanager
+def compter_requetes(engine=None):
+    """Compte les requêtes SQL émises dans le bloc (tous moteurs par défaut)."""
+    cible = engine if engine is not None else Engine
+    compteur = CompteurRequetes()
+    event.listen(cible, "before_cursor_execute", compteur._on_execute)
+    try:
+        yield compteur
+    finally:
+        event.remove(cible, "before_cursor_execute", compteur._on_execute)
+
+
+@contextmanager
+def assert_max_requetes(maximum, engine=None):
+    """
+    Exemple (test) :
+        with assert_max_requetes(4):
+            client.get("/rouge/")
+    """
+    with compter_requetes(engine) as compteur:
+        yield compteur
+    if compteur.total > maximum:
+        detail = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(compteur.requetes))
+        raise AssertionError(f"{compteur.total} requêtes SQL (max {maximum}) :\n{detail}")
+
+
+def _compter_pour_requete_http(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_queries = g.get("sql_queries", 0) + 1
+
+
+def init_app(app):
+    if not app.config.get("SQL_COUNT_REQUESTS"):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _compter_pour_requete_http):
+        event.listen(Engine, "before_cursor_execute", _compter_pour_requete_http)
+
+    @app.after_request
+    def _entete_nb_requetes(response):
+        response.headers["X-SQL-Queries"] = str(g.get("sql_queries", 0))
+        return response
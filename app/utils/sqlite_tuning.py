@@ -0,0 +1,131 @@
+"""
+Profil de performance SQLite, appliqué à chaque nouvelle connexion du moteur.
+
+Sans PRAGMA, vins.db tournait en journal 'rollback' : une écriture du
+webhook bloquait toutes les lectures du catalogue, et deux écrivains
+concurrents échouaient vite en "database is locked".
+
+- journal_mode=WAL : les lecteurs ne bloquent plus l'écrivain (et inversement) ;
+- busy_timeout : un écrivain attend le verrou au lieu d'échouer ;
+- synchronous=NORMAL : sûr en WAL (pas de corruption, au pire la dernière
+  transaction perdue en cas de coupure de courant), bien moins de fsync ;
+- mmap_size / cache_size / temp_store : lectures servies depuis la mémoire.
+
+Chaque valeur se règle par la config (SQLITE_*) ; une valeur vide désactive
+le PRAGMA correspondant.
+
+CLI (cron) : flask sqlite checkpoint | flask sqlite optimize | flask sqlite status
+"""
+import os
+import logging
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, text
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+_VALEURS = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+}
+
+# PRAGMA -> clé de config (ordre d'application : journal_mode d'abord)
+_CLES = (
+    ("journal_mode", "SQLITE_JOURNAL_MODE"),
+    ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+    ("synchronous", "SQLITE_SYNCHRONOUS"),
+    ("mmap_size", "SQLITE_MMAP_SIZE"),
+    ("cache_size", "SQLITE_CACHE_SIZE"),
+    ("temp_store", "SQLITE_TEMP_STORE"),
+)
+
+
+def profil_depuis_config(config):
+    """{pragma: valeur} validé, à partir de la config Flask (valeurs vides ignorées)."""
+    profil = {}
+    for pragma, cle in _CLES:
+        valeur = config.get(cle)
+        if valeur is None or str(valeur).strip() == "":
+            continue
+        if pragma in _VALEURS:
+            valeur = str(valeur).strip().upper()
+            if valeur not in _VALEURS[pragma]:
+                raise ValueError(f"{cle}={valeur!r} invalide (attendu : {', '.join(_VALEURS[pragma])})")
+        else:
+            valeur = int(valeur)
+        profil[pragma] = valeur
+    return profil
+
+
+def installer(engine, profil):
+    """Applique `profil` à chaque nouvelle connexion de `engine` (SQLite uniquement)."""
+    if engine.dialect.name != "sqlite" or not profil:
+        return False
+
+    @event.listens_for(engine, "connect")
+    def _appliquer(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for pragma, valeur in profil.items():
+                cur.execute(f"PRAGMA {pragma}={valeur}")
+        finally:
+            cur.close()
+
+    return True
+
+
+def init_app(app):
+    app.cli.add_command(sqlite_cli)
+    profil = profil_depuis_config(app.config)
+    with app.app_context():
+        if installer(db.engine, profil):
+            logger.info(f"[SQLITE] Profil appliqué aux connexions : {profil}")
+
+
+# ───────────────────────────────────────────
+# 🛠️ CLI (maintenance périodique)
+# Usage (cron) :
+#   */15 * * * * flask sqlite checkpoint
+#   0 4 * * *    flask sqlite optimize
+# ───────────────────────────────────────────
+@click.group("sqlite", cls=AppGroup)
+def sqlite_cli():
+    """Maintenance de la base SQLite."""
+
+
+@sqlite_cli.command("checkpoint")
+@click.option("--mode", default="TRUNCATE", show_default=True,
+              type=click.Choice(["PASSIVE", "FULL", "RESTART", "TRUNCATE"], case_sensitive=False))
+def checkpoint_command(mode):
+    """Reporte le journal WAL dans la base (et le tronque en mode TRUNCATE)."""
+    with db.engine.connect() as conn:
+        occupe, pages_wal, pages_reportees = conn.execute(text(f"PRAGMA wal_checkpoint({mode.upper()})")).one()
+    if pages_wal == -1:
+        click.echo("ℹ️  Base hors mode WAL : rien à reporter.")
+    elif occupe:
+        click.echo(f"⚠️  Checkpoint incomplet (lecteurs actifs) : {pages_reportees}/{pages_wal} page(s) reportée(s).")
+    else:
+        click.echo(f"✅ Checkpoint {mode.upper()} : {pages_reportees}/{pages_wal} page(s) reportée(s).")
+
+
+@sqlite_cli.command("optimize")
+def optimize_command():
+    """PRAGMA optimize : met à jour les statistiques du planificateur si utile."""
+    with db.engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
+    click.echo("✅ PRAGMA optimize exécuté.")
+
+
+@sqlite_cli.command("status")
+def status_command():
+    """Affiche les PRAGMA effectifs d'une connexion du pool et la taille du fichier WAL."""
+    with db.engine.connect() as conn:
+        for pragma, _cle in _CLES:
+            click.echo(f"  {pragma:<13} {conn.execute(text(f'PRAGMA {pragma}')).scalar()}")
+    wal = f"{db.engine.url.database}-wal"
+    if os.path.exists(wal):
+        click.echo(f"  fichier WAL   {os.path.getsize(wal) / 1024:.0f} Kio")
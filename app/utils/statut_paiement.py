@@ -0,0 +1,168 @@
+"""
+Statut de paiement par session Stripe, pour la page d'attente.
+
+- GET /paiement/statut?session_id=... lit d'abord le cache court
+  (table statuts_paiement, partagée par tous les workers) : une page qui
+  interroge toutes les secondes ne touche ni commandes ni Stripe.
+- Le webhook (stripe_events) publie le statut dès qu'il a traité la
+  commande : la page d'attente le voit au poll suivant.
+- Le fallback Stripe (retrieve de la session) est réservé par un UPDATE
+  conditionnel sur stripe_verifie_a : au plus UN appel par session et par
+  STATUT_PAIEMENT_STRIPE_INTERVAL_SECONDS, quel que soit le nombre
+  d'onglets, de rafraîchissements ou de workers.
+
+CLI : flask statuts-paiement purge
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+import stripe
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models.commandes import Commande
+from app.models.statut_paiement import StatutPaiement  # noqa: F401 (table connue de db.create_all)
+from app.utils import stock, stripe_client
+from app.utils.catalogue_cache import bump_catalogue_version
+
+logger = logging.getLogger(__name__)
+
+# Statuts qui ne changeront plus du point de vue de la page d'attente
+STATUTS_FINAUX = ("payé", "complétée", "echec_stock", "abandonnee", "annulée")
+
+
+def _ttl(statut):
+    if statut in STATUTS_FINAUX:
+        return timedelta(minutes=10)
+    return timedelta(seconds=float(current_app.config.get("STATUT_PAIEMENT_TTL_SECONDS", 3)))
+
+
+# ───────────────────────────────────────────
+# 🗂️ Cache (SQLite, partagé entre workers)
+# ───────────────────────────────────────────
+_SQL_PUBLIER = text("""
+    INSERT INTO statuts_paiement (stripe_session_id, commande_id, statut, updated_at, expires_at)
+    VALUES (:sid, :commande_id, :statut, :now, :expires_at)
+    ON CONFLICT(stripe_session_id) DO UPDATE SET
+        commande_id = excluded.commande_id,
+        statut = excluded.statut,
+        updated_at = excluded.updated_at,
+        expires_at = excluded.expires_at
+""")
+
+_SQL_RESERVER_VERIFICATION = text("""
+    INSERT INTO statuts_paiement (stripe_session_id, commande_id, statut, updated_at, expires_at, stripe_verifie_a)
+    VALUES (:sid, :commande_id, 'en_attente', :now, :now, :now)
+    ON CONFLICT(stripe_session_id) DO UPDATE SET stripe_verifie_a = :now
+    WHERE statuts_paiement.stripe_verifie_a IS NULL OR statuts_paiement.stripe_verifie_a <= :seuil
+""")
+
+
+def publier(stripe_session_id, commande_id, statut):
+    """Met à jour le cache (webhook, fallback). Commit."""
+    now = datetime.utcnow()
+    db.session.execute(_SQL_PUBLIER, {
+        "sid": stripe_session_id, "commande_id": commande_id, "statut": statut,
+        "now": now, "expires_at": now + _ttl(statut),
+    })
+    db.session.commit()
+
+
+def lire(stripe_session_id):
+    """Statut en cache (non expiré) ou None."""
+    return db.session.execute(
+        text("SELECT statut, commande_id FROM statuts_paiement WHERE stripe_session_id = :sid AND expires_at > :now"),
+        {"sid": stripe_session_id, "now": datetime.utcnow()},
+    ).first()
+
+
+# ───────────────────────────────────────────
+# 💳 Fallback Stripe (limité)
+# ───────────────────────────────────────────
+def verifier_aupres_de_stripe(commande):
+    """
+    Si aucune vérification récente n'a eu lieu pour cette session, interroge
+    Stripe et, si la session est payée, valide la vente (même service que
+    le webhook). Retourne le statut de la commande après coup.
+    """
+    now = datetime.utcnow()
+    intervalle = timedelta(seconds=float(current_app.config.get("STATUT_PAIEMENT_STRIPE_INTERVAL_SECONDS", 10)))
+    reservee = db.session.execute(_SQL_RESERVER_VERIFICATION, {
+        "sid": commande.stripe_session_id, "commande_id": commande.id, "now": now, "seuil": now - intervalle,
+    }).rowcount == 1
+    db.session.commit()
+    if not reservee:
+        return commande.statut
+
+    try:
+        session_stripe = stripe_client.recuperer_session_checkout(commande.stripe_session_id)
+        if session_stripe.payment_status != "paid":
+            return commande.statut
+        if stock.vendre_commande(commande.id, session_stripe.get("payment_intent")):
+            db.session.commit()
+            bump_catalogue_version()
+            logger.info(f"[STATUT] Commande {commande.id} -> payé (fallback Stripe API)")
+        else:
+            db.session.rollback()
+    except stock.StockInsuffisantCommande as e:
+        # Le webhook tranchera (echec_stock + remboursement)
+        db.session.rollback()
+        logger.error(f"[STATUT] Commande {commande.id} : {e}")
+    except (stripe.StripeError, stripe_client.StripeIndisponible) as e:
+        logger.warning(f"[STATUT] Vérification Stripe impossible session={commande.stripe_session_id}: {e}")
+        return commande.statut
+
+    db.session.refresh(commande)
+    return commande.statut
+
+
+# ───────────────────────────────────────────
+# 🔎 Lecture pour la page d'attente
+# ───────────────────────────────────────────
+def statut_session(stripe_session_id):
+    """
+    Statut courant d'une session : cache -> commande -> fallback Stripe
+    limité. Retourne (statut, commande_id) ; statut 'inconnue' si aucune
+    commande ne correspond.
+    """
+    en_cache = lire(stripe_session_id)
+    if en_cache is not None:
+        return en_cache.statut, en_cache.commande_id
+
+    commande = Commande.query.filter_by(stripe_session_id=stripe_session_id).first()
+    if commande is None:
+        return "inconnue", None
+
+    statut = commande.statut
+    if statut == "en_attente":
+        statut = verifier_aupres_de_stripe(commande)
+    publier(stripe_session_id, commande.id, statut)
+    return statut, commande.id
+
+
+# ───────────────────────────────────────────
+# 🧹 CLI : purge du cache
+# Usage (cron) : flask statuts-paiement purge
+# ───────────────────────────────────────────
+@click.group("statuts-paiement", cls=AppGroup)
+def statuts_paiement_cli():
+    """Cache du statut de paiement (page d'attente)."""
+
+
+@statuts_paiement_cli.command("purge")
+@click.option("--hours", default=24, show_default=True, type=int, help="Âge minimal des entrées expirées")
+def purge_command(hours):
+    """Supprime les entrées expirées depuis plus de --hours heures."""
+    n = db.session.execute(
+        text("DELETE FROM statuts_paiement WHERE expires_at < :seuil"),
+        {"seuil": datetime.utcnow() - timedelta(hours=hours)},
+    ).rowcount
+    db.session.commit()
+    click.echo(f"🧹 {n} statut(s) de paiement supprimé(s).")
+
+
+def init_app(app):
+    app.cli.add_command(statuts_paiement_cli)
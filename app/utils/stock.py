@@ -0,0 +1,175 @@
+"""
+Mouvements de stock des commandes (service unique).
+
+Le webhook Stripe (stripe_events) et le fallback /success passent tous les
+deux par vendre_commande() : plus de boucle UPDATE ligne à ligne dupliquée.
+
+- Les lignes d'une commande sont agrégées par vin (GROUP BY) en une requête.
+- Le décrément est UN executemany d'UPDATE conditionnels
+  (stock - holds actifs des AUTRES commandes >= quantité, vin actif) dans
+  un SAVEPOINT : si le total des lignes modifiées ne correspond pas, le
+  SAVEPOINT est annulé (tout ou rien) et un SELECT unique produit le
+  rapport des lignes en échec.
+- Le passage en 'payé' est un UPDATE gardé : deux chemins
+  concurrents (webhook + /success) ne peuvent pas décrémenter deux fois.
+
+Une remise en stock (admin, annulation) passe par incrementer().
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, update, func, text
+
+from app.extensions import db
+from app.models.commandes import Commande, CommandeProduit
+from app.models.vin import Vin
+from app.utils import reservations
+
+logger = logging.getLogger(__name__)
+
+# Une commande abandonnée (ex. remplacée par un nouveau checkout) dont la
+# session Stripe était encore ouverte peut tout de même être payée : ses
+# holds sont rendus, la garde du décrément protège alors ceux des autres.
+STATUTS_PAYABLES = ("en_attente", "abandonnee")
+
+
+class StockInsuffisantCommande(Exception):
+    """
+    Au moins une ligne ne peut pas être servie ; rien n'a été décrémenté.
+    `echecs` : [{"vin_id", "demande", "disponible", "actif"}, ...]
+    """
+    def __init__(self, echecs):
+        if not echecs:
+            super().__init__("Commande sans lignes produits")
+            self.echecs = []
+            return
+        detail = ", ".join(
+            f"vin_id={e['vin_id']} demandé={e['demande']} stock={e['disponible']}"
+            + ("" if e["actif"] else " (inactif)")
+            for e in echecs
+        )
+        super().__init__(f"Stock insuffisant : {detail}")
+        self.echecs = echecs
+
+
+# ───────────────────────────────────────────
+# 📦 Lignes d'une commande (agrégées par vin)
+# ───────────────────────────────────────────
+def lignes_commande(commande_id):
+    """[(vin_id, quantite)] de la commande, une entrée par vin (vin supprimé : vin_id 0, jamais disponible)."""
+    rows = db.session.execute(
+        select(CommandeProduit.produit_id, func.sum(CommandeProduit.quantite))
+        .where(CommandeProduit.commande_id == commande_id)
+        .group_by(CommandeProduit.produit_id)
+        .order_by(CommandeProduit.produit_id)
+    ).all()
+    return [(int(vin_id or 0), int(quantite)) for vin_id, quantite in rows]
+
+
+# ───────────────────────────────────────────
+# ➖ / ➕ Mouvements (ne commit pas)
+# ───────────────────────────────────────────
+# Le stock tenu par les holds actifs des autres commandes n'est pas vendable :
+# une commande dont les holds ont été rendus (abandonnée, hold expiré) ne
+# prend jamais une bouteille réservée par un autre client.
+_SQL_DECREMENTER = text("""
+    UPDATE vin SET stock = stock - :quantite
+    WHERE id = :vin_id
+      AND is_active = 1
+      AND stock - COALESCE((
+            SELECT SUM(r.quantite) FROM reservations r
+            WHERE r.vin_id = vin.id AND r.statut = 'active' AND r.expires_at > :now
+              AND r.commande_id != :commande_id
+          ), 0) >= :quantite
+""")
+
+
+def _rapport_echecs(lignes, commande_id, maintenant):
+    """Un SELECT : lignes [(vin_id, quantite)] qui ne passent pas la garde."""
+    ids = [vin_id for vin_id, _ in lignes]
+    reserve = reservations.stock_reserve_expr(exclure_commande_id=commande_id, maintenant=maintenant)
+    etat = {
+        vin_id: (disponible, actif)
+        for vin_id, disponible, actif in db.session.execute(
+            select(Vin.id, Vin.stock - reserve, Vin.is_active).where(Vin.id.in_(ids))
+        ).all()
+    }
+    echecs = []
+    for vin_id, quantite in lignes:
+        disponible, actif = etat.get(vin_id, (0, False))
+        if not actif or (disponible or 0) < quantite:
+            echecs.append({"vin_id": vin_id, "demande": quantite, "disponible": disponible or 0, "actif": bool(actif)})
+    return echecs
+
+
+def decrementer(lignes, commande_id=None, maintenant=None):
+    """
+    Décrémente le stock de toutes les lignes [(vin_id, quantite)] en un seul
+    aller-retour (executemany), sans entamer les holds actifs des commandes
+    autres que `commande_id`. Tout ou rien : lève StockInsuffisantCommande
+    sans rien modifier si une ligne ne passe pas. Ne commit pas.
+    """
+    lignes = [(int(v), int(q)) for v, q in lignes if int(q) > 0]
+    if not lignes:
+        return 0
+    now = maintenant or datetime.utcnow()
+    exclue = int(commande_id) if commande_id is not None else 0
+
+    # SAVEPOINT : annule uniquement ce lot (à appeler après la première
+    # écriture de la transaction, cf. pysqlite et le BEGIN implicite)
+    savepoint = db.session.begin_nested()
+    result = db.session.execute(_SQL_DECREMENTER, [
+        {"vin_id": v, "quantite": q, "now": now, "commande_id": exclue} for v, q in lignes
+    ])
+    if result.rowcount != len(lignes):
+        savepoint.rollback()
+        echecs = _rapport_echecs(lignes, exclue, now)
+        raise StockInsuffisantCommande(echecs or [
+            {"vin_id": v, "demande": q, "disponible": None, "actif": None} for v, q in lignes
+        ])
+    savepoint.commit()
+    return len(lignes)
+
+
+def incrementer(lignes):
+    """Remise en stock [(vin_id, quantite)] (annulation, retour). Ne commit pas."""
+    lignes = [(int(v), int(q)) for v, q in lignes if int(q) > 0]
+    if lignes:
+        db.session.execute(
+            text("UPDATE vin SET stock = stock + :quantite WHERE id = :vin_id"),
+            [{"vin_id": v, "quantite": q} for v, q in lignes],
+        )
+    return len(lignes)
+
+
+# ───────────────────────────────────────────
+# ✅ Vente confirmée (webhook Stripe + fallback /success)
+# ───────────────────────────────────────────
+def vendre_commande(commande_id, payment_intent_id=None):
+    """
+    Paiement confirmé : 'en_attente' (ou 'abandonnee') -> 'payé', décrément
+    du stock de toutes les lignes et conversion des réservations, dans la
+    transaction courante.
+
+    Retourne False si la commande n'était plus payable (déjà traitée
+    par l'autre chemin). Lève StockInsuffisantCommande (rien n'est
+    décrémenté) ; l'appelant annule alors la transaction. Ne commit pas.
+    """
+    valeurs = {"statut": "payé"}
+    if payment_intent_id:
+        valeurs["stripe_payment_intent_id"] = payment_intent_id
+    pris = db.session.execute(
+        update(Commande)
+        .where(Commande.id == commande_id, Commande.statut.in_(STATUTS_PAYABLES))
+        .values(**valeurs)
+    ).rowcount
+    if pris != 1:
+        return False
+
+    lignes = lignes_commande(commande_id)
+    if not lignes:
+        raise StockInsuffisantCommande([])
+    decrementer(lignes, commande_id=commande_id)
+    reservations.convertir(commande_id)
+    logger.info(f"[STOCK] Commande {commande_id} : {len(lignes)} ligne(s) décrémentée(s)")
+    return True
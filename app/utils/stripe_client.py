@@ -0,0 +1,200 @@
+"""
+Client Stripe partagé (appels sortants : checkout, expire, retrieve, refund).
+
+- Keep-alive : une requests.Session par process, réutilisée par tous les
+  appels (plus de poignée de main TLS vers api.stripe.com à chaque appel).
+- Timeouts par opération (STRIPE_*_TIMEOUT_SECONDS) : un Stripe dégradé ne
+  bloque plus un worker web 80 s (défaut de la librairie).
+- Retries bornés (STRIPE_MAX_NETWORK_RETRIES) délégués à la librairie
+  Stripe, toujours avec une clé d'idempotence : un retry ne crée jamais
+  une deuxième session ni un deuxième remboursement.
+- Disjoncteur : après STRIPE_BREAKER_FAILURES erreurs réseau / 5xx
+  consécutives, les appels échouent immédiatement (StripeIndisponible)
+  pendant STRIPE_BREAKER_COOLDOWN_SECONDS, puis un appel d'essai
+  (half-open) décide de la réouverture. État : etat_disjoncteur().
+- STRIPE_API_BASE redirige les appels vers un stand-in local
+  (scripts/stripe_stub.py ou stripe-mock) pour les tests de charge.
+"""
+import time
+import logging
+import threading
+
+import stripe
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+FERME = "closed"
+OUVERT = "open"
+DEMI_OUVERT = "half_open"
+
+# Erreurs qui traduisent un Stripe dégradé (comptées par le disjoncteur).
+# Les erreurs métier (carte, paramètres...) prouvent au contraire que Stripe répond.
+ERREURS_INDISPONIBILITE = (stripe.APIConnectionError, stripe.APIError, stripe.RateLimitError)
+
+
+class StripeIndisponible(Exception):
+    """Disjoncteur ouvert : appel refusé sans contacter Stripe."""
+
+
+# ───────────────────────────────────────────
+# ⚡ Disjoncteur
+# ───────────────────────────────────────────
+class Disjoncteur:
+    def __init__(self, seuil=5, pause=30):
+        self.seuil = seuil
+        self.pause = pause
+        self._verrou = threading.Lock()
+        self.etat = FERME
+        self.echecs = 0
+        self.ouvert_a = None
+        self.essai_en_cours = False
+        self.compteurs = {"succes": 0, "echecs": 0, "refus": 0, "ouvertures": 0}
+
+    def autoriser(self):
+        with self._verrou:
+            if self.etat == OUVERT and time.monotonic() - self.ouvert_a >= self.pause:
+                self.etat = DEMI_OUVERT
+                self.essai_en_cours = False
+                logger.warning("[STRIPE] Disjoncteur half-open : appel d'essai autorisé")
+            if self.etat == FERME:
+                return
+            if self.etat == DEMI_OUVERT and not self.essai_en_cours:
+                self.essai_en_cours = True
+                return
+            self.compteurs["refus"] += 1
+        raise StripeIndisponible("Stripe indisponible (disjoncteur ouvert)")
+
+    def succes(self):
+        with self._verrou:
+            if self.etat != FERME:
+                logger.warning("[STRIPE] Disjoncteur refermé")
+            self.etat = FERME
+            self.echecs = 0
+            self.essai_en_cours = False
+            self.compteurs["succes"] += 1
+
+    def echec(self):
+        with self._verrou:
+            self.echecs += 1
+            self.compteurs["echecs"] += 1
+            if self.etat == DEMI_OUVERT or self.echecs >= self.seuil:
+                if self.etat != OUVERT:
+                    self.compteurs["ouvertures"] += 1
+                    logger.error(f"[STRIPE] Disjoncteur ouvert ({self.echecs} échec(s) consécutif(s))")
+                self.etat = OUVERT
+                self.ouvert_a = time.monotonic()
+                self.essai_en_cours = False
+
+    def snapshot(self):
+        with self._verrou:
+            reouverture = None
+            if self.etat == OUVERT:
+                reouverture = max(0.0, round(self.pause - (time.monotonic() - self.ouvert_a), 1))
+            return {
+                "etat": self.etat,
+                "echecs_consecutifs": self.echecs,
+                "seuil": self.seuil,
+                "reessai_dans_s": reouverture,
+                **self.compteurs,
+            }
+
+
+# ───────────────────────────────────────────
+# 🔌 Clients (un par profil de timeout, session HTTP partagée)
+# ───────────────────────────────────────────
+_OPERATIONS = {
+    "checkout": "STRIPE_CHECKOUT_TIMEOUT_SECONDS",
+    "retrieve": "STRIPE_RETRIEVE_TIMEOUT_SECONDS",
+    "refund": "STRIPE_REFUND_TIMEOUT_SECONDS",
+}
+_creation = threading.Lock()
+
+
+def _etat(app=None):
+    app = app or current_app._get_current_object()
+    etat = app.extensions.get("stripe_client")
+    if etat is None:
+        with _creation:
+            etat = app.extensions.get("stripe_client")
+            if etat is None:
+                cfg = app.config
+                session_http = requests.Session()
+                adaptateur = HTTPAdapter(pool_connections=1, pool_maxsize=int(cfg.get("STRIPE_HTTP_POOL_SIZE", 10)))
+                session_http.mount("https://", adaptateur)
+                session_http.mount("http://", adaptateur)
+
+                connect = float(cfg.get("STRIPE_CONNECT_TIMEOUT_SECONDS", 3))
+                base = cfg.get("STRIPE_API_BASE")
+                clients = {}
+                for operation, cle in _OPERATIONS.items():
+                    clients[operation] = stripe.StripeClient(
+                        cfg.get("STRIPE_SECRET_KEY") or "",
+                        http_client=stripe.RequestsClient(
+                            timeout=(connect, float(cfg.get(cle, 10))), session=session_http
+                        ),
+                        max_network_retries=int(cfg.get("STRIPE_MAX_NETWORK_RETRIES", 1)),
+                        **({"base_addresses": {"api": base}} if base else {}),
+                    )
+                etat = {
+                    "clients": clients,
+                    "disjoncteur": Disjoncteur(
+                        seuil=int(cfg.get("STRIPE_BREAKER_FAILURES", 5)),
+                        pause=float(cfg.get("STRIPE_BREAKER_COOLDOWN_SECONDS", 30)),
+                    ),
+                }
+                app.extensions["stripe_client"] = etat
+    return etat
+
+
+def _appeler(operation, fonction):
+    etat = _etat()
+    disjoncteur = etat["disjoncteur"]
+    disjoncteur.autoriser()
+    debut = time.perf_counter()
+    try:
+        resultat = fonction(etat["clients"][operation].v1)
+    except ERREURS_INDISPONIBILITE as e:
+        disjoncteur.echec()
+        current_app.logger.error(
+            f"[STRIPE] {operation} échoué en {(time.perf_counter() - debut) * 1000:.0f} ms : {type(e).__name__} - {e}"
+        )
+        raise
+    except stripe.StripeError:
+        disjoncteur.succes()
+        raise
+    except Exception:
+        disjoncteur.echec()
+        raise
+    disjoncteur.succes()
+    return resultat
+
+
+# ───────────────────────────────────────────
+# 💳 Opérations
+# ───────────────────────────────────────────
+def creer_session_checkout(params, idempotency_key):
+    return _appeler("checkout", lambda v1: v1.checkout.sessions.create(
+        params, options={"idempotency_key": idempotency_key}
+    ))
+
+
+def expirer_session_checkout(session_id):
+    return _appeler("checkout", lambda v1: v1.checkout.sessions.expire(session_id))
+
+
+def recuperer_session_checkout(session_id):
+    return _appeler("retrieve", lambda v1: v1.checkout.sessions.retrieve(session_id))
+
+
+def creer_remboursement(payment_intent, idempotency_key):
+    return _appeler("refund", lambda v1: v1.refunds.create(
+        {"payment_intent": payment_intent}, options={"idempotency_key": idempotency_key}
+    ))
+
+
+def etat_disjoncteur(app=None):
+    """État du disjoncteur de ce process (monitoring)."""
+    return _etat(app)["disjoncteur"].snapshot()
@@ -0,0 +1,340 @@
+"""
+Traitement asynchrone des événements Stripe.
+
+Le webhook ne fait que vérifier la signature et enregistrer l'événement brut
+dans stripe_events (statut 'pending') : Stripe reçoit son 200 en quelques
+millisecondes, quels que soient SMTP ou l'API Stripe.
+
+Un pool de threads (STRIPE_EVENTS_WORKERS par process) draine ensuite les
+événements en attente, dans l'ordre d'arrivée :
+- réservation atomique d'un événement (UPDATE conditionnel, sans RETURNING),
+- bail (lease) : un événement 'processing' dont le worker est mort est repris,
+- échec -> nouvelle tentative avec backoff exponentiel, puis 'failed'
+  après STRIPE_EVENTS_MAX_ATTEMPTS tentatives.
+
+CLI : flask stripe-events replay [--event-id ID ...] [--failed]
+"""
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, update, or_, and_
+
+from app.extensions import db
+from app.models.commandes import Commande
+from app.models.stripe_event import StripeEvent
+from app.utils.catalogue_cache import bump_catalogue_version
+from app.utils.montant import euros
+from app.utils import reservations, email_outbox, stock, statut_paiement, remboursements
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+TYPES_TRAITES = ("checkout.session.completed",)
+
+
+# ───────────────────────────────────────────
+# 📥 Enregistrement (appelé par le webhook)
+# ───────────────────────────────────────────
+def enregistrer_evenement(event, payload):
+    """
+    Persiste l'événement brut en 'pending'. Lève IntegrityError si
+    l'event_id est déjà connu (Stripe rejoue) : l'appelant répond 200.
+    """
+    objet = (event.get("data") or {}).get("object") or {}
+    db.session.add(StripeEvent(
+        event_id=event.get("id"),
+        event_type=event.get("type"),
+        stripe_session_id=objet.get("id"),
+        payload=payload.decode("utf-8") if isinstance(payload, bytes) else payload,
+        statut=PENDING,
+        next_attempt_at=datetime.utcnow(),
+    ))
+    db.session.commit()
+    reveiller_workers()
+
+
+# ───────────────────────────────────────────
+# 🧾 checkout.session.completed (logique métier, ex-webhook synchrone)
+# ───────────────────────────────────────────
+def traiter_checkout_complete(event):
+    session_stripe = event['data']['object']
+
+    event_id = event.get("id")
+    stripe_session_id = session_stripe.get("id")
+    payment_intent_id = session_stripe.get("payment_intent")
+
+    # Récupération commande
+    commande = Commande.query.filter_by(stripe_session_id=stripe_session_id).first()
+    if not commande:
+        # Rejoué avec backoff : la commande peut ne pas être encore visible
+        raise LookupError(f"Commande introuvable pour stripe_session_id={stripe_session_id}")
+
+    # (optionnel mais utile) : relier l'event à la commande pour audit
+    StripeEvent.query.filter_by(event_id=event_id).update({"commande_id": commande.id})
+
+    # 🔗 Audit : mémoriser payment_intent sur la commande
+    if payment_intent_id and commande.stripe_payment_intent_id != payment_intent_id:
+        commande.stripe_payment_intent_id = payment_intent_id
+        db.session.commit()
+
+    # ✅ Barrière #2 : garde métier (filet)
+    # ('payé' sans email : validée par /success, on poursuit pour l'email)
+    if commande.statut in ('complétée', 'echec_stock') or (commande.statut == 'payé' and commande.email_paiement_envoye):
+        current_app.logger.info(f"[STRIPE-EVENTS] Commande {commande.id} déjà traitée (statut={commande.statut}) event_id={event_id}")
+        return
+
+    # Stripe fournit l'email dans customer_details.email (le plus fiable), sinon customer_email.
+    customer_details = session_stripe.get("customer_details") or {}
+    stripe_email = customer_details.get("email") or session_stripe.get("customer_email")
+
+    # Statut + décrément de toutes les lignes + conversion des holds (tout ou rien)
+    try:
+        vendue = stock.vendre_commande(commande.id, payment_intent_id)
+    except stock.StockInsuffisantCommande as e:
+        db.session.rollback()
+
+        current_app.logger.warning(f"[STRIPE-EVENTS] Commande {commande.id} -> echec_stock ({e}) event_id={event_id}")
+        commande.statut = 'echec_stock'
+        reservations.liberer_commande(commande.id)
+        # Remboursement mis en file dans la même transaction que echec_stock
+        remboursements.demander(commande, motif="echec_stock")
+        db.session.commit()
+
+        # Option : email justificatif si email déjà connu
+        if commande.email_client:
+            body = (
+                f"Bonjour,\n\n"
+                f"Votre commande #{commande.id} n'a pas pu être honorée : un remboursement intégral va être effectué.\n"
+                f"Motif : le vin a été vendu simultanément et le stock n'était plus suffisant.\n\n"
+                f"Vous recevrez le montant sur votre moyen de paiement ; selon votre banque, il peut apparaître sous quelques jours.\n\n"
+                f"Les Silences du Vin"
+            )
+            email_outbox.mettre_en_file(
+                subject="Remboursement à venir – rupture de stock",
+                body=body,
+                recipients=[commande.email_client],
+                reply_to="contact@lessilencesduvin.com",
+                cle=f"remboursement_stock:{commande.id}",
+                commande_id=commande.id,
+            )
+            db.session.commit()
+        statut_paiement.publier(stripe_session_id, commande.id, commande.statut)
+        return
+
+    if not vendue:
+        # Validée entre-temps par le fallback /success : il reste l'email
+        db.session.refresh(commande)
+        if commande.statut != 'payé':
+            current_app.logger.info(f"[STRIPE-EVENTS] Commande {commande.id} déjà traitée (statut={commande.statut}) event_id={event_id}")
+            return
+
+    # Email "Paiement confirmé" en outbox, dans la MÊME transaction que la vente
+    if stripe_email and not commande.email_paiement_envoye:
+        body = (
+            f"Bonjour,\n\n"
+            f"Votre paiement pour la commande #{commande.id} a bien été confirmé.\n"
+            f"Montant : {euros(commande.total_ttc_cents)} €\n\n"
+            f"✅ Dernière étape : merci de renseigner votre adresse de livraison ici :\n"
+            f"https://www.lessilencesduvin.fr/paiement/infos-livraison\n\n"
+            f"Sans ces informations, nous ne pourrons pas expédier votre commande.\n\n"
+            f"Les Silences du Vin"
+        )
+        email_outbox.mettre_en_file(
+            subject=f"Paiement confirmé – Commande #{commande.id}",
+            body=body,
+            recipients=[stripe_email],
+            reply_to="contact@lessilencesduvin.com",
+            cle=f"paiement:{commande.id}",
+            commande_id=commande.id,
+        )
+        commande.email_paiement_envoye = True
+        commande.date_email_paiement = datetime.utcnow()
+
+        # On en profite pour pré-remplir email_client si vide (utile pour admin)
+        if not commande.email_client:
+            commande.email_client = stripe_email
+    elif not stripe_email:
+        current_app.logger.warning(f"[STRIPE-EVENTS] Email Stripe absent, email paiement non envoyé commande {commande.id}")
+
+    db.session.commit()
+    if vendue:
+        bump_catalogue_version()
+        current_app.logger.info(f"[STRIPE-EVENTS] Commande {commande.id} -> payé (stock OK) event_id={event_id}")
+    # Page d'attente : le statut est visible dès le poll suivant
+    statut_paiement.publier(stripe_session_id, commande.id, commande.statut)
+
+TRAITEMENTS = {
+    "checkout.session.completed": traiter_checkout_complete,
+}
+
+
+# ───────────────────────────────────────────
+# 🔁 Réservation / exécution / backoff
+# ───────────────────────────────────────────
+def _delai_backoff(tentatives):
+    base = int(current_app.config.get("STRIPE_EVENTS_BACKOFF_SECONDS", 5))
+    plafond = int(current_app.config.get("STRIPE_EVENTS_BACKOFF_MAX_SECONDS", 3600))
+    return min(base * (2 ** max(tentatives - 1, 0)), plafond)
+
+
+def reserver_prochain():
+    """
+    Réserve le plus ancien événement à traiter (pending échu, ou processing
+    dont le bail a expiré). Retourne son id, ou None.
+    """
+    now = datetime.utcnow()
+    bail = now - timedelta(seconds=int(current_app.config.get("STRIPE_EVENTS_LEASE_SECONDS", 300)))
+    eligible = or_(
+        and_(StripeEvent.statut == PENDING, StripeEvent.next_attempt_at <= now),
+        and_(StripeEvent.statut == PROCESSING, StripeEvent.locked_at < bail),
+    )
+    for _ in range(3):
+        event_pk = db.session.execute(
+            select(StripeEvent.id).where(eligible).order_by(StripeEvent.id.asc()).limit(1)
+        ).scalar()
+        if event_pk is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(StripeEvent)
+            .where(StripeEvent.id == event_pk, eligible)
+            .values(statut=PROCESSING, locked_at=now, attempts=StripeEvent.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed == 1:
+            return event_pk
+    return None  # forte concurrence : on laisse la main
+
+
+def traiter(event_pk):
+    """Exécute un événement réservé, puis le marque done / pending (retry) / failed."""
+    evt = db.session.get(StripeEvent, event_pk)
+    try:
+        event = json.loads(evt.payload or "{}")
+        handler = TRAITEMENTS.get(evt.event_type)
+        if handler is not None:
+            handler(event)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        evt = db.session.get(StripeEvent, event_pk)
+        max_attempts = int(current_app.config.get("STRIPE_EVENTS_MAX_ATTEMPTS", 8))
+        evt.last_error = f"{type(e).__name__}: {e}"[:1000]
+        evt.locked_at = None
+        if evt.attempts >= max_attempts:
+            evt.statut = FAILED
+            logger.error(f"[STRIPE-EVENTS] {evt.event_id} en échec définitif après {evt.attempts} tentative(s) : {evt.last_error}")
+        else:
+            evt.statut = PENDING
+            evt.next_attempt_at = datetime.utcnow() + timedelta(seconds=_delai_backoff(evt.attempts))
+            logger.warning(f"[STRIPE-EVENTS] {evt.event_id} tentative {evt.attempts} échouée, nouvel essai {evt.next_attempt_at} : {evt.last_error}")
+        db.session.commit()
+        return False
+
+    evt.statut = DONE
+    evt.processed_at = datetime.utcnow()
+    evt.locked_at = None
+    evt.last_error = None
+    db.session.commit()
+    return True
+
+
+def drainer(limite=None):
+    """Traite les événements disponibles (synchrone). Retourne le nombre traité."""
+    n = 0
+    while limite is None or n < limite:
+        event_pk = reserver_prochain()
+        if event_pk is None:
+            break
+        traiter(event_pk)
+        n += 1
+    return n
+
+
+# ───────────────────────────────────────────
+# 🧵 Pool de workers (threads du process web)
+# ───────────────────────────────────────────
+_reveil = threading.Event()
+_workers = []
+
+
+def reveiller_workers():
+    _reveil.set()
+
+
+def _boucle_worker(app, intervalle):
+    while True:
+        _reveil.wait(timeout=intervalle)
+        _reveil.clear()
+        try:
+            with app.app_context():
+                drainer()
+        except Exception as e:
+            logger.error(f"[STRIPE-EVENTS] Worker : {type(e).__name__} - {e}")
+            time.sleep(intervalle)
+
+
+def demarrer_workers(app):
+    """Démarre STRIPE_EVENTS_WORKERS threads démons (une fois par process)."""
+    if _workers:
+        return
+    intervalle = float(app.config.get("STRIPE_EVENTS_POLL_SECONDS", 5))
+    for i in range(int(app.config.get("STRIPE_EVENTS_WORKERS", 2))):
+        t = threading.Thread(target=_boucle_worker, args=(app, intervalle),
+                             name=f"stripe-events-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+    if _workers:
+        logger.info(f"[STRIPE-EVENTS] {len(_workers)} worker(s) démarré(s)")
+
+
+# ───────────────────────────────────────────
+# 🛠️ CLI
+# ───────────────────────────────────────────
+@click.group("stripe-events", cls=AppGroup)
+def stripe_events_cli():
+    """File des événements Stripe reçus par le webhook."""
+
+
+@stripe_events_cli.command("replay")
+@click.option("--event-id", "event_ids", multiple=True, help="Rejouer cet événement (répétable), quel que soit son statut.")
+@click.option("--failed", is_flag=True, help="Remettre en file tous les événements en échec.")
+def replay_command(event_ids, failed):
+    """Remet des événements en file puis draine la file dans ce process."""
+    conds = []
+    if event_ids:
+        conds.append(StripeEvent.event_id.in_(event_ids))
+    if failed:
+        conds.append(StripeEvent.statut == FAILED)
+    if conds:
+        remis = db.session.execute(
+            update(StripeEvent)
+            .where(or_(*conds))
+            .values(statut=PENDING, next_attempt_at=datetime.utcnow(), attempts=0, locked_at=None)
+        ).rowcount
+        db.session.commit()
+        click.echo(f"↩️  {remis} événement(s) remis en file.")
+
+    n = drainer()
+    restants = db.session.execute(
+        select(StripeEvent.statut, db.func.count(StripeEvent.id))
+        .where(StripeEvent.statut.in_((PENDING, PROCESSING, FAILED)))
+        .group_by(StripeEvent.statut)
+    ).all()
+    click.echo(f"✅ {n} événement(s) traité(s). Restants : {dict(restants) or 0}")
+
+
+def init_app(app, demarrer=False):
+    app.cli.add_command(stripe_events_cli)
+    if demarrer:
+        demarrer_workers(app)
@@ -37,6 +37,83 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Profil SQLite appliqué à chaque connexion (app/utils/sqlite_tuning.py)
+    # Valeur vide = PRAGMA non appliqué
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_BUSY_TIMEOUT_MS = os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = os.getenv("SQLITE_CACHE_SIZE", "-20000")   # négatif = en Kio (~20 Mo)
+    SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+    # Second moteur SQLite (mode=ro, query_only) pour les GET @lecture_seule
+    DB_LECTURE_SEULE = os.getenv("DB_LECTURE_SEULE", "True").lower() == "true"
+    DB_LECTURE_SEULE_POOL_SIZE = int(os.getenv("DB_LECTURE_SEULE_POOL_SIZE", 10))
+    DB_LECTURE_SEULE_MAX_OVERFLOW = int(os.getenv("DB_LECTURE_SEULE_MAX_OVERFLOW", 10))
+
+    # Révision partagée du cache catalogue (fichier commun à tous les workers)
+    CATALOGUE_VERSION_PATH = os.getenv(
+        "CATALOGUE_VERSION_PATH",
+        os.path.join(DATA_DIR, "catalogue.version")
+    )
+
+    # GET conditionnels : durée max (s) pendant laquelle un même ETag reste valable
+    # (doit rester < WTF_CSRF_TIME_LIMIT, les pages contiennent parfois un jeton CSRF)
+    HTTP_CACHE_ETAG_WINDOW = int(os.getenv("HTTP_CACHE_ETAG_WINDOW", 1800))
+
+    # Panier courant stocké côté serveur ("sqlite" partagé entre workers, ou "memory")
+    PANIER_STORE = os.getenv("PANIER_STORE", "sqlite")
+    PANIER_TTL_HOURS = int(os.getenv("PANIER_TTL_HOURS", 72))
+
+    # Durée des réservations de stock posées au checkout (la session Stripe expire avec)
+    RESERVATION_TTL_MINUTES = int(os.getenv("RESERVATION_TTL_MINUTES", 35))
+
+    # Webhook Stripe asynchrone : workers par process, polling, retries
+    STRIPE_EVENTS_WORKERS = int(os.getenv("STRIPE_EVENTS_WORKERS", 2))
+    STRIPE_EVENTS_POLL_SECONDS = float(os.getenv("STRIPE_EVENTS_POLL_SECONDS", 5))
+    STRIPE_EVENTS_MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENTS_MAX_ATTEMPTS", 8))
+    STRIPE_EVENTS_BACKOFF_SECONDS = int(os.getenv("STRIPE_EVENTS_BACKOFF_SECONDS", 5))
+    STRIPE_EVENTS_BACKOFF_MAX_SECONDS = int(os.getenv("STRIPE_EVENTS_BACKOFF_MAX_SECONDS", 3600))
+    STRIPE_EVENTS_LEASE_SECONDS = int(os.getenv("STRIPE_EVENTS_LEASE_SECONDS", 300))
+
+    # Webhook : filtre des event_id déjà vus (fichier SQLite annexe partagé + LRU par process)
+    STRIPE_EVENTS_SEEN_PATH = os.getenv(
+        "STRIPE_EVENTS_SEEN_PATH",
+        os.path.join(DATA_DIR, "stripe_events_vus.db")
+    )
+    STRIPE_EVENTS_SEEN_TTL_HOURS = float(os.getenv("STRIPE_EVENTS_SEEN_TTL_HOURS", 72))
+    STRIPE_EVENTS_SEEN_MEMORY = int(os.getenv("STRIPE_EVENTS_SEEN_MEMORY", 4096))
+
+    # File des remboursements Stripe : exécuteurs par process, retries, reconcile
+    REFUNDS_WORKERS = int(os.getenv("REFUNDS_WORKERS", 1))
+    REFUNDS_POLL_SECONDS = float(os.getenv("REFUNDS_POLL_SECONDS", 15))
+    REFUNDS_MAX_ATTEMPTS = int(os.getenv("REFUNDS_MAX_ATTEMPTS", 8))
+    REFUNDS_BACKOFF_SECONDS = int(os.getenv("REFUNDS_BACKOFF_SECONDS", 30))
+    REFUNDS_BACKOFF_MAX_SECONDS = int(os.getenv("REFUNDS_BACKOFF_MAX_SECONDS", 3600))
+    REFUNDS_LEASE_SECONDS = int(os.getenv("REFUNDS_LEASE_SECONDS", 300))
+    REFUNDS_RECONCILE_CONCURRENCY = int(os.getenv("REFUNDS_RECONCILE_CONCURRENCY", 4))
+
+    # Page d'attente paiement : cache court du statut, fallback Stripe limité par session
+    STATUT_PAIEMENT_TTL_SECONDS = float(os.getenv("STATUT_PAIEMENT_TTL_SECONDS", 3))
+    STATUT_PAIEMENT_STRIPE_INTERVAL_SECONDS = float(os.getenv("STATUT_PAIEMENT_STRIPE_INTERVAL_SECONDS", 10))
+
+    # Outbox emails : senders par process, taille des lots, retries
+    EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", 1))
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 10))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 20))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 6))
+    EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", 6 * 3600))
+    EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300))
+
+    # Sweeper des commandes abandonnées : seuil, lots courts, planificateur intégré optionnel
+    ABANDON_SWEEP_ENABLED = os.getenv("ABANDON_SWEEP_ENABLED", "False").lower() == "true"
+    ABANDON_SWEEP_INTERVAL_SECONDS = int(os.getenv("ABANDON_SWEEP_INTERVAL_SECONDS", 900))
+    ABANDON_SWEEP_HOURS = int(os.getenv("ABANDON_SWEEP_HOURS", 24))
+    ABANDON_SWEEP_LIMIT = int(os.getenv("ABANDON_SWEEP_LIMIT", 500))
+    ABANDON_SWEEP_BATCH_SIZE = int(os.getenv("ABANDON_SWEEP_BATCH_SIZE", 200))
+    ABANDON_SWEEP_LEASE_SECONDS = int(os.getenv("ABANDON_SWEEP_LEASE_SECONDS", 300))
+
     # ═══════════════════════════════════════════════════════════
     # 🔒 SESSIONS (sécurité cookies)
     # ═══════════════════════════════════════════════════════════
@@ -61,6 +138,13 @@ class Config:
     MAIL_USE_SSL = os.getenv("MAIL_USE_SSL", "True").lower() == "true"
     MAIL_USE_TLS = False
 
+    # Pool de connexions SMTP (app/utils/email.py)
+    MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 2))
+    MAIL_POOL_MAX_MESSAGES = int(os.getenv("MAIL_POOL_MAX_MESSAGES", 50))
+    MAIL_POOL_IDLE_SECONDS = float(os.getenv("MAIL_POOL_IDLE_SECONDS", 60))
+    MAIL_POOL_NOOP_AFTER_SECONDS = float(os.getenv("MAIL_POOL_NOOP_AFTER_SECONDS", 5))
+    MAIL_TIMEOUT_SECONDS = float(os.getenv("MAIL_TIMEOUT_SECONDS", 15))
+
     # Liste des destinataires
     raw_recipients = os.getenv("MAIL_RECIPIENT", "")
     MAIL_RECIPIENT = [r.strip() for r in raw_recipients.split(",") if r.strip()]
@@ -78,6 +162,18 @@ class Config:
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
     STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
+    # Client Stripe sortant (app/utils/stripe_client.py) : timeouts, retries, disjoncteur
+    STRIPE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("STRIPE_CONNECT_TIMEOUT_SECONDS", 3))
+    STRIPE_CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("STRIPE_CHECKOUT_TIMEOUT_SECONDS", 10))
+    STRIPE_RETRIEVE_TIMEOUT_SECONDS = float(os.getenv("STRIPE_RETRIEVE_TIMEOUT_SECONDS", 5))
+    STRIPE_REFUND_TIMEOUT_SECONDS = float(os.getenv("STRIPE_REFUND_TIMEOUT_SECONDS", 20))
+    STRIPE_MAX_NETWORK_RETRIES = int(os.getenv("STRIPE_MAX_NETWORK_RETRIES", 1))
+    STRIPE_HTTP_POOL_SIZE = int(os.getenv("STRIPE_HTTP_POOL_SIZE", 10))
+    STRIPE_BREAKER_FAILURES = int(os.getenv("STRIPE_BREAKER_FAILURES", 5))
+    STRIPE_BREAKER_COOLDOWN_SECONDS = float(os.getenv("STRIPE_BREAKER_COOLDOWN_SECONDS", 30))
+    # Stand-in local (scripts/stripe_stub.py, stripe-mock) : ex. http://127.0.0.1:12111
+    STRIPE_API_BASE = os.getenv("STRIPE_API_BASE")
+
     # En dev on tolère l'absence
     if not STRIPE_SECRET_KEY:
         print(
@@ -98,6 +194,9 @@ class DevelopmentConfig(Config):
     # SQL logs optionnels
     SQLALCHEMY_ECHO = False
 
+    # En-tête X-SQL-Queries (nombre de requêtes par page, détection N+1)
+    SQL_COUNT_REQUESTS = os.getenv("SQL_COUNT_REQUESTS", "False").lower() == "true"
+
 
 class ProductionConfig(Config):
     """Configuration pour l'environnement de production"""
@@ -0,0 +1,93 @@
+"""
+Benchmark : coût par email, connexion SMTP par message (avant) vs pool (après).
+
+Lance un serveur SMTP local (scripts/smtp_stub.py) dont la latence simule la
+poignée de main TCP + TLS + AUTH vers ssl0.ovh.net, puis envoie N emails :
+- avant : une connexion + login par message (ancien send_plain_email),
+- après : send_plain_email actuel (pool de connexions).
+
+Usage :
+    python scripts/bench_smtp.py --messages 50 --latence-ms 150 --threads 4
+"""
+import os
+import sys
+import time
+import smtplib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask                                   # noqa: E402
+from app.utils.email import send_plain_email, get_smtp_pool  # noqa: E402
+from smtp_stub import SMTPStub                            # noqa: E402
+
+
+def _message(i):
+    msg = MIMEText(f"Message de test #{i}", "plain", "utf-8")
+    msg["Subject"] = f"Bench #{i}"
+    msg["From"] = "bench@example.com"
+    msg["To"] = "client@example.com"
+    return msg
+
+
+def envoi_sans_pool(app, i):
+    cfg = app.config
+    with smtplib.SMTP(cfg["MAIL_SERVER"], cfg["MAIL_PORT"], timeout=15) as server:
+        server.login(cfg["MAIL_USERNAME"], cfg["MAIL_PASSWORD"])
+        server.send_message(_message(i))
+
+
+def envoi_avec_pool(app, i):
+    with app.app_context():
+        send_plain_email(f"Bench #{i}", f"Message de test #{i}", "bench@example.com", ["client@example.com"])
+
+
+def mesurer(nom, fonction, app, messages, threads):
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda i: fonction(app, i), range(messages)))
+    duree = time.perf_counter() - debut
+    print(f"{nom:<8} {messages} emails en {duree:6.2f} s  →  {duree / messages * 1000:7.1f} ms/email (débit)")
+    return duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SMTP : sans pool vs pool")
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--latence-ms", type=float, default=150)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--pool", type=int, default=2, help="MAIL_POOL_SIZE")
+    args = parser.parse_args()
+
+    stub = SMTPStub(latence_ms=args.latence_ms).demarrer()
+
+    app = Flask("bench_smtp")
+    app.config.update(
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=stub.port,
+        MAIL_USE_SSL=False,
+        MAIL_USERNAME="bench",
+        MAIL_PASSWORD="bench",
+        MAIL_POOL_SIZE=args.pool,
+    )
+    app.logger.disabled = True
+
+    print(f"SMTP stub 127.0.0.1:{stub.port}, latence poignée de main {args.latence_ms} ms, "
+          f"{args.threads} thread(s), pool={args.pool}\n")
+    avant = mesurer("avant", envoi_sans_pool, app, args.messages, args.threads)
+    connexions_avant = stub.stats["connexions"]
+    apres = mesurer("après", envoi_avec_pool, app, args.messages, args.threads)
+
+    pool = get_smtp_pool(app)
+    print(f"\nconnexions ouvertes : avant={connexions_avant}  après={stub.stats['connexions'] - connexions_avant}")
+    print(f"pool : {pool.stats}")
+    print(f"gain : x{avant / apres:.1f}")
+    pool.fermer()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark : concurrence lecteurs / écrivains sur SQLite, sans profil (avant)
+vs profil SQLITE_* de la config (après, app/utils/sqlite_tuning.py).
+
+Crée une base temporaire par profil (schéma réel des modèles, catalogue de
+--vins vins), puis pendant --duree secondes :
+- N lecteurs : liste d'une couleur (requête de vins.afficher_vins) ;
+- M écrivains : insertion d'un événement dans stripe_events + commit
+  (ce que fait le webhook).
+Affiche débit lectures / écritures, erreurs "database is locked" et p95.
+
+Usage :
+    python scripts/bench_sqlite.py --lecteurs 8 --ecrivains 2 --duree 10
+"""
+import os
+import sys
+import time
+import uuid
+import tempfile
+import argparse
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text          # noqa: E402
+from sqlalchemy.exc import OperationalError         # noqa: E402
+
+from config.config import Config                    # noqa: E402
+from app.extensions import db                       # noqa: E402
+from app.models.vin import Vin                      # noqa: E402,F401
+from app.models.domaine import Domaine              # noqa: E402,F401
+from app.models.stripe_event import StripeEvent     # noqa: E402,F401
+from app.utils import sqlite_tuning                 # noqa: E402
+
+SQL_LECTURE = text("SELECT id, nom, prix_cents, stock FROM vin WHERE is_active = 1 AND couleur = :couleur ORDER BY nom")
+SQL_ECRITURE = text("""
+    INSERT INTO stripe_events (event_id, event_type, stripe_session_id, payload, statut, attempts, next_attempt_at, created_at)
+    VALUES (:event_id, 'checkout.session.completed', :sid, :payload, 'pending', 0, :now, :now)
+""")
+
+
+def preparer(chemin, profil, nb_vins, connexions):
+    engine = create_engine(f"sqlite:///{chemin}", pool_size=connexions, max_overflow=0)
+    sqlite_tuning.installer(engine, profil)
+    db.metadata.create_all(engine, tables=[Vin.__table__, Domaine.__table__, StripeEvent.__table__])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO domaine (id, nom) VALUES (1, 'Bench')"))
+        conn.execute(
+            text("INSERT INTO vin (nom, domaine_id, annee, couleur, prix_cents, stock, is_active, description) "
+                 "VALUES (:nom, 1, 2020, :couleur, 2000, 10, 1, :description)"),
+            [{"nom": f"Vin {i:05d}", "couleur": ("rouge", "blanc", "rosé")[i % 3], "description": "x" * 400}
+             for i in range(nb_vins)],
+        )
+    return engine
+
+
+def _p95(valeurs):
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    return valeurs[int(len(valeurs) * 0.95) - 1 if len(valeurs) > 1 else 0] * 1000
+
+
+def mesurer(nom, engine, lecteurs, ecrivains, duree):
+    stats = {"lectures": [], "ecritures": [], "verrous": 0, "autres": 0}
+    verrou = threading.Lock()
+    fin = time.perf_counter() + duree
+
+    def lecteur(i):
+        couleur = ("rouge", "blanc", "rosé")[i % 3]
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(SQL_LECTURE, {"couleur": couleur}).all()
+            except OperationalError as e:
+                with verrou:
+                    stats["verrous" if "locked" in str(e) else "autres"] += 1
+                continue
+            with verrou:
+                stats["lectures"].append(time.perf_counter() - debut)
+
+    def ecrivain(_i):
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    now = datetime.utcnow()
+                    conn.execute(SQL_ECRITURE, {"event_id": f"evt_{uuid.uuid4().hex}", "sid": f"cs_{uuid.uuid4().hex}",
+                                                "payload": "{}" * 500, "now": now})
+            except OperationalError as e:
+                with verrou:
+                    stats["verrous" if "locked" in str(e) else "autres"] += 1
+                continue
+            with verrou:
+                stats["ecritures"].append(time.perf_counter() - debut)
+
+    threads = [threading.Thread(target=lecteur, args=(i,)) for i in range(lecteurs)]
+    threads += [threading.Thread(target=ecrivain, args=(i,)) for i in range(ecrivains)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    print(
+        f"{nom:<6} [{mode:<6}] lectures {len(stats['lectures']) / duree:8.0f}/s (p95 {_p95(stats['lectures']):6.1f} ms)  "
+        f"écritures {len(stats['ecritures']) / duree:6.0f}/s (p95 {_p95(stats['ecritures']):6.1f} ms)  "
+        f"locked {stats['verrous']}  autres erreurs {stats['autres']}"
+    )
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite : sans profil vs profil SQLITE_*")
+    parser.add_argument("--lecteurs", type=int, default=8)
+    parser.add_argument("--ecrivains", type=int, default=2)
+    parser.add_argument("--duree", type=float, default=10)
+    parser.add_argument("--vins", type=int, default=600)
+    args = parser.parse_args()
+
+    profil = sqlite_tuning.profil_depuis_config(vars(Config))
+    connexions = args.lecteurs + args.ecrivains
+    print(f"{args.lecteurs} lecteur(s), {args.ecrivains} écrivain(s), {args.duree:.0f} s, {args.vins} vins")
+    print(f"profil après : {profil}\n")
+
+    with tempfile.TemporaryDirectory() as dossier:
+        avant = preparer(os.path.join(dossier, "avant.db"), {}, args.vins, connexions)
+        mesurer("avant", avant, args.lecteurs, args.ecrivains, args.duree)
+        apres = preparer(os.path.join(dossier, "apres.db"), profil, args.vins, connexions)
+        mesurer("après", apres, args.lecteurs, args.ecrivains, args.duree)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+# ⚠️ Remplacé par `flask db-migrate` (migration 0001, app/migrations/steps.py).
+# Conservé pour historique ; ne plus lancer sur une base suivie par schema_version.
 import os
 import shutil
 import sqlite3
@@ -0,0 +1,135 @@
+"""
+Serveur SMTP local de test (remplace ssl0.ovh.net en dev / benchmark).
+
+Accepte tout : EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT.
+Les messages reçus sont comptés (et affichés avec --verbose), jamais relayés.
+
+--latence-ms simule le coût de la poignée de main distante (TCP + TLS +
+AUTH) : le bandeau d'accueil et la réponse AUTH sont retardés d'autant.
+--certfile/--keyfile activent le TLS implicite (comme le port 465).
+
+Usage :
+    python scripts/smtp_stub.py --port 2525 --latence-ms 150
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=2525 MAIL_USE_SSL=false flask run
+"""
+import ssl
+import time
+import argparse
+import threading
+import socketserver
+
+
+class _SessionSMTP(socketserver.StreamRequestHandler):
+    def _repondre(self, ligne):
+        self.wfile.write((ligne + "\r\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        serveur = self.server
+        time.sleep(serveur.latence)
+        self._repondre("220 smtp-stub ESMTP")
+        with serveur.verrou:
+            serveur.stats["connexions"] += 1
+
+        attente_login = 0
+        while True:
+            brut = self.rfile.readline()
+            if not brut:
+                return
+            ligne = brut.decode("utf-8", "replace").rstrip("\r\n")
+
+            if attente_login:
+                attente_login -= 1
+                if attente_login:
+                    self._repondre("334 UGFzc3dvcmQ6")
+                else:
+                    time.sleep(serveur.latence)
+                    self._repondre("235 2.7.0 Authentication successful")
+                continue
+
+            commande = ligne[:4].upper()
+            if commande == "EHLO":
+                self.wfile.write(b"250-smtp-stub\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                self.wfile.flush()
+            elif commande == "HELO":
+                self._repondre("250 smtp-stub")
+            elif commande == "AUTH":
+                if ligne.upper().startswith("AUTH LOGIN"):
+                    attente_login = 2
+                    self._repondre("334 VXNlcm5hbWU6")
+                else:
+                    time.sleep(serveur.latence)
+                    self._repondre("235 2.7.0 Authentication successful")
+            elif commande in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._repondre("250 OK")
+            elif commande == "DATA":
+                self._repondre("354 End data with <CR><LF>.<CR><LF>")
+                contenu = []
+                while True:
+                    l = self.rfile.readline()
+                    if not l or l in (b".\r\n", b".\n"):
+                        break
+                    contenu.append(l)
+                with serveur.verrou:
+                    serveur.stats["messages"] += 1
+                if serveur.verbose:
+                    print(b"".join(contenu).decode("utf-8", "replace"))
+                self._repondre("250 OK queued")
+            elif commande == "QUIT":
+                self._repondre("221 Bye")
+                return
+            else:
+                self._repondre("502 Command not implemented")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, adresse=("127.0.0.1", 0), latence_ms=0, certfile=None, keyfile=None, verbose=False):
+        super().__init__(adresse, _SessionSMTP)
+        self.latence = latence_ms / 1000.0
+        self.verbose = verbose
+        self.verrou = threading.Lock()
+        self.stats = {"connexions": 0, "messages": 0}
+        self.ssl_context = None
+        if certfile:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+
+    def get_request(self):
+        sock, adresse = super().get_request()
+        if self.ssl_context:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, adresse
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def demarrer(self):
+        """Démarre le serveur dans un thread (usage benchmark / tests manuels)."""
+        threading.Thread(target=self.serve_forever, name="smtp-stub", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur SMTP local de test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latence-ms", type=float, default=0)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    serveur = SMTPStub((args.host, args.port), args.latence_ms, args.certfile, args.keyfile, args.verbose)
+    print(f"✅ SMTP stub sur {args.host}:{serveur.port} (latence {args.latence_ms} ms, TLS={'oui' if args.certfile else 'non'})")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {serveur.stats['connexions']} connexion(s), {serveur.stats['messages']} message(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Stand-in local de l'API Stripe (tests de charge du tunnel de paiement hors ligne).
+
+Implémente uniquement ce que l'application appelle :
+    POST /v1/checkout/sessions          création de session
+    GET  /v1/checkout/sessions/<id>     retrieve (fallback /success)
+    POST /v1/checkout/sessions/<id>/expire  expiration (checkout remplacé)
+    POST /v1/refunds                    remboursement
+    POST /_stub/payer/<id>              simule le paiement d'une session
+
+Idempotency-Key respectée (même clé -> même réponse). --auto-pay paie chaque
+session dès sa création et, avec --webhook-url/--webhook-secret, envoie le
+checkout.session.completed signé comme Stripe à l'application.
+--latence-ms et --taux-erreur simulent un Stripe dégradé (disjoncteur).
+
+Usage :
+    python scripts/stripe_stub.py --port 12111 --auto-pay \\
+        --webhook-url http://127.0.0.1:5000/paiement/webhook/stripe --webhook-secret whsec_test
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_WEBHOOK_SECRET=whsec_test flask run
+"""
+import hmac
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+import urllib.request
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class _EtatStub:
+    def __init__(self, args):
+        self.args = args
+        self.verrou = threading.Lock()
+        self.sessions = {}
+        self.idempotence = {}
+        self.stats = {"requetes": 0, "erreurs_simulees": 0, "webhooks": 0}
+
+
+def _id(prefixe):
+    return f"{prefixe}_test_{uuid.uuid4().hex[:24]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, comme api.stripe.com
+
+    def log_message(self, *args):
+        if self.server.etat.args.verbose:
+            super().log_message(*args)
+
+    # ── Réponses ──
+    def _json(self, statut, objet):
+        corps = json.dumps(objet).encode()
+        self.send_response(statut)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corps)))
+        self.send_header("Request-Id", _id("req"))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _erreur(self, statut, message, type_="invalid_request_error"):
+        self._json(statut, {"error": {"type": type_, "message": message}})
+
+    def _params(self):
+        longueur = int(self.headers.get("Content-Length") or 0)
+        return dict(parse_qsl(self.rfile.read(longueur).decode())) if longueur else {}
+
+    def _degrader(self):
+        etat = self.server.etat
+        with etat.verrou:
+            etat.stats["requetes"] += 1
+        time.sleep(etat.args.latence_ms / 1000.0)
+        if random.random() < etat.args.taux_erreur:
+            with etat.verrou:
+                etat.stats["erreurs_simulees"] += 1
+            self._erreur(500, "Erreur simulée (stripe_stub)", "api_error")
+            return True
+        return False
+
+    # ── Routes ──
+    def do_GET(self):
+        if self._degrader():
+            return
+        if self.path.startswith("/v1/checkout/sessions/"):
+            session = self.server.etat.sessions.get(self.path.rsplit("/", 1)[-1].split("?")[0])
+            if session is None:
+                return self._erreur(404, "No such checkout.session")
+            return self._json(200, session)
+        self._erreur(404, f"Route non simulée : GET {self.path}")
+
+    def do_POST(self):
+        params = self._params()
+        etat = self.server.etat
+
+        if self.path.startswith("/_stub/payer/"):
+            session = etat.sessions.get(self.path.rsplit("/", 1)[-1])
+            if session is None:
+                return self._erreur(404, "No such checkout.session")
+            _payer(etat, session)
+            return self._json(200, session)
+
+        if self._degrader():
+            return
+
+        cle = self.headers.get("Idempotency-Key")
+        if cle and (self.path, cle) in etat.idempotence:
+            return self._json(200, etat.idempotence[(self.path, cle)])
+
+        if self.path == "/v1/checkout/sessions":
+            objet = _creer_session(params)
+            with etat.verrou:
+                etat.sessions[objet["id"]] = objet
+            if etat.args.auto_pay:
+                threading.Thread(target=_payer, args=(etat, objet), daemon=True).start()
+        elif self.path.startswith("/v1/checkout/sessions/") and self.path.endswith("/expire"):
+            objet = etat.sessions.get(self.path.split("/")[-2])
+            if objet is None:
+                return self._erreur(404, "No such checkout.session")
+            with etat.verrou:
+                ouverte = objet["status"] == "open"
+                if ouverte:
+                    objet["status"] = "expired"
+            if not ouverte:
+                return self._erreur(400, "Only Checkout Sessions with a status in [\"open\"] can be expired.")
+        elif self.path == "/v1/refunds":
+            objet = {
+                "id": _id("re"), "object": "refund", "status": "succeeded",
+                "payment_intent": params.get("payment_intent"), "created": int(time.time()),
+            }
+        else:
+            return self._erreur(404, f"Route non simulée : POST {self.path}")
+
+        if cle:
+            with etat.verrou:
+                etat.idempotence[(self.path, cle)] = objet
+        self._json(200, objet)
+
+
+def _creer_session(params):
+    metadata = {k[len("metadata["):-1]: v for k, v in params.items() if k.startswith("metadata[")}
+    session_id = _id("cs")
+    return {
+        "id": session_id,
+        "object": "checkout.session",
+        "url": f"http://127.0.0.1/stub/checkout/{session_id}",
+        "mode": params.get("mode", "payment"),
+        "status": "open",
+        "payment_status": "unpaid",
+        "payment_intent": None,
+        "customer_email": params.get("customer_email"),
+        "customer_details": {"email": params.get("customer_email") or "client@example.com"},
+        "metadata": metadata,
+        "expires_at": int(params.get("expires_at") or time.time() + 1800),
+        "created": int(time.time()),
+    }
+
+
+def _payer(etat, session):
+    """Marque la session payée puis envoie le webhook signé (si configuré)."""
+    time.sleep(etat.args.delai_paiement_ms / 1000.0)
+    with etat.verrou:
+        if session["status"] != "open":
+            return
+        session.update(status="complete", payment_status="paid", payment_intent=session["payment_intent"] or _id("pi"))
+    args = etat.args
+    if not args.webhook_url:
+        return
+    payload = json.dumps({
+        "id": _id("evt"),
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(time.time()),
+        "data": {"object": session},
+    })
+    horodatage = int(time.time())
+    signature = hmac.new(args.webhook_secret.encode(), f"{horodatage}.{payload}".encode(), hashlib.sha256).hexdigest()
+    requete = urllib.request.Request(
+        args.webhook_url, data=payload.encode(), method="POST",
+        headers={"Content-Type": "application/json", "Stripe-Signature": f"t={horodatage},v1={signature}"},
+    )
+    try:
+        urllib.request.urlopen(requete, timeout=10).read()
+        with etat.verrou:
+            etat.stats["webhooks"] += 1
+    except Exception as e:
+        print(f"⚠️  Webhook {session['id']} : {type(e).__name__} - {e}")
+
+
+def creer_serveur(hote="127.0.0.1", port=0, **options):
+    """Serveur prêt à démarrer (usage programmatique : tests de charge)."""
+    defaut = dict(latence_ms=0, taux_erreur=0.0, auto_pay=False, delai_paiement_ms=0,
+                  webhook_url=None, webhook_secret="", verbose=False)
+    defaut.update(options)
+    serveur = ThreadingHTTPServer((hote, port), _Handler)
+    serveur.daemon_threads = True
+    serveur.etat = _EtatStub(argparse.Namespace(**defaut))
+    return serveur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in local de l'API Stripe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latence-ms", type=float, default=0)
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="fraction de réponses 500 (0-1)")
+    parser.add_argument("--auto-pay", action="store_true")
+    parser.add_argument("--delai-paiement-ms", type=float, default=200)
+    parser.add_argument("--webhook-url")
+    parser.add_argument("--webhook-secret", default="")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    serveur = creer_serveur(args.host, args.port, **{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    print(f"✅ Stripe stub sur http://{args.host}:{args.port} (latence {args.latence_ms} ms, erreurs {args.taux_erreur:.0%})")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {serveur.etat.stats}")
+
+
+if __name__ == "__main__":
+    main()